@@ -0,0 +1,447 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from ingest import Dataset, align_columns, iter_prepared_chunks
+from timeseries import DailySeries
+
+# ========== KOLOM AGREGAT ==========
+ROWS     = "_rows"
+DIST_SUM = "_dist_sum"
+DIST_CNT = "_dist_cnt"
+QTY_DIST = "_qty_dist"
+TRIP_KEY = "_trip"
+
+# Dimensi cube, urut dari yang paling kasar
+CUBE_ROLES = ["date", "area", "plant", "truck", "sales", "endcust"]
+
+
+def cube_dims(cols: dict) -> list[str]:
+    return [cols[r] for r in CUBE_ROLES if cols.get(r)]
+
+
+def trip_keys(s: pd.Series) -> np.ndarray:
+    # Hash 64-bit dari nilai trip, konsisten antar chunk tanpa kamus global
+    return pd.util.hash_array(s.astype(str).to_numpy(dtype=object))
+
+
+@dataclass
+class Cube:
+    cube: pd.DataFrame
+    trips: pd.DataFrame
+    cols: dict
+    rows: int = 0
+
+
+def as_category(s: pd.Series) -> pd.Series:
+    return s if isinstance(s.dtype, pd.CategoricalDtype) else s.astype("category")
+
+
+def concat_coded(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    # Kolom categorical digabung dengan kategori gabungan; pd.concat biasa menjadikannya
+    # object/str jika kategori antar potongan berbeda
+    if len(frames) == 1:
+        return frames[0]
+    first = frames[0]
+    for col in first.columns:
+        if not all(isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+            continue
+        cats = [f[col].cat.categories for f in frames]
+        if all(c.equals(cats[0]) for c in cats[1:]):
+            continue
+        union = pd.Index(pd.unique(np.concatenate([np.asarray(c, dtype=object) for c in cats])))
+        frames = [f.assign(**{col: f[col].cat.set_categories(union)}) for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def group_codes(frame: pd.DataFrame, dims: list[str]) -> np.ndarray | None:
+    # Satu kunci int64 per baris dari kode tiap dimensi (0 = kosong); None jika jumlah
+    # kombinasi tidak muat di int64
+    key = np.zeros(len(frame), dtype=np.int64)
+    total = 1
+    for d in dims:
+        s = frame[d]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            codes, size = s.cat.codes.to_numpy(), len(s.cat.categories)
+        else:
+            codes, uniques = pd.factorize(s)
+            size = len(uniques)
+        total *= size + 1
+        if total >= 2 ** 62:
+            return None
+        key *= size + 1
+        key += codes
+        key += 1
+    return key
+
+
+def reduce_groups(frame: pd.DataFrame, dims: list[str]) -> pd.DataFrame:
+    # Setara groupby(dims).sum(), tetapi lewat satu kunci int64 (sort + bincount):
+    # memori sementara beberapa array n x 8 byte, bukan label per level groupby
+    key = group_codes(frame, dims)
+    if key is None:
+        return frame.groupby(dims, dropna=False, observed=True, sort=False, as_index=False).sum()
+    uniq, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    del key
+    out = frame[dims].take(first).reset_index(drop=True)
+    for col in frame.columns.difference(dims, sort=False):
+        values = frame[col].to_numpy()
+        sums = np.bincount(inverse, weights=values.astype("float64", copy=False), minlength=len(uniq))
+        out[col] = sums.astype(values.dtype) if np.issubdtype(values.dtype, np.integer) else sums
+    return out
+
+
+def unique_trips(trips: pd.DataFrame, dims: list[str]) -> pd.DataFrame:
+    # Pasangan (dimensi, trip) unik; urutkan per (kunci dimensi, hash trip) lalu buang
+    # baris yang sama dengan baris sebelumnya
+    key = group_codes(trips, dims)
+    if key is None:
+        return trips.drop_duplicates(ignore_index=True)
+    trip = trips[TRIP_KEY].to_numpy()
+    order = np.lexsort((trip, key))
+    key, trip = key[order], trip[order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = (key[1:] != key[:-1]) | (trip[1:] != trip[:-1])
+    return trips.take(order[keep]).reset_index(drop=True)
+
+
+# ========== REDUKSI PER CHUNK ==========
+# Setiap chunk direduksi ke (dimensi -> qty, jumlah baris, jarak) dan pasangan unik
+# (dimensi, trip). Memori sebanding dengan jumlah kunci unik, bukan jumlah baris.
+# Dimensi teks disimpan sebagai categorical (kode integer) di cube maupun tabel trip.
+class CubeBuilder:
+    def __init__(self, cols: dict, compact_rows: int = 500_000):
+        self.cols = cols
+        self.dims = cube_dims(cols)
+        self.compact_rows = compact_rows
+        self.rows = 0
+        self._parts: list[pd.DataFrame] = []
+        self._trip_parts: list[pd.DataFrame] = []
+        self._pending = 0
+
+    def _reduce(self, frame: pd.DataFrame) -> pd.DataFrame:
+        return reduce_groups(frame, self.dims)
+
+    def _compact(self) -> None:
+        if len(self._parts) > 1:
+            self._parts = [self._reduce(concat_coded(self._parts))]
+        if len(self._trip_parts) > 1:
+            self._trip_parts = [unique_trips(concat_coded(self._trip_parts), self.dims)]
+        self._pending = 0
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        if chunk.empty:
+            return
+        c = self.cols
+        frame = pd.DataFrame({d: as_category(chunk[d]) for d in self.dims if d != c["date"]})
+        frame.insert(0, c["date"], chunk[c["date"]].dt.normalize())
+        # Jumlahan selalu float64 walau kolom sumber sudah di-downcast
+        frame[c["qty"]] = chunk[c["qty"]].astype("float64")
+        frame[ROWS] = 1
+        if c.get("distance") and c["distance"] in chunk.columns:
+            dist = pd.to_numeric(chunk[c["distance"]], errors="coerce").astype("float64")
+            frame[DIST_SUM] = dist.fillna(0)
+            frame[DIST_CNT] = dist.notna().astype("int64")
+            # Volume x jarak untuk produktivitas berbobot jarak
+            frame[QTY_DIST] = frame[c["qty"]] * frame[DIST_SUM]
+
+        part = self._reduce(frame)
+        trip = chunk[c["trip"]]
+        has_trip = trip.notna().to_numpy()
+        trips = unique_trips(frame.loc[has_trip, self.dims].assign(**{TRIP_KEY: trip_keys(trip[has_trip])}), self.dims)
+
+        self._parts.append(part)
+        self._trip_parts.append(trips)
+        self.rows += len(chunk)
+        self._pending += len(part) + len(trips)
+        if self._pending >= self.compact_rows:
+            self._compact()
+
+    def result(self) -> Cube:
+        if not self._parts:
+            empty = pd.DataFrame(columns=self.dims + [self.cols["qty"], ROWS])
+            return Cube(cube=empty, trips=pd.DataFrame(columns=self.dims + [TRIP_KEY]), cols=self.cols)
+        self._compact()
+        cube = self._parts[0].reset_index(drop=True)
+        trips = self._trip_parts[0].reset_index(drop=True)
+        return Cube(cube=cube, trips=trips, cols=self.cols, rows=self.rows)
+
+
+BUILD_CHUNK_ROWS = 100_000
+
+
+def build_cube(df: pd.DataFrame, cols: dict, chunk_rows: int = BUILD_CHUNK_ROWS) -> Cube:
+    # Satu kali scan atas seluruh baris; semua chart & KPI diambil dari hasil ini.
+    # Frame diumpankan per potongan agar memori sementara reduksi tetap kecil
+    builder = CubeBuilder(cols)
+    for start in range(0, len(df), chunk_rows):
+        builder.add(df.iloc[start:start + chunk_rows])
+    return builder.result()
+
+
+def merge_cubes(a: Cube, b: Cube) -> Cube:
+    # Cube bisa digabung karena semua ukurannya aditif (jumlah) atau himpunan (trip)
+    dims = cube_dims(a.cols)
+    cube = reduce_groups(concat_coded([a.cube, b.cube]), dims)
+    trips = unique_trips(concat_coded([a.trips, b.trips]), dims)
+    return Cube(cube=cube, trips=trips, cols=a.cols, rows=a.rows + b.rows)
+
+
+# ========== MULTI FILE ==========
+# Gabungan beberapa file harian/bulanan. Setiap file baru hanya di-parse (lewat cache
+# dataset) dan diagregasi sekali; baris dengan dp no yang sudah ada di file
+# sebelumnya dibuang, lalu cube-nya digabung ke cube yang sudah ada.
+class MergedDataset:
+    def __init__(self, cols: dict):
+        self.cols = cols
+        self.keys: list[str] = []
+        self.frames: list[pd.DataFrame] = []
+        self.cube: Cube | None = None
+        self.duplicates = 0
+        self._seen = np.empty(0, dtype=np.uint64)
+        self._series: dict[str | None, DailySeries] = {}
+
+    def append(self, ds: Dataset) -> int:
+        c = self.cols
+        df = align_columns(ds.df, ds.cols, c)
+        trip = df[c["trip"]]
+        has_trip = trip.notna().to_numpy()
+        hashes = trip_keys(trip[has_trip])
+        dup = np.zeros(len(df), dtype=bool)
+        dup[has_trip] = np.isin(hashes, self._seen)
+        # Tanpa duplikat frame dari store dipakai langsung, tidak disalin
+        new = df.loc[~dup] if dup.any() else df
+
+        self._seen = np.union1d(self._seen, hashes)
+        part = build_cube(new, c)
+        self.cube = part if self.cube is None else merge_cubes(self.cube, part)
+        for dim, series in self._series.items():
+            series.append(DailySeries.from_cube(part.cube, c["date"], dim, c["qty"]))
+        self.frames.append(new)
+        self.keys.append(ds.key)
+        self.duplicates += int(dup.sum())
+        return len(new)
+
+    def series(self, dim: str | None) -> DailySeries:
+        # Deret harian per dimensi dibangun sekali, lalu diperbarui di setiap append
+        if dim not in self._series:
+            self._series[dim] = DailySeries.from_cube(self.cube.cube, self.cols["date"], dim, self.cols["qty"])
+        return self._series[dim]
+
+    @property
+    def rows(self) -> int:
+        return self.cube.rows if self.cube is not None else 0
+
+    @property
+    def df(self) -> pd.DataFrame:
+        # Baris mentah hanya digabung saat benar-benar dibutuhkan (export); potongan lama
+        # diganti hasil gabungan agar baris tidak disimpan dua kali
+        if len(self.frames) > 1:
+            self.frames = [pd.concat(self.frames, ignore_index=True)]
+        return self.frames[0]
+
+
+# ========== ROLL-UP ==========
+def rollup(cube: pd.DataFrame, dims, qty: str, name: str = "Total Volume") -> pd.DataFrame:
+    return (
+        cube.groupby(dims, as_index=False, observed=True)[qty]
+        .sum()
+        .rename(columns={qty: name})
+    )
+
+
+def trips_by(trips: pd.DataFrame, dim: str, name: str = "Total Trip") -> pd.DataFrame:
+    return (
+        trips.groupby(dim, as_index=False, observed=True)[TRIP_KEY]
+        .nunique()
+        .rename(columns={TRIP_KEY: name})
+    )
+
+
+def cube_kpis(cube: pd.DataFrame, trips: pd.DataFrame, cols: dict) -> dict:
+    return {
+        "area":  cube[cols["area"]].nunique() if cols.get("area") else 0,
+        "plant": cube[cols["plant"]].nunique() if cols.get("plant") else 0,
+        "truck": cube[cols["truck"]].nunique() if cols.get("truck") else 0,
+        "trip":  trips[TRIP_KEY].nunique(),
+        "vol":   float(cube[cols["qty"]].sum()),
+    }
+
+
+KPI_LABELS = {
+    "area": "Total Area",
+    "plant": "Total Plant",
+    "truck": "Total Truck",
+    "trip": "Total Trip",
+    "vol": "Total Volume",
+}
+
+
+def kpi_table(kpis: dict, rows: int, start, end) -> pd.DataFrame:
+    days = (end - start).days + 1 if pd.notna(start) else 0
+    values = {KPI_LABELS[k]: v for k, v in kpis.items()}
+    values["Avg Vol/Day"] = kpis["vol"] / days if days else 0
+    values["Avg Load/Trip"] = kpis["vol"] / kpis["trip"] if kpis["trip"] else 0
+    values["Baris Data"] = rows
+    values["Tanggal Awal"] = start
+    values["Tanggal Akhir"] = end
+    return pd.DataFrame({"KPI": list(values), "Nilai": list(values.values())})
+
+
+def avg_distance(cube: pd.DataFrame, dim: str) -> pd.DataFrame:
+    g = cube.groupby(dim, as_index=False, observed=True)[[DIST_SUM, DIST_CNT]].sum()
+    g["Avg Distance"] = np.where(g[DIST_CNT] > 0, g[DIST_SUM] / g[DIST_CNT].where(g[DIST_CNT] > 0, 1), np.nan)
+    return g[[dim, "Avg Distance"]]
+
+
+# Tabel ringkasan per dimensi (dipakai batch & export): volume, trip, load/trip, jarak
+SUMMARY_TABLES = {
+    "Harian": "date",
+    "Area": "area",
+    "Plant": "plant",
+    "Truck": "truck",
+    "Sales": "sales",
+    "End Customer": "endcust",
+}
+
+
+def summary_tables(cb: Cube) -> dict[str, pd.DataFrame]:
+    c = cb.cols
+    out = {}
+    for label, role in SUMMARY_TABLES.items():
+        dim = c.get(role)
+        if not dim:
+            continue
+        t = rollup(cb.cube, dim, c["qty"]).merge(trips_by(cb.trips, dim), on=dim, how="left")
+        t["Total Trip"] = t["Total Trip"].fillna(0).astype("int64")
+        t["Avg Load/Trip"] = np.where(t["Total Trip"] > 0, t["Total Volume"] / t["Total Trip"].where(t["Total Trip"] > 0, 1), 0)
+        if DIST_SUM in cb.cube.columns:
+            t = t.merge(avg_distance(cb.cube, dim), on=dim, how="left")
+        out[label] = t.sort_values(dim if role == "date" else "Total Volume", ascending=role == "date", ignore_index=True)
+    return out
+
+
+def stream_cube(source, name: str, chunksize: int = 50_000, progress=None) -> Cube:
+    builder = None
+    for chunk, cols in iter_prepared_chunks(source, name, chunksize):
+        if builder is None:
+            builder = CubeBuilder(cols)
+        builder.add(chunk)
+        if progress is not None:
+            progress(builder.rows)
+    if builder is None:
+        raise ValueError("File tidak berisi data")
+    return builder.result()
+
+
+def filter_active(value) -> bool:
+    # Filter boleh satu nilai atau daftar nilai (multi-select); kosong/"All" = tidak aktif
+    if isinstance(value, (list, tuple, set)):
+        return len(value) > 0
+    return value not in (None, "All")
+
+
+# ========== INDEX FILTER ==========
+# Frame diurutkan per tanggal sekali saja; rentang tanggal dicari dengan searchsorted
+# dan area/plant disimpan sebagai daftar posisi baris per nilai. Filter menjadi
+# slice (tanpa salin) atau take atas posisi, bukan mask .dt.date / .astype(str).
+class FilterIndex:
+    def __init__(self, frame: pd.DataFrame, date_col: str, dims: list[str]):
+        dates = frame[date_col].to_numpy()
+        if len(dates) and not (dates[1:] >= dates[:-1]).all():
+            frame = frame.iloc[np.argsort(dates, kind="stable")]
+        self.frame = frame.reset_index(drop=True)
+        self.date_col = date_col
+        self.dims = list(dims)
+        self._dates = self.frame[date_col].to_numpy()
+        self._positions: dict[str, dict[str, np.ndarray]] = {}
+        for d in dims:
+            codes, uniques = pd.factorize(self.frame[d])
+            order = np.argsort(codes, kind="stable")
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            # Posisi dengan kode -1 (NaN) ada di awal urutan
+            start = int((codes < 0).sum())
+            groups = np.split(order[start:], np.cumsum(counts)[:-1]) if len(uniques) else []
+            self._positions[d] = {str(u): g for u, g in zip(uniques, groups)}
+
+    def levels(self, dim: str) -> list[str]:
+        return sorted(self._positions[dim])
+
+    def date_bounds(self, start, end) -> tuple[int, int]:
+        lo = np.searchsorted(self._dates, pd.Timestamp(start).to_datetime64(), side="left")
+        hi = np.searchsorted(self._dates, (pd.Timestamp(end) + pd.Timedelta(days=1)).to_datetime64(), side="left")
+        return int(lo), int(hi)
+
+    def positions(self, start=None, end=None, filters: dict | None = None) -> np.ndarray | slice:
+        lo, hi = (0, len(self.frame)) if start is None else self.date_bounds(start, end)
+        pos = None
+        empty = np.empty(0, dtype=np.intp)
+        for dim, value in (filters or {}).items():
+            if dim is None or not filter_active(value):
+                continue
+            index = self._positions[dim]
+            if isinstance(value, (list, tuple, set)):
+                # Multi-select: gabungan daftar posisi per nilai (saling lepas, cukup diurutkan)
+                p = np.sort(np.concatenate([index.get(str(v), empty) for v in value]))
+            else:
+                p = index.get(str(value), empty)
+            p = p[np.searchsorted(p, lo):np.searchsorted(p, hi)]
+            pos = p if pos is None else np.intersect1d(pos, p, assume_unique=True)
+        return slice(lo, hi) if pos is None else pos
+
+    def select(self, start=None, end=None, filters: dict | None = None) -> pd.DataFrame:
+        pos = self.positions(start, end, filters)
+        if isinstance(pos, slice):
+            return self.frame.iloc[pos]
+        return self.frame.take(pos)
+
+    def values(self, dim: str, filters: dict | None = None) -> list[str]:
+        sub = self.select(filters=filters)
+        return sorted(sub[dim].dropna().astype(str).unique().tolist())
+
+
+# ========== ROLL-UP HIRARKI ==========
+# Drill-down area -> plant -> truck / sales -> end customer. Setiap level disimpan
+# sebagai cube yang sudah digulung ke (tanggal, leluhur, level) dan diindeks. Chart
+# sebuah level dibaca dari roll-up terkecil yang masih memuat semua filter aktif,
+# jadi satu langkah drill = lookup di agregat yang sudah ada.
+HIERARCHY = {
+    "area":    [],
+    "plant":   ["area"],
+    "truck":   ["area", "plant"],
+    "sales":   ["area", "plant"],
+    "endcust": ["area", "plant", "sales"],
+}
+
+
+class RollupIndex:
+    def __init__(self, base: FilterIndex, cols: dict):
+        self.base = base
+        self.cols = cols
+        cube = base.frame
+        date = cols["date"]
+        measures = [m for m in (cols["qty"], ROWS, DIST_SUM, DIST_CNT, QTY_DIST) if m in cube.columns]
+        self.levels: dict[str, FilterIndex] = {}
+        for role, parents in HIERARCHY.items():
+            if not cols.get(role):
+                continue
+            dims = [cols[r] for r in parents if cols.get(r)] + [cols[role]]
+            frame = cube.groupby([date] + dims, dropna=False, observed=True, sort=False, as_index=False)[measures].sum()
+            self.levels[role] = FilterIndex(frame, date, dims)
+
+    def index_for(self, role: str, filters: dict | None = None) -> FilterIndex:
+        active = {d for d, v in (filters or {}).items() if d is not None and filter_active(v)}
+        idx = self.levels.get(role)
+        if idx is None or not active <= set(idx.dims):
+            return self.base
+        return idx
+
+    def frame(self, role: str, start=None, end=None, filters: dict | None = None) -> pd.DataFrame:
+        return self.index_for(role, filters).select(start, end, filters)
+
+    def values(self, role: str, filters: dict | None = None) -> list[str]:
+        idx = self.index_for(role, filters)
+        if not any(filter_active(v) for v in (filters or {}).values()):
+            return idx.levels(self.cols[role])
+        return idx.values(self.cols[role], filters)
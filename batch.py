@@ -0,0 +1,136 @@
+import argparse
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+import charts
+from aggregate import KPI_LABELS, build_cube, cube_kpis, kpi_table, summary_tables
+from ingest import MAX_WORKERS, SNAPSHOT_DIR, load_dataset
+
+# ========== BATCH REPORT ==========
+# Ringkasan harian tanpa UI: setiap workbook di folder input diproses dengan deteksi
+# kolom & agregasi yang sama dengan dashboard, lalu ditulis ke XLSX + chart.
+PATTERNS = ("*.xlsx", "*.xlsm", "*.xls", "*.csv")
+
+
+def find_inputs(folder: Path, recursive: bool = False) -> list[Path]:
+    files = set()
+    for pattern in PATTERNS:
+        files.update(folder.rglob(pattern) if recursive else folder.glob(pattern))
+    # File lock Excel (~$...) diabaikan
+    return sorted(f for f in files if not f.name.startswith("~$"))
+
+
+def write_workbook(path: Path, kpis: pd.DataFrame, tables: dict[str, pd.DataFrame]) -> None:
+    with pd.ExcelWriter(path, engine="xlsxwriter", datetime_format="yyyy-mm-dd", date_format="yyyy-mm-dd") as writer:
+        kpis.to_excel(writer, sheet_name="KPI", index=False)
+        writer.sheets["KPI"].set_column(0, 1, 22)
+        for name, table in tables.items():
+            table.to_excel(writer, sheet_name=name, index=False)
+            writer.sheets[name].set_column(0, len(table.columns) - 1, 18)
+
+
+def write_charts(folder: Path, tables: dict[str, pd.DataFrame], cols: dict, fmt: str) -> int:
+    theme = charts.THEMES["Light"]
+    folder.mkdir(parents=True, exist_ok=True)
+    written = 0
+    for name, table in tables.items():
+        dim = table.columns[0]
+        title = f"Total Volume per {name}"
+        if dim == cols["date"]:
+            fig = charts.line_chart(table, dim, "Total Volume", title, theme=theme)
+        else:
+            fig = charts.bar_desc(table[[dim, "Total Volume"]], dim, "Total Volume", title, None, None,
+                                  theme["chart_template"], theme=theme)
+        if fig is None:
+            continue
+        target = folder / f"{name.lower().replace(' ', '_')}.{fmt}"
+        if fmt == "html":
+            fig.write_html(target, include_plotlyjs="cdn")
+        else:
+            # PNG butuh paket kaleido
+            fig.write_image(target)
+        written += 1
+    return written
+
+
+def process_file(path: str, out_dir: str, chart_format: str = "html", compact: bool = True,
+                 all_sheets: bool = False, use_snapshot: bool = True) -> dict:
+    # Dijalankan di worker; parse per sheet tidak diparalelkan lagi (workers=1)
+    t0 = time.perf_counter()
+    src = Path(path)
+    ds = load_dataset(
+        src.read_bytes(), None, SNAPSHOT_DIR if use_snapshot else None, name=src.name,
+        compact=compact, all_sheets=all_sheets, workers=1,
+    )
+    cb = build_cube(ds.df, ds.cols)
+    tables = summary_tables(cb)
+    dates = cb.cube[ds.cols["date"]]
+    kpis = cube_kpis(cb.cube, cb.trips, ds.cols)
+
+    target = Path(out_dir) / src.stem
+    target.mkdir(parents=True, exist_ok=True)
+    write_workbook(target / "summary.xlsx", kpi_table(kpis, cb.rows, dates.min(), dates.max()), tables)
+    n_charts = write_charts(target / "charts", tables, ds.cols, chart_format) if chart_format != "none" else 0
+    return {
+        "file": src.name,
+        "status": "ok",
+        "rows": cb.rows,
+        **{KPI_LABELS[k]: v for k, v in kpis.items()},
+        "charts": n_charts,
+        "seconds": round(time.perf_counter() - t0, 3),
+        "output": str(target),
+    }
+
+
+def run_batch(files: list[Path], out_dir: Path, workers: int | None = None, **options) -> pd.DataFrame:
+    workers = min(workers or MAX_WORKERS, len(files)) or 1
+    results = []
+    # "spawn" sama seperti parse paralel di ingest; jumlah worker dibatasi
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = {pool.submit(process_file, str(f), str(out_dir), **options): f for f in files}
+        for done, fut in enumerate(as_completed(futures), start=1):
+            src = futures[fut]
+            try:
+                result = fut.result()
+            except Exception as e:
+                result = {"file": src.name, "status": f"gagal: {e}"}
+            results.append(result)
+            print(f"[{done}/{len(files)}] {src.name}: {result['status']}", flush=True)
+    return pd.DataFrame(results).sort_values("file", ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Buat ringkasan harian (XLSX + chart) untuk semua file di satu folder")
+    parser.add_argument("input", type=Path, help="Folder berisi file Excel/CSV")
+    parser.add_argument("--out", type=Path, default=Path("reports"))
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah proses paralel (default: SUMMARY_WORKERS / jumlah CPU)")
+    parser.add_argument("--charts", choices=["html", "png", "none"], default="html")
+    parser.add_argument("--recursive", action="store_true", help="Cari file di subfolder juga")
+    parser.add_argument("--all-sheets", action="store_true", help="Baca semua sheet per workbook")
+    parser.add_argument("--no-compact", action="store_true", help="Nonaktifkan mode hemat memori")
+    parser.add_argument("--no-snapshot", action="store_true", help="Jangan pakai/simpan snapshot Arrow")
+    args = parser.parse_args(argv)
+
+    files = find_inputs(args.input, args.recursive)
+    if not files:
+        print(f"Tidak ada file Excel/CSV di {args.input}", file=sys.stderr)
+        return 1
+    args.out.mkdir(parents=True, exist_ok=True)
+    summary = run_batch(
+        files, args.out, args.workers, chart_format=args.charts, compact=not args.no_compact,
+        all_sheets=args.all_sheets, use_snapshot=not args.no_snapshot,
+    )
+    summary.to_csv(args.out / "batch_summary.csv", index=False)
+    failed = int((summary["status"] != "ok").sum())
+    print(f"{len(summary) - failed}/{len(summary)} file berhasil, ringkasan di {args.out / 'batch_summary.csv'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
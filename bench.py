@@ -0,0 +1,206 @@
+import argparse
+import io
+import json
+import platform
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import charts
+from timeseries import DailySeries
+from utilization import truck_utilization
+from aggregate import (
+    TRIP_KEY, FilterIndex, avg_distance, build_cube, rollup, stream_cube, trips_by,
+)
+from ingest import (
+    compact_frame, convert_types, detect_columns, engines_for, normalize_columns, rank_columns,
+    read_with_engine,
+)
+
+# ========== DATA SINTETIS ==========
+def make_deliveries(
+    rows: int,
+    areas: int = 8,
+    plants: int = 40,
+    trucks: int = 500,
+    sales: int = 60,
+    customers: int = 2000,
+    days: int = 31,
+    rows_per_trip: float = 1.0,
+    seed: int = 0,
+) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    plant_area = rng.integers(0, areas, plants)
+    plant = rng.integers(0, plants, rows)
+    start = np.datetime64("2024-01-01")
+    n_trips = max(int(rows / rows_per_trip), 1)
+    return pd.DataFrame({
+        "Dp Date": start + rng.integers(0, days, rows).astype("timedelta64[D]"),
+        "Qty": rng.choice([3.0, 4.0, 5.0, 6.0, 7.0, 7.5], rows),
+        "Sales Man": np.char.add("SALES ", rng.integers(0, sales, rows).astype(str)),
+        "Dp No": np.char.add("DP", rng.integers(0, n_trips, rows).astype(str)) if rows_per_trip > 1
+                 else np.char.add("DP", np.arange(rows).astype(str)),
+        "Area": np.char.add("AREA ", plant_area[plant].astype(str)),
+        "Plant Name": np.char.add("PLANT ", plant.astype(str)),
+        "Distance": rng.gamma(2.0, 8.0, rows).round(1),
+        "Truck No": np.char.add("B ", rng.integers(1000, 1000 + trucks, rows).astype(str)),
+        "End Customer Name": np.char.add("CUSTOMER ", rng.integers(0, customers, rows).astype(str)),
+    })
+
+
+def to_workbook(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    df.to_excel(buf, index=False, engine="xlsxwriter")
+    return buf.getvalue()
+
+
+# ========== TIMER ==========
+def timed(fn, repeat: int = 1):
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return result, {"min_s": min(times), "median_s": statistics.median(times), "runs": repeat}
+
+
+def run_case(rows: int, repeat: int = 3, **gen) -> dict:
+    stages = {}
+
+    def stage(name, fn, n=repeat):
+        result, stat = timed(fn, n)
+        stages[name] = stat
+        return result
+
+    raw = make_deliveries(rows, **gen)
+    data = stage("write_xlsx", lambda: to_workbook(raw), 1)
+
+    # Ingest
+    # Bandingkan semua engine yang terpasang; hasil engine pertama dipakai selanjutnya
+    engines = engines_for("bench.xlsx")
+    for engine in reversed(engines):
+        df_raw = stage(f"excel_parse[{engine}]", lambda e=engine: read_with_engine(data, "bench.xlsx", engine=e)[0], 1)
+    df = stage("normalize_columns", lambda: normalize_columns(df_raw))
+    stage("rank_columns", lambda: rank_columns(list(df.columns)))
+    cols = stage("detect_columns", lambda: detect_columns(df))
+    df = stage("convert_types", lambda: convert_types(df.copy(), cols))
+    small, memory = stage("compact_frame", lambda: compact_frame(df, cols))
+    stage("stream_cube", lambda: stream_cube(io.BytesIO(data), "bench.xlsx"), 1)
+
+    # Filter (mask lama vs index)
+    d0 = df[cols["date"]].min().date()
+    d1 = d0 + timedelta(days=6)
+    plant = str(df[cols["plant"]].iloc[0])
+    stage("filter_mask", lambda: df.loc[
+        (df[cols["date"]].dt.date >= d0) & (df[cols["date"]].dt.date <= d1)
+        & (df[cols["plant"]].astype(str) == plant)
+    ].copy())
+    idx = stage("filter_index_build", lambda: FilterIndex(small, cols["date"], [cols["area"], cols["plant"]]), 1)
+    stage("filter_index_select", lambda: idx.select(d0, d1, {cols["plant"]: plant}))
+
+    # Groupby mentah (jalur lama) per chart
+    q = cols["qty"]
+    for role in ("area", "date", "plant", "truck", "sales", "endcust"):
+        c = cols[role]
+        stage(f"groupby_sum_{role}", lambda c=c: df.groupby(c, as_index=False)[q].sum())
+    stage("groupby_nunique_trip_truck", lambda: df.groupby(cols["truck"], as_index=False)[cols["trip"]].nunique())
+    stage("groupby_mean_distance_area", lambda: df.groupby(cols["area"], as_index=False)[cols["distance"]].mean())
+
+    # Cube & roll-up
+    cb = stage("build_cube", lambda: build_cube(small, cols), 1)
+    for role in ("area", "date", "plant", "truck", "sales", "endcust"):
+        c = cols[role]
+        stage(f"rollup_{role}", lambda c=c: rollup(cb.cube, c, q))
+    trips_truck = stage("rollup_trips_truck", lambda: trips_by(cb.trips, cols["truck"]))
+    stage("rollup_distance_area", lambda: avg_distance(cb.cube, cols["area"]))
+
+    # Utilisasi truck: tiga pass lama vs satu pass matriks
+    d_first, d_last = cb.cube[cols["date"]].min(), cb.cube[cols["date"]].max()
+    stage("truck_utilization", lambda: truck_utilization(cb.cube, cb.trips, cols, d_first, d_last))
+    stage("truck_rollup_trips_merge", lambda: rollup(cb.cube, cols["truck"], q).merge(
+        trips_by(cb.trips, cols["truck"]), on=cols["truck"], how="left"))
+
+    # Deret harian & jendela tren
+    series = stage("series_build_plant", lambda: DailySeries.from_cube(cb.cube, cols["date"], cols["plant"], q), 1)
+    stage("series_rolling_7", lambda: series.rolling_mean(7))
+    stage("series_compare", lambda: series.compare(series.daily.index[-1]))
+    stage("groupby_rolling_7_plant", lambda: df.groupby([cols["plant"], df[cols["date"]].dt.normalize()])[q].sum()
+          .groupby(level=0).rolling(7, min_periods=1).mean())
+
+    # Trip unik eksak dari pasangan trip: total & dengan filter tanggal + plant
+    exact = stage("trip_total", lambda: cb.trips[TRIP_KEY].nunique())
+    trip_idx = stage("trip_index_build", lambda: FilterIndex(cb.trips, cols["date"], [cols["area"], cols["plant"]]), 1)
+    stage("trip_filtered_total", lambda: trip_idx.select(d0, d1, {cols["plant"]: plant})[TRIP_KEY].nunique())
+
+    # Figure
+    theme = charts.THEMES["Light"]
+    vol_truck = rollup(cb.cube, cols["truck"], q)
+    # Waktu bangun figure diukur lewat fungsi asli (.uncached) agar tidak terbaca sebagai cache hit
+    fig = stage("fig_bar_desc_truck", lambda: charts.bar_desc.uncached(
+        vol_truck, cols["truck"], "Total Volume", "Total Volume per Truck", None, None, theme=theme))
+    stage("fig_bar_desc_truck_json", lambda: fig.to_json())
+    # Satu kali isi cache, lalu ukur lookup untuk agregat & theme yang sama (hash frame + LRU)
+    charts.bar_desc(vol_truck, cols["truck"], "Total Volume", "Total Volume per Truck", None, None, theme=theme)
+    stage("fig_bar_desc_truck_cached", lambda: charts.bar_desc(
+        vol_truck, cols["truck"], "Total Volume", "Total Volume per Truck", None, None, theme=theme))
+    vol_plant = rollup(cb.cube, cols["plant"], q, "Actual")
+    vol_plant["Target"] = vol_plant["Actual"] * 1.1
+    fig = stage("fig_bar_with_target_line", lambda: charts.bar_with_target_line.uncached(
+        vol_plant, cols["plant"], "Actual", "Target", "Total Volume per Plant Name (vs Target)", theme=theme))
+    stage("fig_bar_with_target_line_json", lambda: fig.to_json())
+
+    return {
+        "rows": rows,
+        "params": gen,
+        "xlsx_mb": round(len(data) / 1024 ** 2, 3),
+        "frame_mb": round(df.memory_usage(deep=True).sum() / 1024 ** 2, 3),
+        "compact_mb": round(small.memory_usage(deep=True).sum() / 1024 ** 2, 3),
+        "cube_rows": len(cb.cube),
+        "trip_pairs": len(cb.trips),
+        "trucks": len(trips_truck),
+        "trip_exact": int(exact),
+        "engines": engines,
+        "stages": stages,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline dashboard dengan data sintetis")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--areas", type=int, default=8)
+    parser.add_argument("--plants", type=int, default=40)
+    parser.add_argument("--trucks", type=int, default=500)
+    parser.add_argument("--sales", type=int, default=60)
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=31)
+    parser.add_argument("--rows-per-trip", type=float, default=2.0,
+                        help="Rata-rata baris per dp no (1 = setiap baris trip sendiri)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    gen = dict(areas=args.areas, plants=args.plants, trucks=args.trucks, sales=args.sales,
+               customers=args.customers, days=args.days, rows_per_trip=args.rows_per_trip, seed=args.seed)
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "cases": [],
+    }
+    for rows in args.rows:
+        case = run_case(rows, repeat=args.repeat, **gen)
+        results["cases"].append(case)
+        slowest = sorted(case["stages"].items(), key=lambda kv: -kv[1]["min_s"])[:5]
+        print(f"{rows:>10,} baris: " + ", ".join(f"{k}={v['min_s']:.3f}s" for k, v in slowest))
+
+    with open(args.out, "w") as fh:
+        json.dump(results, fh, indent=2)
+    print(f"Hasil disimpan ke {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+
+# ========== THEME & COLOR ==========
+THEMES = {
+    "Dark": {
+        "chart_template": "plotly_dark",
+        "base_bg": "#0b0f19",
+        "card_bg": "#0f172a",
+        "text_color": "#FFFFFF",
+        "accent": "#00E5FF",        # Cyan Neon
+        "accent_light": "#FF00FF",  # Magenta Neon
+        "futur_colors": ["#00E5FF", "#FF00FF", "#39FF14", "#FFEA00", "#FF4D4D"],
+        "font_color": "#fff",
+        "bg_plot": "rgba(10,10,30,0.9)",
+        "bg_paper": "rgba(5,5,20,1)",
+        "txt_color": "white",
+    },
+    "Light": {
+        "chart_template": "plotly_white",
+        "base_bg": "#FFFFFF",
+        "card_bg": "#F8FAFC",
+        "text_color": "#111827",
+        "accent": "#2563EB",
+        "accent_light": "#7C3AED",
+        "futur_colors": ["#2563EB", "#7C3AED", "#06B6D4", "#D946EF", "#F59E0B"],
+        "font_color": "#111827",
+        "bg_plot": "white",
+        "bg_paper": "white",
+        "txt_color": "black",
+    },
+}
+
+# Batas default payload chart: jumlah bar per chart & titik per deret waktu
+TOP_N = 50
+MAX_POINTS = 500
+OTHERS_LABEL = "Others"
+
+
+# ========== TEMPLATE LAYOUT PER THEME ==========
+# Warna latar, font & garis sumbu dirakit sekali per theme sebagai template Plotly;
+# setiap figure cukup merujuk template tersebut, bukan update_layout/update_axes lagi.
+def build_layout_template(theme) -> go.layout.Template:
+    tpl = go.layout.Template(pio.templates[theme["chart_template"]])
+    axis = dict(linecolor=theme["accent"], gridcolor=theme["accent_light"])
+    tpl.layout.update(
+        plot_bgcolor=theme["bg_plot"],
+        paper_bgcolor=theme["bg_paper"],
+        font=dict(color=theme["txt_color"]),
+        xaxis=axis,
+        yaxis=axis,
+    )
+    return tpl
+
+
+LAYOUT_TEMPLATES = {name: build_layout_template(theme) for name, theme in THEMES.items()}
+
+
+def theme_name(theme) -> str:
+    for name, t in THEMES.items():
+        if t is theme or t == theme:
+            return name
+    return theme["chart_template"]
+
+
+def layout_template(theme, template=None):
+    # template string lain (selain bawaan theme) tetap dihormati
+    if template not in (None, theme["chart_template"]):
+        return template
+    name = theme_name(theme)
+    if name not in LAYOUT_TEMPLATES:
+        LAYOUT_TEMPLATES[name] = build_layout_template(theme)
+    return LAYOUT_TEMPLATES[name]
+
+
+# ========== CACHE FIGURE ==========
+# Figure disimpan per (jenis chart, hash agregat, theme, argumen). Rerun karena widget
+# lain atau bolak-balik Light/Dark memakai figure yang sama tanpa membangun ulang.
+FIGURE_CACHE_SIZE = 128
+_figures: OrderedDict = OrderedDict()
+_figures_lock = threading.Lock()
+figure_stats = {"hits": 0, "misses": 0}
+
+
+def frame_digest(df: pd.DataFrame) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update("|".join(f"{c}:{t}" for c, t in df.dtypes.items()).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def memo_figure(fn):
+    @functools.wraps(fn)
+    def wrapper(df, *args, theme=THEMES["Light"], **kwargs):
+        try:
+            key = (fn.__name__, frame_digest(df), theme_name(theme), args, tuple(sorted(kwargs.items())))
+            hash(key)
+        except TypeError:  # data/argumen tidak bisa di-hash -> bangun tanpa cache
+            return fn(df, *args, theme=theme, **kwargs)
+        with _figures_lock:
+            fig = _figures.get(key)
+            if fig is not None:
+                _figures.move_to_end(key)
+                figure_stats["hits"] += 1
+                return fig
+        fig = fn(df, *args, theme=theme, **kwargs)
+        with _figures_lock:
+            figure_stats["misses"] += 1
+            _figures[key] = fig
+            while len(_figures) > FIGURE_CACHE_SIZE:
+                _figures.popitem(last=False)
+        return fig
+    wrapper.uncached = fn
+    return wrapper
+
+
+# ========== PAYLOAD REDUCER ==========
+def reduce_categories(df, x, values, top_n=TOP_N, agg="sum", order_by=None):
+    # Simpan top_n kategori teratas, sisanya digabung menjadi satu bar "Others"
+    if not top_n or len(df) <= top_n:
+        return df
+    values = [values] if isinstance(values, str) else list(values)
+    order_by = order_by or values[0]
+    data = df.sort_values(order_by, ascending=False)
+    head, rest = data.iloc[:top_n], data.iloc[top_n:]
+    others = {x: f"{OTHERS_LABEL} ({len(rest):,})"}
+    for v in values:
+        others[v] = rest[v].mean() if agg == "mean" else rest[v].sum()
+    return pd.concat([head.astype({x: object}), pd.DataFrame([others])], ignore_index=True)
+
+
+def lttb(df, x, y, max_points=MAX_POINTS):
+    # Largest-Triangle-Three-Buckets: pertahankan bentuk deret dengan max_points titik
+    n = len(df)
+    if not max_points or max_points < 3 or n <= max_points:
+        return df
+    data = df.sort_values(x)
+    xs = data[x].to_numpy()
+    if np.issubdtype(xs.dtype, np.datetime64):
+        xs = xs.astype("datetime64[ns]").astype("int64").astype(float)
+    elif np.issubdtype(xs.dtype, np.number):
+        xs = xs.astype(float)
+    else:
+        return df
+    ys = pd.to_numeric(data[y], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+    every = (n - 2) / (max_points - 2)
+    picked = [0]
+    a = 0
+    for i in range(max_points - 2):
+        start = int(np.floor(i * every)) + 1
+        end = int(np.floor((i + 1) * every)) + 1
+        nxt_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        if end >= nxt_end:
+            avg_x, avg_y = xs[n - 1], ys[n - 1]
+        else:
+            avg_x, avg_y = xs[end:nxt_end].mean(), ys[end:nxt_end].mean()
+        area = np.abs((xs[a] - avg_x) * (ys[start:end] - ys[a]) - (xs[a] - xs[start:end]) * (avg_y - ys[a]))
+        a = start + int(area.argmax())
+        picked.append(a)
+    picked.append(n - 1)
+    return data.iloc[picked]
+
+
+def reduce_payload(df, x, values, top_n=TOP_N, max_points=MAX_POINTS, agg="sum"):
+    # Deret waktu di-decimate (LTTB), dimensi kategori dipotong top-N + Others
+    values = [values] if isinstance(values, str) else list(values)
+    if pd.api.types.is_datetime64_any_dtype(df[x]):
+        return lttb(df, x, values[0], max_points)
+    return reduce_categories(df, x, values, top_n, agg)
+
+
+# ---------- BAR CHART ----------
+@memo_figure
+def bar_desc(df, x, y, title, color_base, color_highlight, template="plotly_white", is_avg=False,
+             theme=THEMES["Light"], top_n=TOP_N, max_points=MAX_POINTS):
+    if df.empty:
+        return None
+    data = df.copy()
+    data[y] = pd.to_numeric(data[y], errors="coerce").fillna(0)
+    data = data.sort_values(y, ascending=False)
+    data = reduce_payload(data, x, y, top_n, max_points, agg="mean" if is_avg else "sum")
+
+    # Warna bar mengikuti nilai (skala kontinu theme), label diformat di sisi Plotly
+    label_fmt = ",.0f" if not is_avg else ".2f"
+    fig = go.Figure(go.Bar(
+        x=data[x], y=data[y],
+        marker=dict(color=data[y], colorscale=theme["futur_colors"]),
+        texttemplate=f"%{{y:{label_fmt}}}",
+        textposition="outside",
+        cliponaxis=False,
+    ))
+    fig.update_layout(
+        title=title, template=layout_template(theme, template),
+        xaxis_title=None, yaxis_title=None, bargap=0.35,
+    )
+    return fig
+
+
+# ---------- BAR CHART WITH TARGET LINE (DASH + ORANGE) ----------
+@memo_figure
+def bar_with_target_line(df, x, y_actual, y_target, title, template="plotly_white",
+                         theme=THEMES["Light"], top_n=TOP_N, y_projection=None, y_lower=None, y_upper=None):
+    if df.empty:
+        return None
+    values = [c for c in (y_actual, y_target, y_projection, y_lower, y_upper) if c]
+    df = reduce_categories(df, x, values, top_n)
+
+    # Buat figure dengan bar chart untuk actual
+    fig = go.Figure()
+
+    # Tambahkan bar chart untuk actual
+    fig.add_trace(go.Bar(
+        x=df[x],
+        y=df[y_actual],
+        name='Actual',
+        marker_color=theme["futur_colors"][0],
+        texttemplate="%{y:,.0f}",
+        textposition='outside',
+    ))
+
+    # Tambahkan line chart DASH untuk target dengan warna BLOOD MOON (merah darah)
+    if y_target:
+        fig.add_trace(go.Scatter(
+            x=df[x],
+            y=df[y_target],
+            name='Target',
+            mode='lines+markers+text',
+            line=dict(
+                color='#DC143C',  # Warna Blood Moon (Dark Red)
+                width=3,
+                dash='dash'  # Garis putus-putus
+            ),
+            marker=dict(
+                size=8,
+                color='#DC143C',  # Warna Blood Moon
+                symbol='circle'
+            ),
+            texttemplate="%{y:,.0f}",
+            textposition='top center',
+            textfont=dict(
+                color='#DC143C',  # Warna Blood Moon
+                size=12
+            )
+        ))
+
+    # Proyeksi akhir bulan dengan pita bawah/atas sebagai error bar
+    if y_projection:
+        error = None
+        if y_lower and y_upper:
+            error = dict(
+                type="data", symmetric=False,
+                array=df[y_upper] - df[y_projection],
+                arrayminus=df[y_projection] - df[y_lower],
+                color=theme["accent_light"],
+            )
+        fig.add_trace(go.Scatter(
+            x=df[x],
+            y=df[y_projection],
+            name='Proyeksi Akhir Bulan',
+            mode='markers',
+            marker=dict(size=10, color=theme["accent_light"], symbol='diamond'),
+            error_y=error,
+        ))
+
+    # Update layout
+    fig.update_layout(
+        title=title,
+        xaxis_title=None,
+        yaxis_title="Volume",
+        bargap=0.35,
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        template=layout_template(theme, template)
+    )
+
+    return fig
+
+
+# ---------- PIE CHART ----------
+@memo_figure
+def pie_chart(df, names, values, title, theme=THEMES["Light"], top_n=TOP_N):
+    if df.empty:
+        return None
+    df = reduce_categories(df, names, values, top_n)
+    fig = px.pie(
+        df, names=names, values=values, template=theme["chart_template"],
+        title=title, hole=0.35, color_discrete_sequence=theme["futur_colors"]
+    )
+    fig.update_traces(textinfo="percent+label")
+    return fig
+
+
+# ---------- GROUP BAR CHART ----------
+@memo_figure
+def group_bar(df, x, y, color, title, theme=THEMES["Light"], top_n=TOP_N):
+    if df.empty:
+        return None
+    # Top-N berdasarkan total x (semua grup warna), sisanya jadi "Others" per warna
+    totals = df.groupby(x, observed=True)[y].sum()
+    if top_n and len(totals) > top_n:
+        keep = totals.nlargest(top_n).index
+        label = f"{OTHERS_LABEL} ({len(totals) - top_n:,})"
+        df = df.assign(**{x: df[x].astype(object).where(df[x].isin(keep), label)})
+        df = df.groupby([x, color], as_index=False, observed=True, sort=False)[y].sum()
+    fig = px.bar(
+        df, x=x, y=y, color=color, template=theme["chart_template"],
+        title=title, barmode="group", color_discrete_sequence=theme["futur_colors"]
+    )
+    return fig
+
+
+# ---------- LINE CHART ----------
+@memo_figure
+def line_chart(df, x, y, title, theme=THEMES["Light"], max_points=MAX_POINTS, color=None):
+    if df.empty:
+        return None
+    if color:
+        # Decimate per deret agar tiap garis tetap utuh bentuknya
+        df = pd.concat([lttb(g, x, y, max_points) for _, g in df.groupby(color, sort=False)], ignore_index=True)
+    else:
+        df = lttb(df, x, y, max_points)
+    fig = px.line(
+        df, x=x, y=y, color=color, template=theme["chart_template"],
+        title=title, markers=True, color_discrete_sequence=theme["futur_colors"]
+    )
+    return fig
+
+
+# ---------- HEATMAP ----------
+@memo_figure
+def heatmap(matrix, title, theme=THEMES["Light"], top_n=TOP_N, label="Trip"):
+    # matrix: index = key (mis. truck), kolom = tanggal; baris dibatasi top_n total terbesar
+    if matrix.empty:
+        return None
+    if top_n and len(matrix) > top_n:
+        matrix = matrix.loc[matrix.sum(axis=1).nlargest(top_n).index]
+    fig = px.imshow(
+        matrix, aspect="auto", template=layout_template(theme), title=title,
+        color_continuous_scale=["rgba(0,0,0,0)", theme["accent"], theme["accent_light"]],
+        labels=dict(x="Tanggal", y=matrix.index.name, color=label),
+    )
+    fig.update_layout(height=max(400, 18 * len(matrix)))
+    return fig
@@ -0,0 +1,131 @@
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+from aggregate import filter_active
+
+# ========== EXPORT XLSX ==========
+# Workbook ditulis baris per baris dengan mode constant_memory xlsxwriter: setiap
+# baris langsung di-flush ke file sementara, jadi export jutaan baris tidak
+# menggandakan memori proses. Tabel ringkasan diambil dari cube yang sudah ada.
+EXCEL_MAX_ROWS = 1_048_576
+CHUNK_ROWS = 50_000
+
+
+def filter_rows(df: pd.DataFrame, date_col: str, start, end, filters: dict | None = None) -> pd.DataFrame:
+    dates = df[date_col]
+    mask = (dates >= pd.Timestamp(start)) & (dates < pd.Timestamp(end) + pd.Timedelta(days=1))
+    for dim, value in (filters or {}).items():
+        if dim is None or not filter_active(value):
+            continue
+        wanted = [str(v) for v in value] if isinstance(value, (list, tuple, set)) else [str(value)]
+        s = df[dim]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            hit = np.flatnonzero(s.cat.categories.astype(str).isin(wanted))
+            mask &= s.cat.codes.isin(hit)
+        else:
+            mask &= s.astype(str).isin(wanted)
+    return df.loc[mask]
+
+
+def _cells(frame: pd.DataFrame) -> list[list]:
+    # NaN/NaT tidak bisa ditulis xlsxwriter -> sel kosong
+    data = frame.astype(object)
+    return data.where(frame.notna(), None).values.tolist()
+
+
+def write_frame(wb, name: str, frame: pd.DataFrame, header_fmt, progress=None) -> int:
+    # Frame dipecah ke beberapa sheet jika melebihi batas baris Excel
+    per_sheet = EXCEL_MAX_ROWS - 1
+    parts = max((len(frame) + per_sheet - 1) // per_sheet, 1)
+    for part in range(parts):
+        ws = wb.add_worksheet(name if part == 0 else f"{name} ({part + 1})")
+        ws.write_row(0, 0, [str(c) for c in frame.columns], header_fmt)
+        ws.set_column(0, max(len(frame.columns) - 1, 0), 16)
+        ws.freeze_panes(1, 0)
+        body = frame.iloc[part * per_sheet:(part + 1) * per_sheet]
+        row = 1
+        for lo in range(0, len(body), CHUNK_ROWS):
+            for values in _cells(body.iloc[lo:lo + CHUNK_ROWS]):
+                ws.write_row(row, 0, values)
+                row += 1
+            if progress is not None:
+                progress(part * per_sheet + min(lo + CHUNK_ROWS, len(body)))
+    return len(frame)
+
+
+def write_export(path, tables: dict[str, pd.DataFrame], raw: pd.DataFrame | None = None, progress=None) -> None:
+    wb = xlsxwriter.Workbook(path, {
+        "constant_memory": True,
+        "default_date_format": "yyyy-mm-dd",
+        "strings_to_urls": False,
+    })
+    try:
+        header = wb.add_format({"bold": True, "bottom": 1})
+        for name, table in tables.items():
+            write_frame(wb, name, table, header)
+        if raw is not None:
+            write_frame(wb, "Data", raw, header, progress)
+    finally:
+        wb.close()
+
+
+# ========== EXPORT DI BACKGROUND ==========
+class ExportJob:
+    def __init__(self, tables: dict[str, pd.DataFrame], raw: pd.DataFrame | None = None, raw_filter=None):
+        # raw_filter dijalankan di thread agar filter baris mentah tidak menahan rerun
+        self.tables = tables
+        self.raw = raw
+        self.raw_filter = raw_filter
+        self.rows = 0
+        self.total = 0
+        self.error: Exception | None = None
+        self.seconds = 0.0
+        # Direktori sementara milik job; dihapus lewat cleanup() atau saat job di-GC
+        self._tmp = tempfile.TemporaryDirectory(prefix="summary-export-")
+        self.path = os.path.join(self._tmp.name, "summary.xlsx")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "ExportJob":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        t0 = time.perf_counter()
+        try:
+            raw = self.raw_filter(self.raw) if self.raw is not None and self.raw_filter else self.raw
+            self.total = len(raw) if raw is not None else 0
+
+            def progress(rows):
+                self.rows = rows
+
+            write_export(self.path, self.tables, raw, progress)
+        except Exception as e:
+            self.error = e
+            self.cleanup()
+        finally:
+            self.raw = None
+            self.seconds = time.perf_counter() - t0
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    @property
+    def done(self) -> bool:
+        return not self.running and self.error is None and self._thread.ident is not None
+
+    def data(self) -> bytes:
+        with open(self.path, "rb") as fh:
+            return fh.read()
+
+    def cleanup(self) -> None:
+        try:
+            self._tmp.cleanup()
+        except OSError:
+            pass
@@ -0,0 +1,186 @@
+import hashlib
+import multiprocessing
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ingest import MAX_WORKERS
+from timeseries import DailySeries
+
+try:
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+except ImportError:  # tanpa statsmodels dipakai rata-rata 7 hari terakhir
+    ExponentialSmoothing = None
+
+# ========== FORECAST AKHIR BULAN ==========
+# Model Holt-Winters (tren teredam + musiman mingguan) per plant/area dari deret
+# harian. Hasil di-cache per (dataset, key, tanggal terakhir). Parameter fit disimpan
+# per deret (scope, key, tanggal pertama), bukan per dataset: upload/append berikutnya
+# dengan hari baru dan riwayat lama yang sama di-fit ulang dari parameter lama sebagai
+# titik awal (tanpa grid search).
+SEASON = 7
+MIN_DAYS = 10
+MIN_SEASONAL_DAYS = 3 * SEASON
+HISTORY_DAYS = 180
+PARALLEL_MIN = 8
+BAND_Z = 1.96
+
+# Urutan start_params statsmodels: alpha, beta, gamma, l0, b0, phi, musiman
+PARAM_NAMES = [
+    "smoothing_level", "smoothing_trend", "smoothing_seasonal",
+    "initial_level", "initial_trend", "damping_trend", "initial_seasons",
+]
+
+
+def naive_forecast(y: np.ndarray, horizon: int) -> tuple[np.ndarray, float, None]:
+    recent = y[-SEASON:] if len(y) else np.zeros(1)
+    sigma = float(y[-30:].std()) if len(y) > 1 else 0.0
+    return np.full(horizon, float(recent.mean())), sigma, None
+
+
+def _param_vector(params: dict) -> np.ndarray:
+    values = []
+    for name in PARAM_NAMES:
+        v = params.get(name)
+        if v is None or (np.isscalar(v) and np.isnan(v)):
+            continue
+        values.extend(np.atleast_1d(v).tolist())
+    return np.asarray(values, dtype=float)
+
+
+def history_digest(values: np.ndarray) -> str:
+    return hashlib.blake2b(np.ascontiguousarray(values, dtype=float).tobytes(), digest_size=16).hexdigest()
+
+
+def fit_model(y: np.ndarray, start_params=None):
+    seasonal = len(y) >= MIN_SEASONAL_DAYS
+    model = ExponentialSmoothing(
+        y, trend="add", damped_trend=True,
+        seasonal="add" if seasonal else None, seasonal_periods=SEASON if seasonal else None,
+        initialization_method="estimated",
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        fit = None
+        if start_params is not None:
+            try:
+                fit = model.fit(start_params=start_params, use_brute=False)
+            except (ValueError, IndexError, np.linalg.LinAlgError):
+                # Struktur model berubah (mis. musiman baru aktif), fit dari awal
+                fit = None
+        if fit is None:
+            fit = model.fit()
+    return fit
+
+
+def fit_forecast(y: np.ndarray, horizon: int, start_params=None) -> tuple[np.ndarray, float, np.ndarray | None]:
+    # Dijalankan di worker: (jalur forecast harian, std residual, parameter untuk warm start)
+    if ExponentialSmoothing is None or len(y) < MIN_DAYS or np.ptp(y) == 0:
+        return naive_forecast(y, horizon)
+    fit = fit_model(y, start_params)
+    path = np.clip(np.asarray(fit.forecast(horizon), dtype=float), 0, None) if horizon else np.zeros(0)
+    sigma = float(np.nanstd(fit.resid))
+    return path, sigma, _param_vector(fit.params)
+
+
+def run_fits(tasks: list[tuple], workers: int | None = None) -> list:
+    # Sama seperti parse paralel: exception per task dikembalikan sebagai hasil
+    workers = min(workers or MAX_WORKERS, len(tasks))
+    if workers <= 1 or len(tasks) < PARALLEL_MIN:
+        results = []
+        for task in tasks:
+            try:
+                results.append(fit_forecast(*task))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = [pool.submit(fit_forecast, *task) for task in tasks]
+        results = []
+        for fut in futures:
+            try:
+                results.append(fut.result())
+            except Exception as e:
+                results.append(e)
+    return results
+
+
+class Forecaster:
+    def __init__(self, max_entries: int = 4096, workers: int | None = None):
+        self.max_entries = max_entries
+        self.workers = workers
+        self._results: OrderedDict[tuple, tuple] = OrderedDict()
+        # (scope, key, tanggal pertama) -> (awal & akhir riwayat yang di-fit, digest riwayat, parameter)
+        self._params: OrderedDict[tuple, tuple[pd.Timestamp, pd.Timestamp, str, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def invalidate(self, data_key: str) -> None:
+        # Parameter warm start tidak ikut dibuang: dicek ulang lewat digest riwayat
+        with self._lock:
+            for key in [key for key in self._results if key[0] == data_key]:
+                del self._results[key]
+
+    def month_end(self, series: DailySeries, keys, asof, data_key: str = "", scope: str = "") -> pd.DataFrame:
+        # scope membedakan key dengan nama sama di dimensi berbeda (mis. area vs plant)
+        columns = ["Key", "MTD", "Forecast Sisa", "Proyeksi", "Proyeksi Bawah", "Proyeksi Atas"]
+        if series.empty:
+            return pd.DataFrame(columns=columns)
+        asof = min(pd.Timestamp(asof).normalize(), series.daily.index[-1])
+        month_start = asof.replace(day=1)
+        horizon = ((asof + pd.offsets.MonthEnd(0)) - asof).days
+        keys = [k for k in (series.daily.columns if keys is None else keys) if k in series.daily.columns]
+        first = series.daily.index[0]
+        history = series.daily.loc[max(first, asof - pd.Timedelta(days=HISTORY_DAYS - 1)):asof]
+
+        todo, out = [], {}
+        with self._lock:
+            for k in keys:
+                hit = self._results.get((data_key, scope, k, asof, horizon))
+                if hit is not None:
+                    self._results.move_to_end((data_key, scope, k, asof, horizon))
+                    out[k] = hit
+                    continue
+                # Parameter fit sebelumnya jadi titik awal hanya jika deret ini sekarang
+                # punya hari baru dan riwayat yang dulu di-fit tidak berubah
+                warm = self._params.get((scope, k, first))
+                start = None
+                if warm is not None and warm[1] < asof:
+                    lo, hi, digest, params = warm
+                    if history_digest(series.daily[k].loc[lo:hi].to_numpy()) == digest:
+                        start = params
+                todo.append((k, (history[k].to_numpy(), horizon, start)))
+
+        results = run_fits([t for _, t in todo], self.workers) if todo else []
+        with self._lock:
+            for (k, task), res in zip(todo, results):
+                if isinstance(res, Exception):
+                    res = naive_forecast(task[0], horizon)
+                path, sigma, params = res
+                out[k] = (float(path.sum()), sigma)
+                self._results[(data_key, scope, k, asof, horizon)] = out[k]
+                if params is not None:
+                    fitted = history[k]
+                    self._params[(scope, k, first)] = (
+                        fitted.index[0], fitted.index[-1], history_digest(fitted.to_numpy()), params,
+                    )
+                    self._params.move_to_end((scope, k, first))
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+            while len(self._params) > self.max_entries:
+                self._params.popitem(last=False)
+
+        mtd = series.period_sum(month_start, asof)
+        rest = np.array([out[k][0] for k in keys])
+        band = BAND_Z * np.array([out[k][1] for k in keys]) * np.sqrt(horizon)
+        frame = pd.DataFrame({"Key": keys, "MTD": mtd.reindex(keys).to_numpy(), "Forecast Sisa": rest})
+        frame["Proyeksi"] = frame["MTD"] + frame["Forecast Sisa"]
+        # Pita kira-kira: galat harian dianggap independen, jadi melebar dengan akar horizon
+        frame["Proyeksi Bawah"] = frame["MTD"] + np.clip(rest - band, 0, None)
+        frame["Proyeksi Atas"] = frame["Proyeksi"] + band
+        return frame[columns]
@@ -0,0 +1,980 @@
+import difflib
+import functools
+import hashlib
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # snapshot dinonaktifkan tanpa pyarrow
+    pa = None
+
+# ========== KOLOM ==========
+# Kandidat nama kolom per peran, urut dari yang paling diutamakan
+COLUMN_CANDIDATES = {
+    "date":     ["dp date", "delivery date", "tanggal pengiriman", "dp_date", "tanggal_pengiriman"],
+    "qty":      ["qty", "quantity", "volume"],
+    "sales":    ["sales man", "salesman", "sales name", "sales_name"],
+    "trip":     ["dp no", "ritase", "dp_no", "trip"],
+    "area":     ["area"],
+    "plant":    ["plant name", "plant", "plant_name"],
+    "distance": ["distance", "jarak"],
+    "truck":    ["truck no", "truck", "truck_no", "nopol", "vehicle"],
+    "endcust":  ["end customer name", "end customer", "customer", "end_customer"],
+}
+
+# Nama default untuk kolom wajib jika tidak terdeteksi
+DEFAULT_COLS = {
+    "date":  "dp date",
+    "qty":   "qty",
+    "sales": "sales man",
+    "trip":  "dp no",
+}
+
+# Kolom dimensi (teks) yang dipakai dashboard
+DIMENSION_ROLES = ["sales", "trip", "area", "plant", "truck", "endcust"]
+
+REQUIRED_LABELS = {
+    "date":  "Dp Date",
+    "qty":   "Qty",
+    "sales": "Sales Man",
+    "trip":  "Dp No",
+}
+
+
+class MissingColumnsError(ValueError):
+    def __init__(self, labels: list[str]):
+        self.labels = labels
+        super().__init__("Kolom wajib tidak ditemukan: " + ", ".join(labels))
+
+
+# ========== HELPER ==========
+def file_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    # Salinan dangkal: hanya nama kolom yang diganti, data tidak diduplikasi
+    out = df.copy(deep=False)
+    out.columns = (
+        out.columns.astype(str)
+        .str.replace("\n", " ")
+        .str.strip()
+        .str.lower()
+        .str.replace(r"\s+", " ", regex=True)
+    )
+    return out
+
+
+def match_col(df: pd.DataFrame, candidates: list[str]) -> str | None:
+    return rank_columns([str(c) for c in df.columns], {"col": candidates})["col"]
+
+
+def as_text(s: pd.Series) -> pd.Series:
+    # Kolom object campuran (mis. angka + teks) diseragamkan jadi teks
+    if s.dtype != object or not pd.api.types.infer_dtype(s, skipna=True).startswith("mixed"):
+        return s
+    return s.where(s.isna(), s.astype(str))
+
+
+def detect_columns(df: pd.DataFrame) -> dict[str, str | None]:
+    return COLUMN_RESOLVER.resolve(df.columns)
+
+
+# ========== RESOLVER KOLOM ==========
+# Pemetaan peran -> kolom dihitung sekali per susunan header (signature) lalu disimpan
+# di memori dan di file JSON, jadi dipakai ulang lintas rerun, sesi, dan worker.
+# Skor: sama persis > urutan token > mirip (fuzzy) > substring. Satu kolom hanya
+# dipakai untuk satu peran. Pemetaan yang di-pin user selalu menang.
+SCORE_EXACT = 300
+SCORE_TOKEN = 200
+SCORE_FUZZY = 100
+SCORE_SUBSTRING = 50
+FUZZY_MIN_RATIO = 0.85
+
+
+def header_signature(columns) -> str:
+    return file_hash("\x1f".join(map(str, columns)).encode())
+
+
+def _tokens(name: str) -> tuple[str, ...]:
+    return tuple(t for t in re.split(r"[^0-9a-z]+", name) if t)
+
+
+def _has_tokens(tokens: tuple, sub: tuple) -> bool:
+    n = len(sub)
+    return any(tokens[i:i + n] == sub for i in range(len(tokens) - n + 1))
+
+
+def column_scores(columns: list[str], candidates: dict = COLUMN_CANDIDATES) -> list[tuple[float, int, str, str]]:
+    # (skor, posisi kolom, peran, kolom) untuk setiap pasangan yang cocok
+    tokens = [_tokens(c) for c in columns]
+    scores = []
+    for role, cands in candidates.items():
+        for rank, cand in enumerate(cands):
+            cand_tokens = _tokens(cand)
+            matcher = difflib.SequenceMatcher(b=cand, autojunk=False)
+            for i, c in enumerate(columns):
+                if c == cand:
+                    score = SCORE_EXACT
+                elif cand_tokens and _has_tokens(tokens[i], cand_tokens):
+                    score = SCORE_TOKEN - (len(tokens[i]) - len(cand_tokens))
+                else:
+                    matcher.set_seq1(c)
+                    if matcher.real_quick_ratio() >= FUZZY_MIN_RATIO and matcher.ratio() >= FUZZY_MIN_RATIO:
+                        score = SCORE_FUZZY * matcher.ratio()
+                    elif cand in c:
+                        score = SCORE_SUBSTRING
+                    else:
+                        continue
+                scores.append((score - rank, i, role, c))
+    return scores
+
+
+def rank_columns(columns: list[str], candidates: dict = COLUMN_CANDIDATES) -> dict[str, str | None]:
+    # Greedy: pasangan dengan skor tertinggi diambil dulu, kolom kiri menang jika seri
+    cols = dict.fromkeys(candidates)
+    used = set()
+    for score, i, role, c in sorted(column_scores(columns, candidates), key=lambda t: (-t[0], t[1])):
+        if cols[role] is None and c not in used:
+            cols[role] = c
+            used.add(c)
+    return cols
+
+
+@contextmanager
+def file_lock(path: Path):
+    # Kunci antar-proses (beberapa worker Streamlit menulis file yang sama)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_json(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def write_json(path: Path, data: dict) -> None:
+    # Nama tmp per proses/thread agar penulis paralel tidak saling menimpa file tmp
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(data, indent=2))
+    os.replace(tmp, path)
+
+
+def with_pin(pins: dict, sig: str, mapping: dict | None) -> dict:
+    pins = {k: v for k, v in pins.items() if k != sig}
+    if mapping:
+        pins[sig] = dict(mapping)
+    return pins
+
+
+class ColumnResolver:
+    # Cache pemetaan otomatis (boleh hilang) dan pin pengguna disimpan di file terpisah
+    def __init__(self, path: Path | None = None, max_entries: int = 512):
+        self.path = Path(path) if path else None
+        self.pins_path = self.path.with_name(f"{self.path.stem}.pins.json") if self.path else None
+        self.max_entries = max_entries
+        self._mappings: OrderedDict[str, dict] = OrderedDict()
+        self._pins: dict[str, dict] = {}
+        self._pins_stamp = None
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _file_lock(self):
+        return file_lock(self.path.with_name(f"{self.path.name}.lock"))
+
+    def _load(self) -> None:
+        if self.path is None:
+            return
+        if not self._loaded:
+            self._loaded = True
+            data = read_json(self.path)
+            self._mappings.update(data.get("mappings", {}))
+            if not self.pins_path.exists():
+                # Format lama: pin ikut tersimpan di file pemetaan
+                self._pins.update(data.get("pins", {}))
+        self._refresh_pins()
+
+    def _refresh_pins(self) -> None:
+        # Pin bisa diubah proses lain; baca ulang hanya jika file berubah
+        try:
+            st = self.pins_path.stat()
+        except OSError:
+            return
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp != self._pins_stamp:
+            self._pins = read_json(self.pins_path).get("pins", {})
+            self._pins_stamp = stamp
+
+    def _save_mappings(self) -> None:
+        if self.path is None:
+            return
+        try:
+            with self._file_lock():
+                # Gabungkan dengan isi file terbaru agar entri proses lain tidak hilang
+                merged = OrderedDict(read_json(self.path).get("mappings", {}))
+                for sig, mapping in self._mappings.items():
+                    merged.pop(sig, None)
+                    merged[sig] = mapping
+                while len(merged) > self.max_entries:
+                    merged.popitem(last=False)
+                write_json(self.path, {"mappings": merged})
+                self._mappings = merged
+        except OSError:
+            # Cache pemetaan hanya optimasi
+            pass
+
+    def resolve(self, columns) -> dict[str, str | None]:
+        columns = [str(c) for c in columns]
+        sig = header_signature(columns)
+        with self._lock:
+            self._load()
+            auto = self._mappings.get(sig)
+            if auto is None:
+                auto = rank_columns(columns)
+                self._mappings[sig] = auto
+                while len(self._mappings) > self.max_entries:
+                    self._mappings.popitem(last=False)
+                self._save_mappings()
+            else:
+                self._mappings.move_to_end(sig)
+            pins = self._pins.get(sig, {})
+        cols = {role: auto.get(role) for role in COLUMN_CANDIDATES}
+        cols.update({role: c for role, c in pins.items() if role in cols and (c is None or c in columns)})
+        for role, default in DEFAULT_COLS.items():
+            cols[role] = cols[role] or default
+        return cols
+
+    def pins(self, columns) -> dict[str, str | None]:
+        with self._lock:
+            self._load()
+            return dict(self._pins.get(header_signature([str(c) for c in columns]), {}))
+
+    def pin(self, columns, mapping: dict[str, str | None]) -> None:
+        sig = header_signature([str(c) for c in columns])
+        with self._lock:
+            self._load()
+            if self.path is None:
+                self._pins = with_pin(self._pins, sig, mapping)
+                return
+            try:
+                with self._file_lock():
+                    # Hanya signature ini yang diubah; pin dari proses lain dibaca ulang dulu
+                    current = read_json(self.pins_path).get("pins", {}) if self.pins_path.exists() else self._pins
+                    self._pins = with_pin(current, sig, mapping)
+                    write_json(self.pins_path, {"pins": self._pins})
+                self._pins_stamp = None
+                self._refresh_pins()
+            except OSError:
+                self._pins = with_pin(self._pins, sig, mapping)
+
+    def pin_token(self, columns) -> str:
+        # Hanya pin untuk susunan header ini; pin di header lain tidak mempengaruhi dataset ini
+        pins = self.pins(columns)
+        if not pins:
+            return ""
+        return file_hash(json.dumps(pins, sort_keys=True).encode())[:8]
+
+
+# ========== ENGINE BACA ==========
+# Engine dicoba berurutan dari yang tercepat; yang tidak terpasang atau gagal dilewati.
+def header_names(header) -> list[str]:
+    # Meniru penamaan kolom pandas: header kosong -> "Unnamed: i", duplikat -> "x.1"
+    names, seen = [], {}
+    for i, h in enumerate(header):
+        name = f"Unnamed: {i}" if h is None or (isinstance(h, str) and not h.strip()) else str(h)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def openpyxl_rows(source, sheet=0) -> Iterator:
+    # Baris pertama yang di-yield adalah nama kolom, berikutnya baris data (read-only, streaming)
+    import openpyxl
+
+    wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[sheet] if isinstance(sheet, int) else wb[sheet]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        names = header_names(header)
+        yield names
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            yield row[:len(names)]
+    finally:
+        wb.close()
+
+
+def _read_calamine(data: bytes, sheet) -> pd.DataFrame:
+    return pd.read_excel(io.BytesIO(data), sheet_name=sheet, engine="calamine")
+
+
+def _read_openpyxl_stream(data: bytes, sheet) -> pd.DataFrame:
+    rows = openpyxl_rows(io.BytesIO(data), sheet)
+    names = next(rows, None)
+    if names is None:
+        return pd.DataFrame()
+    return pd.DataFrame(list(rows), columns=names)
+
+
+def _read_openpyxl(data: bytes, sheet) -> pd.DataFrame:
+    return pd.ExcelFile(io.BytesIO(data), engine="openpyxl").parse(sheet)
+
+
+def _read_xlrd(data: bytes, sheet) -> pd.DataFrame:
+    return pd.read_excel(io.BytesIO(data), sheet_name=sheet, engine="xlrd")
+
+
+def _read_csv_arrow(data: bytes, sheet) -> pd.DataFrame:
+    return pd.read_csv(io.BytesIO(data), engine="pyarrow")
+
+
+def _read_csv(data: bytes, sheet) -> pd.DataFrame:
+    return pd.read_csv(io.BytesIO(data))
+
+
+# nama engine -> (fungsi baca, modul yang harus terpasang)
+ENGINES = {
+    "calamine":        (_read_calamine, "python_calamine"),
+    "openpyxl-stream": (_read_openpyxl_stream, "openpyxl"),
+    "openpyxl":        (_read_openpyxl, "openpyxl"),
+    "xlrd":            (_read_xlrd, "xlrd"),
+    "csv-pyarrow":     (_read_csv_arrow, "pyarrow"),
+    "csv":             (_read_csv, None),
+}
+
+ENGINE_ORDER = {
+    ".xlsx": ["calamine", "openpyxl-stream", "openpyxl"],
+    ".xlsm": ["calamine", "openpyxl-stream", "openpyxl"],
+    ".xls":  ["calamine", "xlrd"],
+    ".csv":  ["csv-pyarrow", "csv"],
+}
+
+
+@functools.cache
+def engine_available(engine: str) -> bool:
+    module = ENGINES[engine][1]
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def engines_for(name: str = "") -> list[str]:
+    ext = Path(name).suffix.lower() or ".xlsx"
+    return [e for e in ENGINE_ORDER.get(ext, ENGINE_ORDER[".xlsx"]) if engine_available(e)]
+
+
+def read_with_engine(data: bytes, name: str = "", sheet=0, engine: str | None = None) -> tuple[pd.DataFrame, str, float]:
+    error = None
+    for e in ([engine] if engine else engines_for(name)):
+        t0 = time.perf_counter()
+        try:
+            df = ENGINES[e][0](data, sheet)
+        except Exception as exc:
+            error = exc
+            continue
+        return df, e, time.perf_counter() - t0
+    raise error or ValueError(f"Tidak ada engine untuk membaca {name or 'file'}")
+
+
+# ========== BACA & SIAPKAN DATA ==========
+def read_workbook(data: bytes, sheet=0) -> pd.DataFrame:
+    return read_with_engine(data, "", sheet)[0]
+
+
+def read_table(data: bytes, name: str = "") -> pd.DataFrame:
+    return read_with_engine(data, name)[0]
+
+
+def check_required(columns, cols: dict) -> None:
+    missing = [label for role, label in REQUIRED_LABELS.items() if cols[role] not in columns]
+    if missing:
+        raise MissingColumnsError(missing)
+
+
+def convert_types(df: pd.DataFrame, cols: dict) -> pd.DataFrame:
+    df[cols["date"]] = pd.to_datetime(df[cols["date"]], errors="coerce")
+    df = df.dropna(subset=[cols["date"]])
+    df[cols["qty"]] = pd.to_numeric(df[cols["qty"]], errors="coerce").fillna(0)
+    return df
+
+
+def prepare_frame(df_raw: pd.DataFrame) -> tuple[pd.DataFrame, dict[str, str | None]]:
+    # Normalisasi kolom
+    df = normalize_columns(df_raw)
+
+    # Deteksi kolom penting & cek kolom wajib
+    cols = detect_columns(df)
+    check_required(df.columns, cols)
+
+    # Konversi tipe data
+    df = convert_types(df, cols)
+    # Semua kolom object campuran (bukan hanya dimensi) diseragamkan jadi teks, sama
+    # seperti yang ditulis ke snapshot, agar frame dari parse & dari snapshot identik
+    for c in df.columns:
+        df[c] = as_text(df[c])
+    return df, cols
+
+
+# ========== MODE HEMAT MEMORI ==========
+# Dimensi dengan rasio nilai unik di bawah batas ini disimpan sebagai categorical
+CATEGORY_MAX_RATIO = 0.5
+
+
+def downcast_numeric(s: pd.Series) -> pd.Series:
+    if not pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+        return s
+    values = s.dropna()
+    if len(values) == len(s) and (values % 1 == 0).all():
+        return pd.to_numeric(s, downcast="integer")
+    # float32 hanya dipakai jika nilainya tidak berubah (tanpa kehilangan presisi)
+    as_f32 = s.astype("float32")
+    if (as_f32.astype("float64") == s)[s.notna()].all():
+        return as_f32
+    return s
+
+
+def compact_frame(df: pd.DataFrame, cols: dict) -> tuple[pd.DataFrame, pd.DataFrame]:
+    before = df.memory_usage(deep=True, index=False)
+    dtypes_before = df.dtypes
+
+    # Buang kolom sumber yang tidak dipakai dashboard
+    used = [c for c in dict.fromkeys(cols.values()) if c and c in df.columns]
+    out = df[used].reset_index(drop=True)
+
+    for role in DIMENSION_ROLES:
+        c = cols.get(role)
+        if not c or c not in out.columns or isinstance(out[c].dtype, pd.CategoricalDtype):
+            continue
+        if len(out) and out[c].nunique() / len(out) <= CATEGORY_MAX_RATIO:
+            out[c] = out[c].astype("category")
+    for role in ("qty", "distance"):
+        c = cols.get(role)
+        if c and c in out.columns:
+            if role == "distance":
+                out[c] = pd.to_numeric(out[c], errors="coerce")
+            out[c] = downcast_numeric(out[c])
+
+    after = out.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        "Kolom": before.index,
+        "Tipe Awal": dtypes_before.astype(str).to_numpy(),
+        "Tipe Akhir": [str(out[c].dtype) if c in out.columns else "(dibuang)" for c in before.index],
+        "MB Awal": (before / 1024 ** 2).round(3).to_numpy(),
+        "MB Akhir": [round(after[c] / 1024 ** 2, 3) if c in after.index else 0.0 for c in before.index],
+    })
+    return out, report
+
+
+def align_columns(df: pd.DataFrame, cols: dict, target: dict) -> pd.DataFrame:
+    # Samakan nama kolom per peran dengan mapping target; peran yang tidak ada diisi NaN
+    rename = {
+        cols[role]: name for role, name in target.items()
+        if name and cols.get(role) and cols[role] in df.columns and cols[role] != name
+    }
+    out = df.rename(columns=rename)
+    missing = [name for name in target.values() if name and name not in out.columns]
+    if missing:
+        out = out.assign(**{name: float("nan") for name in missing})
+    return out
+
+
+def combine_prepared(prepared: list[tuple[pd.DataFrame, dict]], error: Exception | None = None):
+    # Sheet lain diselaraskan ke mapping sheet pertama lalu digabung
+    if not prepared:
+        raise error or MissingColumnsError(list(REQUIRED_LABELS.values()))
+    df, cols = prepared[0]
+    if len(prepared) > 1:
+        df = pd.concat([df] + [align_columns(d, c, cols) for d, c in prepared[1:]], ignore_index=True)
+    return df, cols
+
+
+@dataclass
+class Dataset:
+    key: str
+    df: pd.DataFrame
+    cols: dict[str, str | None]
+    nbytes: int = 0
+    memory: pd.DataFrame | None = None
+    engine: str = ""
+    read_seconds: float = 0.0
+    header: list[str] | None = None
+    pins: str = ""
+
+    @property
+    def mapped_key(self) -> str:
+        # Kunci turunan (cube, index, chart) ikut berubah jika pin kolom header ini berubah
+        return self.key + (f"-m{self.pins}" if self.pins else "")
+
+    def pins_current(self) -> bool:
+        return self.header is None or self.pins == COLUMN_RESOLVER.pin_token(self.header)
+
+
+# ========== CACHE ==========
+# Store dataset per proses (dipakai bersama semua sesi Streamlit), dikunci hash isi
+# file. Setiap sesi mendaftarkan dataset yang sedang dipakainya lewat hold(); dataset
+# yang masih dipegang sesi aktif tidak pernah dibuang. Sisanya dibuang jika idle lebih
+# dari max_idle detik atau jika jumlah entri / total byte melebihi batas (LRU).
+# Frame di dalam store dipakai bersama, jadi perlakukan sebagai read-only.
+class DatasetCache:
+    def __init__(
+        self,
+        max_entries: int = 8,
+        max_bytes: int = 2 * 1024 ** 3,
+        max_idle: float | None = None,
+        session_ttl: float = 3600,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_idle = max_idle
+        self.session_ttl = session_ttl
+        self._items: OrderedDict[str, Dataset] = OrderedDict()
+        self._touched: dict[str, float] = {}
+        self._sessions: dict[str, tuple[float, set[str]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.held_evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._items
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(ds.nbytes for ds in self._items.values())
+
+    def _over_budget(self) -> bool:
+        return len(self._items) > self.max_entries or self.total_bytes > self.max_bytes
+
+    def _held(self) -> dict[str, int]:
+        refs: dict[str, int] = {}
+        for _, keys in self._sessions.values():
+            for key in keys:
+                refs[key] = refs.get(key, 0) + 1
+        return refs
+
+    def _remove(self, key: str) -> None:
+        self._items.pop(key, None)
+        self._touched.pop(key, None)
+        self.evictions += 1
+
+    def _evict(self, now: float) -> None:
+        # Sesi yang tidak rerun lebih dari session_ttl dianggap sudah ditutup
+        for session, (seen, _) in list(self._sessions.items()):
+            if now - seen > self.session_ttl:
+                del self._sessions[session]
+        held = self._held()
+        if self.max_idle is not None:
+            for key in list(self._items):
+                if key not in held and now - self._touched.get(key, now) > self.max_idle:
+                    self._remove(key)
+        # Entri terbaru selalu disimpan walau melebihi batas byte
+        newest = next(reversed(self._items), None)
+        for key in list(self._items):
+            if not self._over_budget():
+                break
+            if key not in held and key != newest:
+                self._remove(key)
+        # Masih melebihi batas: entri yang dipegang sesi ikut dibuang (terlama dulu),
+        # sesi pemegangnya memuat ulang dari snapshot pada rerun berikutnya
+        for key in list(self._items):
+            if not self._over_budget():
+                break
+            if key != newest:
+                self._remove(key)
+                self.held_evictions += 1
+
+    def get(self, key: str) -> Dataset | None:
+        with self._lock:
+            ds = self._items.get(key)
+            if ds is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._items.move_to_end(key)
+            self._touched[key] = time.time()
+            return ds
+
+    def put(self, ds: Dataset) -> None:
+        with self._lock:
+            now = time.time()
+            self._items[ds.key] = ds
+            self._items.move_to_end(ds.key)
+            self._touched[ds.key] = now
+            self._evict(now)
+
+    def hold(self, session: str, keys) -> None:
+        # Menggantikan daftar dataset yang dipegang sesi ini sebelumnya
+        with self._lock:
+            now = time.time()
+            self._sessions[session] = (now, set(keys))
+            for key in keys:
+                if key in self._items:
+                    self._touched[key] = now
+            self._evict(now)
+
+    def release(self, session: str) -> None:
+        with self._lock:
+            self._sessions.pop(session, None)
+            self._evict(time.time())
+
+    def refs(self, key: str) -> int:
+        with self._lock:
+            return self._held().get(key, 0)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+            self._touched.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._touched.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "resident_mb": self.total_bytes / 1024 ** 2,
+                "sessions": len(self._sessions),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "held_evictions": self.held_evictions,
+                "budget_mb": self.max_bytes / 1024 ** 2,
+            }
+
+    def frame(self) -> pd.DataFrame:
+        with self._lock:
+            now = time.time()
+            held = self._held()
+            return pd.DataFrame(
+                [
+                    {"Dataset": key[:12], "MB": ds.nbytes / 1024 ** 2, "Sesi": held.get(key, 0),
+                     "Idle (detik)": now - self._touched.get(key, now)}
+                    for key, ds in self._items.items()
+                ],
+                columns=["Dataset", "MB", "Sesi", "Idle (detik)"],
+            )
+
+
+# ========== SNAPSHOT KOLOMNAR ==========
+# Frame yang sudah disiapkan disimpan sebagai file Arrow IPC (tanpa kompresi) agar
+# bisa di-memory-map saat file yang sama di-upload lagi.
+# Dinaikkan setiap kali cara parse atau resolusi kolom berubah, agar snapshot lama
+# (hasil engine/mapping sebelumnya) tidak dipakai lagi
+SNAPSHOT_VERSION = 4
+SNAPSHOT_DIR = Path(os.environ.get("SUMMARY_CACHE_DIR", ".cache/summary-daily"))
+COLUMN_RESOLVER = ColumnResolver(SNAPSHOT_DIR / "columns.json")
+
+
+def snapshot_paths(key: str, snapshot_dir: Path = SNAPSHOT_DIR) -> tuple[Path, Path]:
+    snapshot_dir = Path(snapshot_dir)
+    return snapshot_dir / f"{key}.arrow", snapshot_dir / f"{key}.json"
+
+
+def save_snapshot(ds: Dataset, snapshot_dir: Path = SNAPSHOT_DIR) -> bool:
+    if pa is None:
+        return False
+    data_path, manifest_path = snapshot_paths(ds.key, snapshot_dir)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+
+    df = ds.df.reset_index(drop=True)
+    dtypes = {str(c): str(t) for c, t in df.dtypes.items()}
+    for c in df.columns:
+        df[c] = as_text(df[c])
+    df.columns = df.columns.astype(str)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # Tulis ke file sementara lalu rename, manifest ditulis terakhir
+    tmp_path = data_path.with_suffix(".arrow.tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, data_path)
+
+    manifest = {
+        "schema_version": SNAPSHOT_VERSION,
+        "source_hash": ds.key,
+        "columns": ds.cols,
+        "rows": len(df),
+        "dtypes": dtypes,
+        "memory": ds.memory.to_dict("records") if ds.memory is not None else None,
+        "engine": ds.engine,
+        "read_seconds": ds.read_seconds,
+        "header": ds.header,
+        "pins": ds.pins,
+        "created": time.time(),
+    }
+    tmp_manifest = manifest_path.with_suffix(".json.tmp")
+    tmp_manifest.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_manifest, manifest_path)
+    return True
+
+
+def restore_dtypes(df: pd.DataFrame, dtypes: dict[str, str]) -> pd.DataFrame:
+    # Arrow mengembalikan teks sebagai dtype str; dtype frame asli (mis. object) dipulihkan
+    for c, t in dtypes.items():
+        if c in df.columns and str(df[c].dtype) != t:
+            try:
+                df[c] = df[c].astype(t)
+            except (TypeError, ValueError):
+                pass
+    return df
+
+
+def load_snapshot(key: str, snapshot_dir: Path = SNAPSHOT_DIR) -> Dataset | None:
+    if pa is None:
+        return None
+    data_path, manifest_path = snapshot_paths(key, snapshot_dir)
+    if not (data_path.exists() and manifest_path.exists()):
+        return None
+    try:
+        manifest = json.loads(manifest_path.read_text())
+        if manifest.get("schema_version") != SNAPSHOT_VERSION or manifest.get("source_hash") != key:
+            return None
+        source = pa.memory_map(str(data_path), "r")
+        table = pa.ipc.open_file(source).read_all()
+    except (OSError, ValueError, pa.ArrowException):
+        return None
+
+    df = restore_dtypes(table.to_pandas(), manifest.get("dtypes", {}))
+    memory = pd.DataFrame(manifest["memory"]) if manifest.get("memory") else None
+    return Dataset(
+        key=key, df=df, cols=manifest["columns"],
+        nbytes=int(df.memory_usage(deep=True).sum()), memory=memory,
+        engine=manifest.get("engine", ""), read_seconds=manifest.get("read_seconds", 0.0),
+        header=manifest.get("header"), pins=manifest.get("pins", ""),
+    )
+
+
+def drop_snapshot(key: str, snapshot_dir: Path = SNAPSHOT_DIR) -> None:
+    for path in snapshot_paths(key, snapshot_dir):
+        path.unlink(missing_ok=True)
+
+
+def dataset_key(data: bytes, compact: bool = False, all_sheets: bool = False) -> str:
+    # Mode hemat memori / semua sheet menghasilkan frame berbeda, jadi kuncinya juga
+    # berbeda. Pin kolom dicek terpisah per header (Dataset.pins) setelah lookup.
+    return file_hash(data) + ("-c" if compact else "") + ("-s" if all_sheets else "")
+
+
+# ========== PARSE PARALEL ==========
+# Parse openpyxl hanya memakai satu core; file dan sheet dibagi ke process pool.
+# Pembagian per rentang baris tidak dilakukan karena reader XLSX tetap harus membaca
+# XML sheet dari awal untuk sampai ke baris tertentu.
+MAX_WORKERS = int(os.environ.get("SUMMARY_WORKERS", 0)) or (os.cpu_count() or 1)
+
+
+def list_sheets(data: bytes, name: str = "") -> list:
+    if name.lower().endswith(".csv"):
+        return [0]
+    for engine in ("calamine", None):
+        if engine and not engine_available(engine):
+            continue
+        try:
+            return pd.ExcelFile(io.BytesIO(data), engine=engine).sheet_names
+        except ValueError:
+            continue
+    return [0]
+
+
+def parse_task(data: bytes, name: str, sheet, compact: bool):
+    # Dijalankan di worker: parse + siapkan + (opsional) ringkas satu sheet
+    raw, engine, seconds = read_with_engine(data, name, sheet)
+    df, cols = prepare_frame(raw)
+    header = list(df.columns)
+    memory = None
+    if compact:
+        df, memory = compact_frame(df, cols)
+    return df, cols, memory, engine, seconds, header
+
+
+def run_tasks(tasks: list[tuple], workers: int | None = None, progress=None) -> list:
+    # Hasil dikembalikan sesuai urutan tasks; exception per task ikut dikembalikan
+    workers = min(workers or MAX_WORKERS, len(tasks))
+    results: list = [None] * len(tasks)
+    if workers <= 1:
+        for i, task in enumerate(tasks):
+            try:
+                results[i] = parse_task(*task)
+            except Exception as e:
+                results[i] = e
+            if progress is not None:
+                progress(i + 1, len(tasks))
+        return results
+
+    # "spawn" agar worker tidak mewarisi thread server Streamlit
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = {pool.submit(parse_task, *task): i for i, task in enumerate(tasks)}
+        for done, fut in enumerate(as_completed(futures), start=1):
+            try:
+                results[futures[fut]] = fut.result()
+            except Exception as e:
+                results[futures[fut]] = e
+            if progress is not None:
+                progress(done, len(tasks))
+    return results
+
+
+def load_datasets(
+    files: list[tuple[bytes, str]],
+    cache: DatasetCache | None = None,
+    snapshot_dir: Path | None = SNAPSHOT_DIR,
+    compact: bool = False,
+    all_sheets: bool = False,
+    workers: int | None = None,
+    progress=None,
+) -> list[Dataset]:
+    keys = [dataset_key(data, compact, all_sheets) for data, _ in files]
+    found: dict[int, Dataset] = {}
+    for i, key in enumerate(keys):
+        ds = cache.get(key) if cache is not None else None
+        if ds is None and snapshot_dir is not None:
+            ds = load_snapshot(key, snapshot_dir)
+        # Pin header ini berubah sejak dataset disiapkan -> parse ulang
+        if ds is not None and ds.pins_current():
+            found[i] = ds
+
+    # Satu task per (file, sheet) untuk file yang belum ada di cache/snapshot
+    tasks, owners = [], []
+    for i, (data, name) in enumerate(files):
+        if i in found:
+            continue
+        for sheet in (list_sheets(data, name) if all_sheets else [0]):
+            tasks.append((data, name, sheet, compact))
+            owners.append(i)
+    results = run_tasks(tasks, workers, progress) if tasks else []
+
+    for i in dict.fromkeys(owners):
+        parts = [r for r, o in zip(results, owners) if o == i]
+        ok = [r for r in parts if not isinstance(r, Exception)]
+        prepared = [(r[0], r[1]) for r in ok]
+        errors = [r for r in parts if isinstance(r, Exception)]
+        # Sheet tanpa kolom wajib dilewati; error lain dianggap fatal
+        fatal = [e for e in errors if not isinstance(e, MissingColumnsError)]
+        if fatal:
+            raise fatal[0]
+        df, cols = combine_prepared(prepared, errors[0] if errors else None)
+        memory = ok[0][2] if ok else None
+        if compact and len(prepared) > 1:
+            df, memory = compact_frame(df, cols)
+        ds = Dataset(
+            key=keys[i], df=df, cols=cols, nbytes=int(df.memory_usage(deep=True).sum()), memory=memory,
+            engine=", ".join(dict.fromkeys(r[3] for r in ok)), read_seconds=sum(r[4] for r in ok),
+            header=ok[0][5] if ok else None,
+            pins=COLUMN_RESOLVER.pin_token(ok[0][5]) if ok else "",
+        )
+        if snapshot_dir is not None:
+            try:
+                save_snapshot(ds, snapshot_dir)
+            except (OSError, ValueError, pa.ArrowException):
+                # Snapshot hanya optimasi, kegagalan menulis tidak menghentikan proses
+                pass
+        found[i] = ds
+
+    if cache is not None:
+        for i in range(len(files)):
+            cache.put(found[i])
+    return [found[i] for i in range(len(files))]
+
+
+def load_dataset(
+    data: bytes,
+    cache: DatasetCache | None = None,
+    snapshot_dir: Path | None = SNAPSHOT_DIR,
+    name: str = "",
+    compact: bool = False,
+    all_sheets: bool = False,
+    workers: int | None = None,
+    progress=None,
+) -> Dataset:
+    return load_datasets([(data, name)], cache, snapshot_dir, compact, all_sheets, workers, progress)[0]
+
+
+# ========== STREAMING ==========
+# Untuk file besar: baris dibaca per chunk sehingga tidak pernah ada satu DataFrame
+# berisi seluruh sheet di memori.
+def iter_raw_chunks(source, name: str, chunksize: int = 50_000) -> Iterator[pd.DataFrame]:
+    lower = name.lower()
+    if lower.endswith(".csv"):
+        # Semua kolom dibaca sebagai teks agar tipe konsisten antar chunk
+        yield from pd.read_csv(source, chunksize=chunksize, dtype=str)
+        return
+    if not lower.endswith((".xlsx", ".xlsm")):
+        raise ValueError("Mode streaming hanya mendukung file .xlsx dan .csv")
+
+    rows = openpyxl_rows(source, 0)
+    names = next(rows, None)
+    if names is None:
+        return
+    buf = []
+    for row in rows:
+        buf.append(row)
+        if len(buf) >= chunksize:
+            yield pd.DataFrame(buf, columns=names)
+            buf = []
+    if buf:
+        yield pd.DataFrame(buf, columns=names)
+
+
+def iter_prepared_chunks(source, name: str, chunksize: int = 50_000) -> Iterator[tuple[pd.DataFrame, dict]]:
+    cols = None
+    for chunk in iter_raw_chunks(source, name, chunksize):
+        chunk = normalize_columns(chunk)
+        if cols is None:
+            cols = detect_columns(chunk)
+            check_required(chunk.columns, cols)
+        yield convert_types(chunk, cols), cols
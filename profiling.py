@@ -0,0 +1,156 @@
+import functools
+import json
+import logging
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+logger = logging.getLogger("summary_daily.profile")
+
+
+def configure_logging(path: str | None = None) -> None:
+    # Satu baris JSON per stage ke stderr atau file, untuk dikirim ke monitoring
+    if logger.handlers:
+        return
+    handler = logging.FileHandler(path) if path else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def arg_label(prefix: str, index: int, key: str):
+    # Label stage dari argumen fungsi, mis. arg_label("bar_desc", 3, "title")
+    def label(args, kwargs):
+        value = kwargs.get(key, args[index] if len(args) > index else "")
+        return f"{prefix}:{value}"
+    return label
+
+
+# ========== PROFILER ==========
+# Timer + penghitung memori per stage. Satu profiler dipakai sepanjang sesi; setiap
+# rerun (penuh maupun fragment) dibuka dengan start_run, dan setiap stage langsung
+# masuk ke statistik kumulatif. Jika tidak aktif semua pembungkus langsung memanggil
+# fungsi asli tanpa overhead pengukuran.
+# Catatan: tracemalloc bersifat per proses, jadi angka memori bisa tercampur jika
+# beberapa sesi berjalan bersamaan. Tracing hanya hidup selama ada stage yang sedang
+# diukur (dihitung lintas sesi), sehingga tidak membebani alokasi di luar profiling.
+_trace_lock = threading.Lock()
+_trace_users = 0
+_trace_owned = False
+
+
+def trace_acquire() -> None:
+    global _trace_users, _trace_owned
+    with _trace_lock:
+        if _trace_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _trace_owned = True
+        _trace_users += 1
+
+
+def trace_release() -> None:
+    global _trace_users, _trace_owned
+    with _trace_lock:
+        _trace_users -= 1
+        # Tracing yang dinyalakan pihak lain (mis. -X tracemalloc) tidak dimatikan
+        if _trace_users == 0 and _trace_owned:
+            tracemalloc.stop()
+            _trace_owned = False
+
+
+RUN_HISTORY = 20
+
+
+class Profiler:
+    def __init__(self, enabled: bool = False, run_id: str | None = None, context: dict | None = None):
+        self.enabled = enabled
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.context = context or {}
+        self.records: list[dict] = []
+        self.label = "full"
+        self.stats: dict[str, dict] = {}
+        self.runs: deque = deque(maxlen=RUN_HISTORY)
+
+    def start_run(self, label: str = "full") -> None:
+        # Rerun baru: catatan run sebelumnya disimpan di riwayat, statistik tetap berjalan
+        if self.records:
+            self.runs.append((self.run_id, self.label, self.records))
+        self.run_id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.records = []
+
+    @contextmanager
+    def stage(self, name: str, **meta):
+        if not self.enabled:
+            yield
+            return
+        trace_acquire()
+        mem0, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            mem1, peak = tracemalloc.get_traced_memory()
+            trace_release()
+            record = {
+                "stage": name,
+                "seconds": round(seconds, 6),
+                "mem_delta_mb": round((mem1 - mem0) / 1024 ** 2, 3),
+                "mem_peak_mb": round(max(peak - mem0, 0) / 1024 ** 2, 3),
+                **meta,
+            }
+            self.records.append(record)
+            self._accumulate(record)
+            logger.info(json.dumps({"event": "stage", "run_id": self.run_id, **self.context, **record}, default=str))
+
+    def wrap(self, fn, name):
+        # name boleh berupa string atau fungsi (args, kwargs) -> string
+        if not self.enabled:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            label = name(args, kwargs) if callable(name) else name
+            with self.stage(label):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.records, columns=["stage", "seconds", "mem_delta_mb", "mem_peak_mb"])
+
+    def _accumulate(self, r: dict) -> None:
+        s = self.stats.setdefault(r["stage"], {"calls": 0, "total_s": 0.0, "max_s": 0.0, "max_peak_mb": 0.0})
+        s["calls"] += 1
+        s["total_s"] += r["seconds"]
+        s["max_s"] = max(s["max_s"], r["seconds"])
+        s["max_peak_mb"] = max(s["max_peak_mb"], r["mem_peak_mb"])
+
+    def summary(self) -> pd.DataFrame:
+        # Statistik kumulatif lintas rerun: jumlah panggilan, total, rata-rata, maksimum
+        out = pd.DataFrame.from_dict(self.stats, orient="index")
+        if out.empty:
+            return out
+        out["avg_s"] = out["total_s"] / out["calls"]
+        return out.sort_values("total_s", ascending=False)
+
+    def history(self) -> pd.DataFrame:
+        # Ringkasan run terakhir (terbaru di atas): jenis run, jumlah stage, total waktu
+        runs = list(self.runs) + ([(self.run_id, self.label, self.records)] if self.records else [])
+        rows = [
+            {"run": run_id, "jenis": label, "stages": len(records), "seconds": round(sum(r["seconds"] for r in records), 6)}
+            for run_id, label, records in reversed(runs)
+        ]
+        return pd.DataFrame(rows, columns=["run", "jenis", "stages", "seconds"])
+
+    def reset(self) -> None:
+        self.stats = {}
+        self.runs.clear()
@@ -1,9 +1,34 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
+import inspect
+import os
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from functools import partial, wraps
+
+import charts
+from charts import MAX_POINTS, THEMES, TOP_N
+from aggregate import (
+    ROWS, Cube, FilterIndex, MergedDataset, RollupIndex, avg_distance, build_cube, cube_kpis, filter_active, kpi_table, rollup,
+    stream_cube, summary_tables,
+)
+from ingest import COLUMN_RESOLVER, DatasetCache, MissingColumnsError, dataset_key, drop_snapshot, file_hash, load_dataset, load_datasets
+from profiling import Profiler, arg_label, configure_logging
+from export import ExportJob, filter_rows
+from forecast import Forecaster
+from timeseries import DailySeries
+from utilization import DEFAULT_CAPACITY, truck_utilization
+from targets import TargetStore, import_targets, months_between, with_targets
+
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:  # Streamlit lama
+    get_script_run_ctx = lambda: None
+
+# st.experimental_rerun sudah dihapus di Streamlit baru
+rerun = getattr(st, "rerun", None) or st.experimental_rerun
 
 st.set_page_config(page_title="🚚 Dashboard Monitoring Delivery And Sales", layout="wide")
 
@@ -11,24 +36,15 @@ st.set_page_config(page_title="🚚 Dashboard Monitoring Delivery And Sales", la
 st.sidebar.header("🎨 Display Mode")
 mode = st.sidebar.radio("Pilih Mode", ["Light", "Dark"], horizontal=True)
 
-if mode == "Dark":
-    chart_template = "plotly_dark"
-    base_bg = "#0b0f19"
-    card_bg = "#0f172a"
-    text_color = "#FFFFFF"
-    accent = "#00E5FF"       # Cyan Neon
-    accent_light = "#FF00FF" # Magenta Neon
-    futur_colors = ["#00E5FF", "#FF00FF", "#39FF14", "#FFEA00", "#FF4D4D"]
-    font_color = "#fff"
-else:
-    chart_template = "plotly_white"
-    base_bg = "#FFFFFF"
-    card_bg = "#F8FAFC"
-    text_color = "#111827"
-    accent = "#2563EB"
-    accent_light = "#7C3AED"
-    futur_colors = ["#2563EB", "#7C3AED", "#06B6D4", "#D946EF", "#F59E0B"]
-    font_color = "#111827"
+theme = THEMES[mode]
+chart_template = theme["chart_template"]
+base_bg = theme["base_bg"]
+card_bg = theme["card_bg"]
+text_color = theme["text_color"]
+accent = theme["accent"]
+accent_light = theme["accent_light"]
+futur_colors = theme["futur_colors"]
+font_color = theme["font_color"]
 
 # ========== UPDATED CSS - REMOVED SPECIAL EFFECTS ON TITLES ==========
 st.markdown(
@@ -84,271 +100,403 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# ========== HELPER ==========
-def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    out = df.copy()
-    out.columns = (
-        out.columns.astype(str)
-        .str.replace("\n", " ")
-        .str.strip()
-        .str.lower()
-        .str.replace(r"\s+", " ", regex=True)
-    )
-    return out
-
-def match_col(df: pd.DataFrame, candidates: list[str]) -> str | None:
-    cols = list(df.columns)
-    for cand in candidates:
-        for c in cols:
-            if c == cand:
-                return c
-        for c in cols:
-            if cand in c:
-                return c
-    return None
-
-# Tentukan warna background sesuai mode
-if mode == "Dark":
-    bg_plot = "rgba(10,10,30,0.9)"
-    bg_paper = "rgba(5,5,20,1)"
-    txt_color = "white"
-else:  # Light mode
-    bg_plot = "white"
-    bg_paper = "white"
-    txt_color = "black"
-
-# ---------- BAR CHART ----------
-def bar_desc(df, x, y, title, color_base, color_highlight, template="plotly_white", is_avg=False):
-    if df.empty:
-        return None
-    data = df.copy()
-    data[y] = pd.to_numeric(data[y], errors="coerce").fillna(0)
-    data = data.sort_values(y, ascending=False)
-
-    fig = px.bar(
-        data, x=x, y=y, template=template, title=title,
-        color=data[y], color_continuous_scale=futur_colors
-    )
-
-    label_fmt = ",.0f" if not is_avg else ".2f"
-    fig.update_traces(
-        texttemplate=f"%{{y:{label_fmt}}}",
-        textposition="outside",
-        cliponaxis=False
+# ========== CHART ==========
+# Batas payload chart: top-N bar (+ "Others") dan titik maksimum deret waktu
+with st.sidebar.expander("📊 Batas Chart"):
+    top_n = st.number_input("Maks. bar per chart (0 = semua)", min_value=0, value=TOP_N, step=10)
+    max_points = st.number_input("Maks. titik deret waktu (0 = semua)", min_value=0, value=MAX_POINTS, step=100)
+
+# ========== PROFILING ==========
+# Aktif lewat toggle sidebar atau env SUMMARY_PROFILE=1; log JSON ke SUMMARY_PROFILE_LOG (atau stderr)
+profile_on = st.sidebar.checkbox(
+    "⏱️ Profiling", value=os.environ.get("SUMMARY_PROFILE", "") not in ("", "0"),
+    help="Catat waktu & memori per stage (ingest, filter, groupby, chart).",
+)
+if profile_on:
+    configure_logging(os.environ.get("SUMMARY_PROFILE_LOG"))
+# Satu profiler per sesi: rerun fragment (di luar run penuh) tetap tercatat di sini
+prof = st.session_state.setdefault("profiler", Profiler())
+prof.enabled = profile_on
+prof.start_run("full")
+
+bar_desc = prof.wrap(
+    partial(charts.bar_desc, theme=theme, top_n=top_n, max_points=max_points),
+    arg_label("bar_desc", 3, "title"),
+)
+bar_with_target_line = prof.wrap(
+    partial(charts.bar_with_target_line, theme=theme, top_n=top_n),
+    arg_label("bar_with_target_line", 4, "title"),
+)
+pie_chart = prof.wrap(partial(charts.pie_chart, theme=theme, top_n=top_n), arg_label("pie_chart", 3, "title"))
+group_bar = prof.wrap(partial(charts.group_bar, theme=theme, top_n=top_n), arg_label("group_bar", 4, "title"))
+heatmap = prof.wrap(partial(charts.heatmap, theme=theme, top_n=top_n), arg_label("heatmap", 1, "title"))
+truck_utilization = prof.wrap(truck_utilization, "truck_utilization")
+line_chart = prof.wrap(partial(charts.line_chart, theme=theme, max_points=max_points), arg_label("line_chart", 3, "title"))
+
+rollup = prof.wrap(rollup, arg_label("groupby_sum", 1, "dims"))
+avg_distance = prof.wrap(avg_distance, arg_label("groupby_mean_distance", 1, "dim"))
+cube_kpis = prof.wrap(cube_kpis, "kpis")
+
+# ========== CACHE DATASET ==========
+# Satu store untuk semua sesi: file yang sama dari banyak user hanya disimpan sekali
+@st.cache_resource
+def get_dataset_cache() -> DatasetCache:
+    return DatasetCache(
+        max_entries=int(os.environ.get("SUMMARY_CACHE_ENTRIES", 8)),
+        max_bytes=int(os.environ.get("SUMMARY_CACHE_MB", 2048)) * 1024 * 1024,
+        max_idle=float(os.environ.get("SUMMARY_CACHE_IDLE_MIN", 30)) * 60,
+        session_ttl=float(os.environ.get("SUMMARY_SESSION_TTL_MIN", 60)) * 60,
     )
 
-    fig.update_layout(
-        xaxis_title=None, yaxis_title=None, bargap=0.35,
-        coloraxis_showscale=False,
-        plot_bgcolor=bg_plot,
-        paper_bgcolor=bg_paper,
-        font=dict(color=txt_color)
-    )
+# Argumen cache turunan dicatat per data_key (awalan key sebelum ":") agar cache satu
+# file bisa dibuang per argumen tanpa mengosongkan cache sesi lain
+DERIVED_KEYS = 64
+
+@st.cache_resource
+def get_derived_calls() -> dict:
+    return {"lock": threading.Lock(), "calls": OrderedDict()}
+
+def derived_cache(max_entries: int):
+    def decorate(fn):
+        cached = st.cache_resource(max_entries=max_entries, show_spinner=False)(fn)
+        names = list(inspect.signature(fn).parameters)[1:]
+
+        @wraps(fn)
+        def call(key: str, *args):
+            # Argumen berawalan "_" tidak di-hash Streamlit, cukup diganti None saat clear
+            hashed = tuple(None if n.startswith("_") else a for n, a in zip(names, args))
+            data_key = key.split(":")[0]
+            registry = get_derived_calls()
+            with registry["lock"]:
+                calls = registry["calls"].setdefault(data_key, [])
+                if (cached, key, hashed) not in calls:
+                    calls.append((cached, key, hashed))
+                registry["calls"].move_to_end(data_key)
+                # Key lama pasti sudah terdorong keluar dari cache (max_entries jauh lebih kecil)
+                while len(registry["calls"]) > DERIVED_KEYS:
+                    registry["calls"].popitem(last=False)
+            return cached(key, *args)
+
+        call.clear = cached.clear
+        return call
+    return decorate
+
+@derived_cache(max_entries=16)
+def get_series(key: str, _cube, date_col: str, dim, qty: str):
+    return DailySeries.from_cube(_cube, date_col, dim, qty)
+
+@st.cache_resource
+def get_forecaster() -> Forecaster:
+    return Forecaster()
+
+@st.cache_resource
+def get_target_store() -> TargetStore:
+    return TargetStore()
+
+def session_id() -> str:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "local"
+
+# Cube streaming disimpan di dict biasa (bukan di dalam fungsi cache_resource) agar
+# progress hanya digambar saat cube dibangun, bukan di-replay Streamlit tiap rerun
+STREAM_CACHE_ENTRIES = 4
+
+@st.cache_resource
+def get_stream_store() -> dict:
+    return {"lock": threading.Lock(), "cubes": OrderedDict()}
+
+def load_stream_cube(key: str, source, name: str, progress=None):
+    store = get_stream_store()
+    with store["lock"]:
+        cb = store["cubes"].get(key)
+        if cb is not None:
+            store["cubes"].move_to_end(key)
+            return cb
+    cb = stream_cube(source, name, progress=progress)
+    with store["lock"]:
+        store["cubes"][key] = cb
+        while len(store["cubes"]) > STREAM_CACHE_ENTRIES:
+            store["cubes"].popitem(last=False)
+    return cb
+
+@derived_cache(max_entries=8)
+def get_cube(key: str, _ds):
+    return build_cube(_ds.df, _ds.cols)
+
+@derived_cache(max_entries=8)
+def get_filter_index(key: str, _frame, date_col: str, dims: tuple):
+    return FilterIndex(_frame, date_col, list(dims))
+
+@derived_cache(max_entries=8)
+def get_rollups(key: str, _base, cols: dict):
+    return RollupIndex(_base, cols)
+
+def clear_file_caches(file_key: str) -> None:
+    # Hanya objek turunan file ini (semua varian pin kolomnya); sesi lain tidak terganggu
+    registry = get_derived_calls()
+    with registry["lock"]:
+        data_keys = [k for k in registry["calls"] if k == file_key or k.startswith(f"{file_key}-m")]
+        calls = [c for k in data_keys for c in registry["calls"].pop(k)]
+    for cached, key, hashed in calls:
+        cached.clear(key, *hashed)
+    forecaster = get_forecaster()
+    for k in data_keys:
+        forecaster.invalidate(k)
+
+# Label peran kolom untuk pemetaan manual
+ROLE_LABELS = {
+    "date": "Dp Date",
+    "qty": "Qty",
+    "sales": "Sales Man",
+    "trip": "Dp No",
+    "area": "Area",
+    "plant": "Plant Name",
+    "distance": "Distance",
+    "truck": "Truck No",
+    "endcust": "End Customer",
+}
+AUTO_COL = "(otomatis)"
+NO_COL = "(tidak ada)"
+
+# Dimensi yang bisa difilter (multi-select) & di-drill dari chart
+FILTER_ROLES = {
+    "area": "Area",
+    "plant": "Plant Name",
+    "truck": "Truck No",
+    "sales": "Sales Man",
+    "endcust": "End Customer",
+}
 
-    fig.update_yaxes(linecolor=accent, gridcolor=accent_light)
-    fig.update_xaxes(linecolor=accent, gridcolor=accent_light)
-
-    return fig
-
-# ---------- BAR CHART WITH TARGET LINE (DASH + ORANGE) ----------
-def bar_with_target_line(df, x, y_actual, y_target, title, template="plotly_white"):
-    if df.empty:
-        return None
-    
-    # Buat figure dengan bar chart untuk actual
-    fig = go.Figure()
-    
-    # Tambahkan bar chart untuk actual
-    fig.add_trace(go.Bar(
-        x=df[x],
-        y=df[y_actual],
-        name='Actual',
-        marker_color=futur_colors[0],
-        text=df[y_actual].apply(lambda x: f"{x:,.0f}"),
-        textposition='outside',
-    ))
-    
-   # Tambahkan line chart DASH untuk target dengan warna BLOOD MOON (merah darah)
-    fig.add_trace(go.Scatter(
-        x=df[x],
-        y=df[y_target],
-        name='Target',
-        mode='lines+markers+text',
-        line=dict(
-            color='#DC143C',  # Warna Blood Moon (Dark Red)
-            width=3,
-            dash='dash'  # Garis putus-putus
-        ),
-        marker=dict(
-            size=8,
-            color='#DC143C',  # Warna Blood Moon
-            symbol='circle'
-        ),
-        text=df[y_target].apply(lambda x: f"{x:,.0f}"),
-        textposition='top center',
-        textfont=dict(
-            color='#DC143C',  # Warna Blood Moon
-            size=12
+# Di atas STREAM_MB file dibaca per chunk dan langsung direduksi ke agregat
+STREAM_MB = 50
+STREAM_EXTENSIONS = (".xlsx", ".xlsm", ".csv")
+MAX_UPLOAD_MB = int(os.environ.get("SUMMARY_MAX_UPLOAD_MB", 1024))
+
+def load_merged(files, cache, compact: bool, all_sheets: bool) -> MergedDataset:
+    # Gabungan disimpan di session; file yang sudah masuk tidak diproses ulang
+    keys = [dataset_key(f.getvalue(), compact, all_sheets) for f in files]
+    merged = st.session_state.get("merged")
+    if merged is None or merged.keys != keys[:len(merged.keys)]:
+        merged = None
+
+    todo = files[len(merged.keys):] if merged is not None else files
+    if todo:
+        # File baru di-parse paralel (per file & per sheet) di process pool
+        progress = st.progress(0.0, text="Membaca file...")
+        datasets = load_datasets(
+            [(f.getvalue(), f.name) for f in todo], cache, compact=compact, all_sheets=all_sheets,
+            progress=lambda done, total: progress.progress(done / total, text=f"Membaca file... {done}/{total} sheet"),
         )
-    ))
-    
-    # Update layout
-    fig.update_layout(
-        title=title,
-        xaxis_title=None, 
-        yaxis_title="Volume",
-        bargap=0.35,
-        plot_bgcolor=bg_plot,
-        paper_bgcolor=bg_paper,
-        font=dict(color=txt_color),
-        showlegend=True,
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        ),
-        template=template
-    )
-    
-    # Update axes
-    fig.update_yaxes(linecolor=accent, gridcolor=accent_light)
-    fig.update_xaxes(linecolor=accent, gridcolor=accent_light)
-    
-    return fig
-
-# ---------- PIE CHART ----------
-def pie_chart(df, names, values, title):
-    if df.empty:
-        return None
-    fig = px.pie(
-        df, names=names, values=values, template=chart_template,
-        title=title, hole=0.35, color_discrete_sequence=futur_colors
-    )
-    fig.update_traces(textinfo="percent+label")
-    return fig
-
-# ---------- GROUP BAR CHART ----------
-def group_bar(df, x, y, color, title):
-    if df.empty:
-        return None
-    fig = px.bar(
-        df, x=x, y=y, color=color, template=chart_template,
-        title=title, barmode="group", color_discrete_sequence=futur_colors
-    )
-    return fig
-
-# ---------- LINE CHART ----------
-def line_chart(df, x, y, title):
-    if df.empty:
-        return None
-    fig = px.line(
-        df, x=x, y=y, template=chart_template,
-        title=title, markers=True, color_discrete_sequence=futur_colors
-    )
-    return fig
+        progress.empty()
+        for ds in datasets:
+            if merged is None:
+                merged = MergedDataset(ds.cols)
+            merged.append(ds)
+    st.session_state.merged = merged
+    return merged
 
 # ========== UPLOAD DATA DI SIDEBAR ==========
 st.sidebar.header("📂 Upload File Data")
-actual_file = st.sidebar.file_uploader("Upload File Actual (Excel)", type=["xlsx", "xls"])
-
-if actual_file is None:
-    st.info("Silakan upload file Actual terlebih dahulu (ukuran 0.2MB–50MB).")
+upload_mode = st.sidebar.radio("Mode Upload", ["Satu File", "Multi File"], horizontal=True)
+multi_mode = upload_mode == "Multi File"
+
+if multi_mode:
+    actual_files = st.sidebar.file_uploader(
+        "Upload File Actual harian/bulanan (Excel/CSV)", type=["xlsx", "xls", "csv"], accept_multiple_files=True
+    ) or []
+    all_sheets = st.sidebar.checkbox("Baca semua sheet", value=False)
+else:
+    actual_file = st.sidebar.file_uploader("Upload File Actual (Excel/CSV)", type=["xlsx", "xls", "csv"])
+    actual_files = [actual_file] if actual_file is not None else []
+    all_sheets = False
+
+if not actual_files:
+    # File dilepas: dataset sesi ini tidak lagi dipegang di store
+    get_dataset_cache().release(session_id())
+    st.info(f"Silakan upload file Actual terlebih dahulu (ukuran 0.2MB–{MAX_UPLOAD_MB}MB).")
     st.stop()
 
 # Optional: batasi ukuran file
-size_mb = actual_file.size / (1024 * 1024)
-if size_mb < 0.2 or size_mb > 50:
-    st.error("⚠️ File harus berukuran antara 2MB - 50MB")
-    st.stop()
+for f in actual_files:
+    size_mb = f.size / (1024 * 1024)
+    if size_mb < 0.2 or size_mb > MAX_UPLOAD_MB:
+        st.error(f"⚠️ File harus berukuran antara 0.2MB - {MAX_UPLOAD_MB}MB ({f.name})")
+        st.stop()
+
+# Streaming hanya untuk .xlsx/.csv; .xls lama tetap dibaca utuh
+streamable = not multi_mode and actual_file.name.lower().endswith(STREAM_EXTENSIONS)
+stream_mode = streamable and (size_mb > STREAM_MB or st.sidebar.checkbox(
+    "Mode Streaming (agregat per chunk)", value=False,
+    help="Otomatis aktif untuk file di atas 50MB. Hanya untuk .xlsx dan .csv.",
+))
+
+compact_mode = st.sidebar.checkbox(
+    "Mode Hemat Memori", value=True,
+    help="Kolom dimensi disimpan sebagai categorical, angka di-downcast, kolom yang tidak dipakai dibuang.",
+)
 
-# Baca file
+# Baca file (hasil parse disimpan di cache berdasarkan hash isi file)
+cache = get_dataset_cache()
+stream = merged = ds = None
 try:
-    xls = pd.ExcelFile(actual_file)
-    df_raw = xls.parse(0)
+    with prof.stage("ingest"):
+        if stream_mode:
+            actual_file.seek(0)
+            status = st.empty()
+            data_key = file_hash(actual_file.getvalue())
+            stream = load_stream_cube(
+                data_key, actual_file, actual_file.name,
+                lambda rows: status.caption(f"⏳ Membaca file per chunk... {rows:,} baris"),
+            )
+            status.empty()
+        elif multi_mode:
+            merged = load_merged(actual_files, cache, compact_mode, all_sheets)
+            data_key = file_hash("|".join(merged.keys).encode())
+        else:
+            with st.spinner("Membaca file..."):
+                ds = load_dataset(actual_file.getvalue(), cache, name=actual_file.name, compact=compact_mode)
+            data_key = ds.mapped_key
+except MissingColumnsError as e:
+    st.error(str(e))
+    st.stop()
 except Exception as e:
     st.error(f"Gagal membaca file: {e}")
     st.stop()
 
-# Normalisasi kolom
-df = normalize_columns(df_raw)
-
-# Deteksi kolom penting
-col_dp_date = match_col(df, ["dp date", "delivery date", "tanggal pengiriman", "dp_date", "tanggal_pengiriman"]) or "dp date"
-col_qty     = match_col(df, ["qty", "quantity", "volume"]) or "qty"
-col_sales   = match_col(df, ["sales man", "salesman", "sales name", "sales_name"]) or "sales man"
-col_dp_no   = match_col(df, ["dp no", "ritase", "dp_no", "trip"]) or "dp no"
-col_area    = match_col(df, ["area"]) or None
-col_plant   = match_col(df, ["plant name", "plant", "plant_name"]) or None
-col_distance= match_col(df, ["distance", "jarak"]) or None
-col_truck   = match_col(df, ["truck no", "truck", "truck_no", "nopol", "vehicle"]) or None
-col_endcust = match_col(df, ["end customer name", "end customer", "customer", "end_customer"]) or None
-
-# Cek kolom wajib
-required_map = {
-    col_dp_date: "Dp Date",
-    col_qty:     "Qty",
-    col_sales:   "Sales Man",
-    col_dp_no:   "Dp No",
-}
-missing = [k for k in required_map.keys() if (k is None or k not in df.columns)]
-if missing:
-    label_missing = [required_map.get(m, str(m)) for m in missing]
-    st.error("Kolom wajib tidak ditemukan: " + ", ".join(label_missing))
-    st.stop()
-
-# Konversi tipe data
-df[col_dp_date] = pd.to_datetime(df[col_dp_date], errors="coerce")
-df = df.dropna(subset=[col_dp_date])
-df[col_qty] = pd.to_numeric(df[col_qty], errors="coerce").fillna(0)
+# Dataset yang dipakai sesi ini tidak dibuang dari store selama sesi masih aktif
+cache.hold(session_id(), merged.keys if merged is not None else [ds.key] if ds is not None else [])
+with st.sidebar.expander("🗄️ Cache Dataset"):
+    cs = cache.stats()
+    st.caption(
+        f"{cs['entries']} dataset, {cs['resident_mb']:,.1f} MB, {cs['sessions']} sesi aktif · "
+        f"hit {cs['hits']:,} / miss {cs['misses']:,} ({cs['hit_rate']:.0%}) · {cs['evictions']:,} dibuang"
+    )
+    if cs["held_evictions"]:
+        st.warning(
+            f"Budget {cs['budget_mb']:,.0f} MB terlampaui: {cs['held_evictions']:,} dataset yang masih dipakai sesi "
+            "ikut dibuang dan akan dimuat ulang dari snapshot."
+        )
+    st.dataframe(cache.frame(), hide_index=True, use_container_width=True)
+
+if stream is not None:
+    # Mode streaming: hanya agregat yang tersedia, tanpa baris mentah
+    raw_rows = None
+    cb = stream
+    st.sidebar.caption(f"Streaming: {stream.rows:,} baris → {len(cb.cube):,} baris agregat")
+elif merged is not None:
+    # Baris mentah digabung hanya saat export, bukan setiap rerun
+    raw_rows = lambda: merged.df
+    cb = merged.cube
+    st.sidebar.caption(
+        f"Multi file: {len(merged.keys)} file, {merged.rows:,} baris, "
+        f"{merged.duplicates:,} baris duplikat dp no dibuang"
+    )
+else:
+    if st.sidebar.button("🧹 Hapus Cache File Ini"):
+        cache.invalidate(ds.key)
+        drop_snapshot(ds.key)
+        clear_file_caches(ds.key)
+        rerun()
+
+    raw_rows = lambda: ds.df
+    cb = get_cube(ds.mapped_key, ds)
+    if ds.engine:
+        st.sidebar.caption(f"Engine baca: {ds.engine} ({ds.read_seconds:,.2f} detik)")
+
+    if ds.header:
+        # Pemetaan kolom otomatis bisa di-pin per susunan header (berlaku juga untuk file lain)
+        with st.sidebar.expander("🧭 Pemetaan Kolom"):
+            pinned = COLUMN_RESOLVER.pins(ds.header)
+            options = [AUTO_COL, NO_COL] + ds.header
+            mapping = {}
+            for role, label in ROLE_LABELS.items():
+                current = pinned.get(role, AUTO_COL)
+                current = NO_COL if current is None else current
+                choice = st.selectbox(
+                    f"{label} (otomatis: {ds.cols.get(role) or '-'})", options,
+                    index=options.index(current) if current in options else 0, key=f"colmap_{role}",
+                )
+                if choice != AUTO_COL:
+                    mapping[role] = None if choice == NO_COL else choice
+            pin_col, unpin_col = st.columns(2)
+            if pin_col.button("📌 Simpan"):
+                COLUMN_RESOLVER.pin(ds.header, mapping)
+                rerun()
+            if unpin_col.button("♻️ Otomatis") and pinned:
+                COLUMN_RESOLVER.pin(ds.header, {})
+                rerun()
+
+    if ds.memory is not None:
+        with st.sidebar.expander("🧠 Memori Dataset"):
+            mem = ds.memory
+            st.caption(f"Total: {mem['MB Awal'].sum():,.1f} MB → {mem['MB Akhir'].sum():,.1f} MB")
+            st.dataframe(mem, hide_index=True, use_container_width=True)
+
+# Cube: (date, area, plant, truck, sales, end customer) -> qty, baris, jarak
+cols = cb.cols
+cube = cb.cube
+trips = cb.trips
 
 # Assign kolom global
-DF_DATE = col_dp_date
-DF_QTY  = col_qty
-DF_SLS  = col_sales
-DF_TRIP = col_dp_no
-DF_AREA = col_area
-DF_PLNT = col_plant
-DF_DIST = col_distance
-DF_TRCK = col_truck
-DF_ENDC = col_endcust
-
-# ========== TARGET VOLUME MANUAL PER PLANT ==========
+DF_DATE = cols["date"]
+DF_QTY  = cols["qty"]
+DF_SLS  = cols["sales"]
+DF_TRIP = cols["trip"]
+DF_AREA = cols["area"]
+DF_PLNT = cols["plant"]
+DF_DIST = cols["distance"]
+DF_TRCK = cols["truck"]
+DF_ENDC = cols["endcust"]
+
+# Index filter untuk cube & pasangan trip (urut tanggal + posisi per nilai dimensi)
+filter_dims = tuple(cols[r] for r in FILTER_ROLES if cols.get(r))
+cube_idx = get_filter_index(f"{data_key}:cube", cube, DF_DATE, filter_dims)
+rollups = get_rollups(f"{data_key}:rollup", cube_idx, cols)
+
+trip_idx = get_filter_index(f"{data_key}:trips", trips, DF_DATE, filter_dims)
+
+# ========== TARGET VOLUME PER PLANT ==========
+# Target bulanan per plant disimpan di SQLite; diedit lewat satu grid, bukan satu
+# widget per plant, jadi biaya render sidebar tidak ikut naik dengan jumlah plant.
 st.sidebar.header("🎯 Target Volume per Plant")
+target_store = get_target_store()
+forecaster = get_forecaster()
 
-# Dapatkan daftar plant unik dari data
 if DF_PLNT:
-    all_plants = sorted(df[DF_PLNT].dropna().astype(str).unique().tolist())
-    
-    # Inisialisasi session state untuk menyimpan target
-    if 'plant_targets' not in st.session_state:
-        st.session_state.plant_targets = {}
-    
-    st.sidebar.markdown("**Isi Target Volume Bulanan per Plant:**")
-    
-    # Input target untuk setiap plant
-    for plant in all_plants:
-        current_target = st.session_state.plant_targets.get(plant, 0)
-        target = st.sidebar.number_input(
-            f"Target {plant}",
-            min_value=0,
-            value=int(current_target),
-            step=1000,
-            key=f"target_{plant}"
-        )
-        st.session_state.plant_targets[plant] = target
-    
+    all_plants = cube_idx.levels(DF_PLNT)
+    data_months = months_between(cube[DF_DATE].min(), cube[DF_DATE].max())
+    target_month = st.sidebar.selectbox("Bulan Target", data_months[::-1])
+
+    with st.sidebar.expander("✏️ Isi Target Bulanan per Plant"):
+        saved = target_store.load(target_month).set_index("plant")["target"]
+        grid = pd.DataFrame({"Plant": all_plants, "Target": saved.reindex(all_plants).fillna(0).to_numpy()})
+        with st.form(f"targets_{target_month}"):
+            edited = st.data_editor(
+                grid, hide_index=True, use_container_width=True, disabled=["Plant"],
+                column_config={"Target": st.column_config.NumberColumn(min_value=0, step=1000, format="%d")},
+            )
+            if st.form_submit_button("💾 Simpan Target"):
+                target_store.save(pd.DataFrame({"month": target_month, "plant": edited["Plant"], "target": edited["Target"]}))
+                rerun()
+
+    with st.sidebar.expander("📥 Import Target"):
+        target_file = st.file_uploader("Sheet target (plant, target, bulan opsional)", type=["xlsx", "xls", "csv"])
+        if target_file is not None and st.button("Import"):
+            try:
+                n = import_targets(target_store, target_file.getvalue(), target_file.name, target_month)
+                st.success(f"{n:,} target tersimpan")
+            except Exception as e:
+                st.error(f"Gagal import target: {e}")
+
     # Tombol reset semua target
-    if st.sidebar.button("🔄 Reset Semua Target"):
-        for plant in all_plants:
-            st.session_state.plant_targets[plant] = 0
-        st.experimental_rerun()
+    if st.sidebar.button("🔄 Reset Target Bulan Ini"):
+        target_store.clear(target_month)
+        rerun()
 
 # ========== FILTER DATA ==========
 with st.expander("🔍 Filter Data", expanded=True):
-    min_d = df[DF_DATE].min().date()
-    max_d = df[DF_DATE].max().date()
+    min_d = cube[DF_DATE].min().date()
+    max_d = cube[DF_DATE].max().date()
 
     start_col, end_col = st.columns(2)
     with start_col:
@@ -356,91 +504,116 @@ with st.expander("🔍 Filter Data", expanded=True):
     with end_col:
         end_date = st.date_input("End Date", max_d)
 
-    if DF_AREA:
-        areas = ["All"] + sorted(df[DF_AREA].dropna().astype(str).unique().tolist())
-        sel_area = st.selectbox("Area", areas)
-    else:
-        sel_area = "All"
-
-    if DF_PLNT:
-        if DF_AREA and sel_area != "All":
-            plants = ["All"] + sorted(
-                df[df[DF_AREA].astype(str) == str(sel_area)][DF_PLNT]
-                .dropna().astype(str).unique().tolist()
-            )
-        else:
-            plants = ["All"] + sorted(df[DF_PLNT].dropna().astype(str).unique().tolist())
-        sel_plant = st.selectbox("Plant Name", plants)
-    else:
-        sel_plant = "All"
-
-    if st.button("🔄 Reset Filter"):
-        st.experimental_rerun()
-
-# Apply filter mask
-mask = (df[DF_DATE].dt.date >= start_date) & (df[DF_DATE].dt.date <= end_date)
-if DF_AREA and sel_area != "All":
-    mask &= df[DF_AREA].astype(str) == str(sel_area)
-if DF_PLNT and sel_plant != "All":
-    mask &= df[DF_PLNT].astype(str) == str(sel_plant)
-
-df_f = df.loc[mask].copy()
+    # Klik bar di chart (drill) diterapkan sebelum widget filter dibuat
+    for role, picked in st.session_state.pop("drill_pending", {}).items():
+        st.session_state[f"flt_{role}"] = picked
+
+    # Pilihan tiap dimensi mengikuti pilihan dimensi sebelumnya (area -> plant -> ...),
+    # dibaca dari roll-up hirarki, bukan scan ulang seluruh cube
+    sel_filters = {}
+    filter_cols = st.columns(3)
+    for i, (role, label) in enumerate((r, l) for r, l in FILTER_ROLES.items() if cols.get(r)):
+        options = rollups.values(role, sel_filters)
+        key = f"flt_{role}"
+        if key in st.session_state:
+            st.session_state[key] = [v for v in st.session_state[key] if v in options]
+        with filter_cols[i % 3]:
+            sel_filters[cols[role]] = st.multiselect(label, options, key=key, placeholder="All")
+
+    def reset_filters():
+        for role in FILTER_ROLES:
+            st.session_state.pop(f"flt_{role}", None)
+        # Seleksi chart ikut dibuang agar klik lama tidak diterapkan lagi
+        for key in [k for k in st.session_state if str(k).startswith("drill_")]:
+            del st.session_state[key]
+
+    st.button("🔄 Reset Filter", on_click=reset_filters)
+
+# Apply filter (slice/take lewat index, tanpa salin seluruh kolom)
+with prof.stage("filter"):
+    cube_f = cube_idx.select(start_date, end_date, sel_filters)
+    trips_f = trip_idx.select(start_date, end_date, sel_filters)
 day_span = max((end_date - start_date).days + 1, 1)
 
-# ========== SUMMARIZE (KPI CARDS) ==========
-st.markdown("<div class='section-title'>🧭 Summarize</div>", unsafe_allow_html=True)
-kpi_cols = st.columns(7)
+# ========== SECTION (FRAGMENT) ==========
+# Setiap section dijalankan sebagai fragment: widget di dalam satu section hanya
+# me-rerun section itu sendiri, bukan upload, filter, KPI, atau chart lain.
+st_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
+
+def fragment(fn):
+    # Rerun yang hanya menjalankan fragment dibuka sebagai run profiler tersendiri
+    @wraps(fn)
+    def run(*args, **kwargs):
+        ctx = get_script_run_ctx()
+        if ctx is not None and getattr(ctx, "fragment_ids_this_run", None):
+            prof.start_run(fn.__name__)
+        with prof.stage(f"section:{fn.__name__}"):
+            return fn(*args, **kwargs)
+    return st_fragment(run)
+
 fmt0 = lambda x: f"{int(x):,}" if pd.notna(x) else "0"
 fmtN0 = lambda x: f"{x:,.0f}" if pd.notna(x) else "0"
 
-tot_area  = df_f[DF_AREA].nunique() if DF_AREA else 0
-tot_plant = df_f[DF_PLNT].nunique() if DF_PLNT else 0
-tot_vol   = float(df_f[DF_QTY].sum())
-tot_truck = df_f[DF_TRCK].nunique() if (DF_TRCK and DF_TRCK in df_f.columns) else 0
-tot_trip  = df_f[DF_TRIP].nunique() if DF_TRIP in df_f.columns else 0
-avg_vol_day = (tot_vol / day_span) if day_span > 0 else 0
-avg_load_trip = (tot_vol / tot_trip) if tot_trip > 0 else 0
-
-kpis = [
-    ("🌍 Total Area", fmt0(tot_area)),
-    ("🏭 Total Plant", fmt0(tot_plant)),
-    ("📦 Total Volume", fmtN0(tot_vol)),
-    ("📅 Avg Vol/Day", fmtN0(avg_vol_day)),
-    ("🚛 Total Truck", fmt0(tot_truck)),
-    ("🧾 Total Trip", fmt0(tot_trip)),
-    ("⚖️ Avg Load/Trip", fmtN0(avg_load_trip)),
-]
-
-for col, (label, value) in zip(kpi_cols, kpis):
-    with col:
-        st.markdown(
-            "<div class='metric-card'>"
-            f"<div class='metric-label'>{label}</div>"
-            f"<div class='metric-value'>{value}</div>"
-            "</div>",
-            unsafe_allow_html=True,
-        )
-
-st.markdown("<hr style='opacity:.2;'>", unsafe_allow_html=True)
-
-# ========== SWITCH DASHBOARD ==========
-st.markdown("<div class='section-title'>🎛️ Pilih Dashboard</div>", unsafe_allow_html=True)
-pick = st.radio("", ["Logistic", "Sales & End Customer"], horizontal=True)
-
-# ----------------------------------------------------
-# LOGISTIC
-# ----------------------------------------------------
-if pick == "Logistic":
-    st.markdown("<div class='section-title'>📦 Logistic</div>", unsafe_allow_html=True)
+# ---------- DRILL-DOWN ----------
+def cube_for(role):
+    # Cube untuk chart per dimensi: roll-up terkecil yang masih memuat semua filter aktif
+    return rollups.frame(role, start_date, end_date, sel_filters)
+
+def drill_chart(fig, role):
+    # Klik/pilih bar -> nilai itu jadi filter dimensi chart (area -> plant -> truck / sales -> end customer)
+    key = f"drill_{role}"
+    try:
+        event = st.plotly_chart(fig, use_container_width=True, key=key, on_select="rerun", selection_mode="points")
+    except TypeError:  # Streamlit lama tanpa event seleksi
+        st.plotly_chart(fig, use_container_width=True)
+        return
+    points = (event or {}).get("selection", {}).get("points", [])
+    picked = sorted({str(p["x"]) for p in points if "x" in p and not str(p["x"]).startswith(charts.OTHERS_LABEL)})
+    last = st.session_state.setdefault("drill_last", {})
+    if not picked or last.get(role) == picked:
+        return
+    last[role] = picked
+    st.session_state.drill_pending = {role: picked}
+    rerun()
+
+@fragment
+def section_kpis(cube_f, trips_f, day_span):
+    kpi_cols = st.columns(7)
+
+    k = cube_kpis(cube_f, trips_f, cols)
+    tot_area  = k["area"]
+    tot_plant = k["plant"]
+    tot_vol   = k["vol"]
+    tot_truck = k["truck"]
+    tot_trip  = k["trip"]
+    avg_vol_day = (tot_vol / day_span) if day_span > 0 else 0
+    avg_load_trip = (tot_vol / tot_trip) if tot_trip > 0 else 0
+
+    kpis = [
+        ("🌍 Total Area", fmt0(tot_area)),
+        ("🏭 Total Plant", fmt0(tot_plant)),
+        ("📦 Total Volume", fmtN0(tot_vol)),
+        ("📅 Avg Vol/Day", fmtN0(avg_vol_day)),
+        ("🚛 Total Truck", fmt0(tot_truck)),
+        ("🧾 Total Trip", fmt0(tot_trip)),
+        ("⚖️ Avg Load/Trip", fmtN0(avg_load_trip)),
+    ]
+
+    for col, (label, value) in zip(kpi_cols, kpis):
+        with col:
+            st.markdown(
+                "<div class='metric-card'>"
+                f"<div class='metric-label'>{label}</div>"
+                f"<div class='metric-value'>{value}</div>"
+                "</div>",
+                unsafe_allow_html=True,
+            )
 
+@fragment
+def section_volume(cube_f, day_span, targets, end_date):
     # Chart: Total Volume per Area (Bar)
     if DF_AREA:
-        vol_area = (
-            df_f.groupby(DF_AREA, as_index=False)[DF_QTY]
-            .sum()
-            .rename(columns={DF_QTY: "Total Volume"})
-            .sort_values("Total Volume", ascending=False)
-        )
+        vol_area = rollup(cube_for("area"), DF_AREA, DF_QTY).sort_values("Total Volume", ascending=False)
         fig2 = bar_desc(
             vol_area,
             x=DF_AREA,
@@ -451,14 +624,10 @@ if pick == "Logistic":
             template=chart_template
         )
         if fig2:
-            st.plotly_chart(fig2, use_container_width=True)
+            drill_chart(fig2, "area")
 
     # Chart: Total Volume / Day
-    vol_day = (
-        df_f.groupby(DF_DATE, as_index=False)[DF_QTY]
-        .sum()
-        .rename(columns={DF_QTY: "Total Volume"})
-    )
+    vol_day = rollup(cube_f, DF_DATE, DF_QTY)
     fig1 = bar_desc(vol_day, DF_DATE, "Total Volume", "Total Volume / Day", accent, accent_light, chart_template)
     if fig1:
         st.plotly_chart(fig1, use_container_width=True)
@@ -466,145 +635,326 @@ if pick == "Logistic":
     # Chart Volume per Plant (Dengan Target Line)
     if DF_PLNT:
         # Data actual per plant
-        vol_plant = (
-            df_f.groupby(DF_PLNT, as_index=False)[DF_QTY]
-            .sum()
-            .rename(columns={DF_QTY: "Actual"})
+        vol_plant = rollup(cube_for("plant"), DF_PLNT, DF_QTY, "Actual")
+        show_forecast = st.checkbox(
+            "🔮 Tampilkan proyeksi akhir bulan", value=False, key="show_forecast",
+            help="Forecast Holt-Winters per plant untuk bulan dari End Date.",
         )
-        
+
+        # Deret forecast per plant/area dihitung dari seluruh data; filter area/plant/tanggal
+        # tetap sebanding, filter sales/truck/end customer tidak
+        unfiltered = [
+            FILTER_ROLES[r] for r in ("truck", "sales", "endcust")
+            if cols.get(r) and filter_active(sel_filters.get(cols[r]))
+        ]
+        proj = None
+        if show_forecast and unfiltered:
+            st.caption(
+                f"🔮 Proyeksi disembunyikan: proyeksi dihitung per plant tanpa filter {', '.join(unfiltered)}, "
+                "jadi tidak sebanding dengan bar Actual. Kosongkan filter tersebut untuk melihat proyeksi."
+            )
+        elif show_forecast:
+            with prof.stage("forecast:plant"):
+                proj = forecaster.month_end(
+                    series_for(DF_PLNT), vol_plant[DF_PLNT].astype(str).tolist(), end_date, data_key, scope="plant",
+                )
+            vol_plant = vol_plant.assign(_key=vol_plant[DF_PLNT].astype(str)).merge(
+                proj[["Key", "Proyeksi", "Proyeksi Bawah", "Proyeksi Atas"]].rename(columns={"Key": "_key"}),
+                on="_key", how="left",
+            ).drop(columns="_key")
+
         # Tambahkan kolom target jika ada target yang diisi
-        if hasattr(st.session_state, 'plant_targets') and st.session_state.plant_targets:
-            vol_plant["Target"] = vol_plant[DF_PLNT].map(st.session_state.plant_targets).fillna(0)
-            
+        if not targets.empty or proj is not None:
+            if not targets.empty:
+                vol_plant = with_targets(vol_plant, DF_PLNT, targets)
+
             # Buat chart dengan target line (DASH + ORANGE)
             fig3_with_target = bar_with_target_line(
                 vol_plant, 
                 DF_PLNT, 
                 "Actual", 
-                "Target", 
+                "Target" if not targets.empty else None, 
                 "Total Volume per Plant Name (vs Target)", 
-                chart_template
+                chart_template,
+                **(dict(y_projection="Proyeksi", y_lower="Proyeksi Bawah", y_upper="Proyeksi Atas") if proj is not None else {}),
             )
             if fig3_with_target:
-                st.plotly_chart(fig3_with_target, use_container_width=True)
+                drill_chart(fig3_with_target, "plant")
         else:
             # Jika tidak ada target, tampilkan chart biasa
             fig3 = bar_desc(vol_plant, DF_PLNT, "Actual", "Total Volume per Plant Name", accent, accent_light, chart_template)
             if fig3:
-                st.plotly_chart(fig3, use_container_width=True)
+                drill_chart(fig3, "plant")
+
+        if proj is not None:
+            with st.expander("🔮 Detail Proyeksi Akhir Bulan"):
+                month = end_date.strftime("%Y-%m")
+                month_targets = target_store.totals([month])
+                table = with_targets(proj.rename(columns={"Key": "Plant"}), "Plant", month_targets, f"Target {month}")
+                target = table[f"Target {month}"]
+                table["Proyeksi vs Target %"] = np.where(target > 0, table["Proyeksi"] / target.where(target > 0, 1) * 100, np.nan)
+                st.caption("Pita bawah/atas ±1.96σ residual harian, diasumsikan independen antar hari.")
+                st.dataframe(table, hide_index=True, use_container_width=True)
+                if DF_AREA:
+                    with prof.stage("forecast:area"):
+                        area_proj = forecaster.month_end(
+                            series_for(DF_AREA), vol_area[DF_AREA].astype(str).tolist(), end_date, data_key, scope="area",
+                        )
+                    st.dataframe(area_proj.rename(columns={"Key": "Area"}), hide_index=True, use_container_width=True)
 
     # Chart Avg Volume / Day per Area
     if DF_AREA:
-        avg_area = df_f.groupby(DF_AREA, as_index=False)[DF_QTY].sum()
-        avg_area["Avg/Day"] = avg_area[DF_QTY] / day_span
+        avg_area = vol_area.assign(**{"Avg/Day": vol_area["Total Volume"] / day_span})
         fig4 = bar_desc(avg_area[[DF_AREA, "Avg/Day"]], DF_AREA, "Avg/Day", "Avg Volume / Day per Area", accent, accent_light, chart_template, is_avg=True)
         if fig4:
             st.plotly_chart(fig4, use_container_width=True)
 
     # Chart Avg Volume / Day per Plant
     if DF_PLNT:
-        avg_plant = df_f.groupby(DF_PLNT, as_index=False)[DF_QTY].sum()
-        avg_plant["Avg/Day"] = avg_plant[DF_QTY] / day_span
+        avg_plant = vol_plant.assign(**{"Avg/Day": vol_plant["Actual"] / day_span})
         fig5 = bar_desc(avg_plant[[DF_PLNT, "Avg/Day"]], DF_PLNT, "Avg/Day", "Avg Volume / Day per Plant Name", accent, accent_light, chart_template, is_avg=True)
         if fig5:
             st.plotly_chart(fig5, use_container_width=True)
 
-    # Truck Utilization
+@fragment
+def section_truck(cube_f, trips_f, start_date, end_date):
+    # Truck Utilization: satu pass vectorized untuk semua ukuran per truck
     st.markdown("<div class='subtitle'>🚛 Truck Utilization</div>", unsafe_allow_html=True)
     if DF_TRCK:
-        truck_vol = (
-            df_f.groupby(DF_TRCK, as_index=False)[DF_QTY]
-            .sum()
-            .rename(columns={DF_QTY: "Total Volume"})
+        capacity = st.number_input(
+            "Kapasitas Truck (m³)", min_value=0.5, value=DEFAULT_CAPACITY, step=0.5, key="truck_capacity",
+            help="Dipakai untuk load factor: rata-rata muatan per trip dibagi kapasitas.",
         )
-        fig6 = bar_desc(truck_vol, DF_TRCK, "Total Volume", "Total Volume per Truck", accent, accent_light, chart_template)
+        util = truck_utilization(cube_f, trips_f, cols, start_date, end_date, capacity)
+        summary = util.summary
+        if summary.empty:
+            st.info("Tidak ada data truck pada filter ini.")
+            return
+
+        fig6 = bar_desc(summary[[DF_TRCK, "Total Volume"]], DF_TRCK, "Total Volume", "Total Volume per Truck", accent, accent_light, chart_template)
         if fig6:
-            st.plotly_chart(fig6, use_container_width=True)
+            drill_chart(fig6, "truck")
 
-        trips_per_truck = (
-            df_f.groupby(DF_TRCK, as_index=False)[DF_TRIP]
-            .nunique()
-            .rename(columns={DF_TRIP: "Total Trip"})
-        )
-        fig7 = bar_desc(trips_per_truck, DF_TRCK, "Total Trip", "Total Trip per Truck", accent, accent_light, chart_template)
+        fig7 = bar_desc(summary[[DF_TRCK, "Total Trip"]], DF_TRCK, "Total Trip", "Total Trip per Truck", accent, accent_light, chart_template)
         if fig7:
             st.plotly_chart(fig7, use_container_width=True)
 
-        avg_load = pd.merge(truck_vol, trips_per_truck, on=DF_TRCK, how='left')
-        avg_load["Avg Load/Trip"] = np.where(avg_load["Total Trip"]>0, avg_load["Total Volume"] / avg_load["Total Trip"], 0)
-        fig8 = bar_desc(avg_load[[DF_TRCK, "Avg Load/Trip"]], DF_TRCK, "Avg Load/Trip", "Avg Load per Trip per Truck", accent, accent_light, chart_template, is_avg=True)
+        fig8 = bar_desc(summary[[DF_TRCK, "Avg Load/Trip"]], DF_TRCK, "Avg Load/Trip", "Avg Load per Trip per Truck", accent, accent_light, chart_template, is_avg=True)
         if fig8:
             st.plotly_chart(fig8, use_container_width=True)
+
+        fig9 = heatmap(util.trips, "Trip per Truck per Hari")
+        if fig9:
+            st.plotly_chart(fig9, use_container_width=True)
+
+        n = len(summary)
+        idle = int((summary["Hari Idle"] > 0).sum())
+        st.caption(
+            f"{n:,} truck · load factor rata-rata {summary['Load Factor %'].mean():,.1f}% · "
+            f"{idle:,} truck punya hari idle dalam periode ini"
+        )
+        st.dataframe(summary, hide_index=True, use_container_width=True)
     else:
         st.info("Kolom Truck No tidak ditemukan.")
 
+@fragment
+def section_distance(cube_f):
     # Distance Analysis
     st.markdown("<div class='subtitle'>📏 Distance Analysis</div>", unsafe_allow_html=True)
     if DF_DIST is None:
         st.info("Kolom Distance tidak ditemukan di file.")
     else:
         if DF_AREA:
-            dist_area = (
-                df_f.groupby(DF_AREA, as_index=False)[DF_DIST]
-                .mean()
-                .rename(columns={DF_DIST: "Avg Distance"})
-            )
+            dist_area = avg_distance(cube_f, DF_AREA)
             fig10 = bar_desc(dist_area, DF_AREA, "Avg Distance", "Avg Distance per Area", accent, accent_light, chart_template, is_avg=True)
             if fig10:
                 st.plotly_chart(fig10, use_container_width=True)
         if DF_PLNT:
-            dist_plant = (
-                df_f.groupby(DF_PLNT, as_index=False)[DF_DIST]
-                .mean()
-                .rename(columns={DF_DIST: "Avg Distance"})
-            )
+            dist_plant = avg_distance(cube_f, DF_PLNT)
             fig11 = bar_desc(dist_plant, DF_PLNT, "Avg Distance", "Avg Distance per Plant", accent, accent_light, chart_template, is_avg=True)
             if fig11:
                 st.plotly_chart(fig11, use_container_width=True)
 
-# ----------------------------------------------------
-# DASHBOARD 2: SALES & END CUSTOMER
-# ----------------------------------------------------
-if pick == "Sales & End Customer":
-    st.markdown("<div class='section-title'>💼 Sales & End Customer Performance</div>", unsafe_allow_html=True)
+def series_for(dim):
+    # Multi file: deret ikut diperbarui saat file ditambahkan; selain itu di-cache per dataset
+    if merged is not None:
+        return merged.series(dim)
+    return get_series(f"{data_key}:series:{dim}", cube, DF_DATE, dim, DF_QTY)
+
+@fragment
+def section_trend(start_date, end_date, sel_filters):
+    st.markdown("<div class='subtitle'>📈 Tren Volume</div>", unsafe_allow_html=True)
+    levels = {label: dim for label, dim in (("Total", None), ("Area", DF_AREA), ("Plant", DF_PLNT)) if label == "Total" or dim}
+    level_col, window_col = st.columns(2)
+    level = level_col.radio("Level", list(levels), horizontal=True, key="trend_level")
+    window = window_col.radio("Rata-rata", ["Harian", "7 Hari", "30 Hari"], horizontal=True, key="trend_window")
+    dim = levels[level]
+
+    with prof.stage(f"trend:{level}"):
+        series = series_for(dim)
+        if series.empty:
+            st.info("Tidak ada data untuk tren.")
+            return
+        # Key yang ditampilkan mengikuti filter; tanpa filter ambil 10 key dengan volume terbesar
+        picked = sel_filters.get(dim) if dim else None
+        if picked:
+            keys = list(picked)
+        elif dim == DF_PLNT and sel_filters.get(DF_AREA):
+            keys = rollups.values("plant", {DF_AREA: sel_filters[DF_AREA]})
+        else:
+            keys = None if dim is None else series.top_keys(start_date, end_date, 10)
+        days = {"Harian": 1, "7 Hari": 7, "30 Hari": 30}[window]
+        trend = series.trend(keys, start_date, end_date, days)
+        compare = series.compare(end_date)
+        if keys is not None:
+            compare = compare[compare.index.isin(keys)]
+
+    fig = line_chart(trend, "Tanggal", "Total Volume", f"Tren Volume per {level} ({window})", color="Key" if dim else None)
+    if fig:
+        st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Perbandingan per {end_date:%d %b %Y}: 7 hari vs 7 hari sebelumnya, MTD vs periode sama bulan lalu")
+    st.dataframe(
+        compare.rename_axis(level).reset_index(), hide_index=True, use_container_width=True,
+        column_config={c: st.column_config.NumberColumn(format="%.1f") for c in ("WoW %", "MoM %")},
+    )
 
+@fragment
+def section_sales(cube_f):
     # Sales
     st.markdown("<div class='subtitle'>🧑‍💼 Sales</div>", unsafe_allow_html=True)
-    sales = (
-        df_f.groupby(DF_SLS, as_index=False)[DF_QTY]
-        .sum()
-        .rename(columns={DF_QTY: "Total Volume"})
-    )
+    sales = rollup(cube_for("sales"), DF_SLS, DF_QTY)
     figA = bar_desc(sales, DF_SLS, "Total Volume", "Total Volume per Sales Man", accent, accent_light, chart_template)
     if figA:
-        st.plotly_chart(figA, use_container_width=True)
+        drill_chart(figA, "sales")
 
+@fragment
+def section_endcust(cube_f):
     # End Customer - Opsi pilihan
     if DF_ENDC:
         st.markdown("<div class='subtitle'>👥 End Customer</div>", unsafe_allow_html=True)
-        
+
         # Tambahkan opsi untuk memilih tampilan
         view_option = st.radio(
             "Tampilkan:", 
             ["Semua Customer", "Top 25 Customer"], 
             horizontal=True
         )
-        
-        endc = (
-            df_f.groupby(DF_ENDC, as_index=False)[DF_QTY]
-            .sum()
-            .rename(columns={DF_QTY: "Total Volume"})
-            .sort_values("Total Volume", ascending=False)
-        )
-        
+
+        endc = rollup(cube_for("endcust"), DF_ENDC, DF_QTY).sort_values("Total Volume", ascending=False)
+
         if view_option == "Top 25 Customer":
             endc = endc.head(25)
             title = "Top 25 End Customers by Total Volume"
         else:
             title = "Total Volume per End Customer Name"
-        
+
         figB = bar_desc(endc, DF_ENDC, "Total Volume", title, accent, accent_light, chart_template)
         if figB:
-            st.plotly_chart(figB, use_container_width=True)
+            drill_chart(figB, "endcust")
     else:
         st.info("Kolom End Customer Name tidak ditemukan di file.")
+
+# ========== SUMMARIZE (KPI CARDS) ==========
+st.markdown("<div class='section-title'>🧭 Summarize</div>", unsafe_allow_html=True)
+section_kpis(cube_f, trips_f, day_span)
+
+st.markdown("<hr style='opacity:.2;'>", unsafe_allow_html=True)
+
+# ========== SWITCH DASHBOARD ==========
+st.markdown("<div class='section-title'>🎛️ Pilih Dashboard</div>", unsafe_allow_html=True)
+pick = st.radio("", ["Logistic", "Sales & End Customer"], horizontal=True)
+
+# ----------------------------------------------------
+# LOGISTIC
+# ----------------------------------------------------
+# Hanya section pada dashboard yang dipilih yang dihitung
+if pick == "Logistic":
+    st.markdown("<div class='section-title'>📦 Logistic</div>", unsafe_allow_html=True)
+    section_volume(cube_f, day_span, target_store.totals(months_between(start_date, end_date)), end_date)
+    section_truck(cube_f, trips_f, start_date, end_date)
+    section_distance(cube_f)
+    section_trend(start_date, end_date, sel_filters)
+
+# ----------------------------------------------------
+# DASHBOARD 2: SALES & END CUSTOMER
+# ----------------------------------------------------
+if pick == "Sales & End Customer":
+    st.markdown("<div class='section-title'>💼 Sales & End Customer Performance</div>", unsafe_allow_html=True)
+    section_sales(cube_f)
+    section_endcust(cube_f)
+
+# ========== EXPORT ==========
+@fragment
+def section_export(cube_f, trips_f, start_date, end_date, sel_filters):
+    st.markdown("<div class='section-title'>📤 Export</div>", unsafe_allow_html=True)
+    # Hasil export lama dibuang jika data atau filter berubah
+    sig = (data_key, start_date, end_date, tuple(sorted((str(k), str(sorted(v))) for k, v in sel_filters.items())))
+    job = st.session_state.get("export_job")
+    if job is not None and st.session_state.get("export_sig") != sig and not job.running:
+        job.cleanup()
+        job = st.session_state.export_job = None
+
+    include_raw = st.checkbox(
+        "Sertakan baris data (sesuai filter)", value=raw_rows is not None, disabled=raw_rows is None,
+        help="Tidak tersedia di mode streaming karena baris mentah tidak disimpan.",
+    )
+    if (job is None or not job.running) and st.button("📦 Siapkan File Export"):
+        # Tabel ringkasan dari cube terfilter, bukan groupby ulang atas baris mentah
+        tables = {
+            "KPI": kpi_table(cube_kpis(cube_f, trips_f, cols), int(cube_f[ROWS].sum()), pd.Timestamp(start_date), pd.Timestamp(end_date)),
+            **summary_tables(Cube(cube_f, trips_f, cols)),
+        }
+        if DF_TRCK:
+            capacity = st.session_state.get("truck_capacity", DEFAULT_CAPACITY)
+            tables["Utilisasi Truck"] = truck_utilization(cube_f, trips_f, cols, start_date, end_date, capacity).summary
+        raw_filter = partial(filter_rows, date_col=DF_DATE, start=start_date, end=end_date, filters=sel_filters)
+        if job is not None:
+            job.cleanup()
+        job = ExportJob(tables, raw_rows() if include_raw else None, raw_filter).start()
+        st.session_state.export_job = job
+        st.session_state.export_sig = sig
+
+    if job is None:
+        return
+    if job.running:
+        st.progress(job.rows / job.total if job.total else 0.0, text=f"Menulis file... {job.rows:,}/{job.total:,} baris")
+        st.button("🔄 Cek Status")
+    elif job.error is not None:
+        st.error(f"Export gagal: {job.error}")
+    else:
+        def finish_export():
+            # File sementara dibuang setelah di-download
+            job.cleanup()
+            st.session_state.export_job = None
+
+        st.download_button(
+            "⬇️ Download XLSX", data=job.data(),
+            file_name=f"summary_{start_date:%Y%m%d}_{end_date:%Y%m%d}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            on_click=finish_export,
+        )
+        st.caption(f"Selesai dalam {job.seconds:,.1f} detik")
+
+section_export(cube_f, trips_f, start_date, end_date, sel_filters)
+
+# ========== PROFILING PANEL ==========
+@st_fragment
+def section_profiling():
+    # Fragment tersendiri: "Muat Ulang" menampilkan run fragment terbaru tanpa rerun penuh
+    with st.expander("⏱️ Profiling", expanded=False):
+        run = prof.frame()
+        st.button("🔄 Muat Ulang", key="profile_refresh")
+        st.markdown(f"**Run terakhir ({prof.label})** — total {run['seconds'].sum():.3f} s")
+        fs = charts.figure_stats
+        st.caption(f"Cache figure: hit {fs['hits']:,} / miss {fs['misses']:,}")
+        st.dataframe(run, hide_index=True, use_container_width=True)
+
+        st.markdown("**Riwayat run (penuh & fragment)**")
+        st.dataframe(prof.history(), hide_index=True, use_container_width=True)
+        st.markdown("**Kumulatif (sesi ini)**")
+        st.dataframe(prof.summary(), use_container_width=True)
+        if st.button("Reset Statistik Profiling"):
+            prof.reset()
+
+if prof.enabled:
+    section_profiling()
@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+from ingest import COLUMN_CANDIDATES, match_col, normalize_columns, read_table
+
+# ========== TARGET STORE ==========
+# Target volume per (bulan, plant) disimpan di SQLite lokal supaya tidak hilang saat
+# sesi berakhir. Bulan disimpan sebagai teks "YYYY-MM".
+TARGET_DB = Path(os.environ.get("SUMMARY_TARGET_DB", "data/targets.sqlite"))
+
+TARGET_CANDIDATES = {
+    "plant":  COLUMN_CANDIDATES["plant"],
+    "target": ["target volume", "target", "target_volume", "volume target"],
+    "month":  ["month", "bulan", "periode", "period"],
+}
+
+
+def months_between(start, end) -> list[str]:
+    return [p.strftime("%Y-%m") for p in pd.period_range(pd.Timestamp(start), pd.Timestamp(end), freq="M")]
+
+
+class TargetStore:
+    def __init__(self, path: Path = TARGET_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS targets ("
+                " month TEXT NOT NULL, plant TEXT NOT NULL, target REAL NOT NULL, updated REAL NOT NULL,"
+                " PRIMARY KEY (month, plant))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # Koneksi per operasi: aman dipakai dari thread sesi Streamlit mana pun
+        con = sqlite3.connect(self.path, timeout=10)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def load(self, months) -> pd.DataFrame:
+        months = [months] if isinstance(months, str) else list(months)
+        if not months:
+            return pd.DataFrame(columns=["month", "plant", "target"])
+        marks = ",".join("?" * len(months))
+        with self._connect() as con:
+            return pd.read_sql_query(
+                f"SELECT month, plant, target FROM targets WHERE month IN ({marks})", con, params=months
+            )
+
+    def totals(self, months) -> pd.DataFrame:
+        # Jumlah target per plant untuk semua bulan dalam rentang filter
+        return self.load(months).groupby("plant", as_index=False)["target"].sum()
+
+    def save(self, frame: pd.DataFrame) -> int:
+        # frame: kolom month, plant, target; target 0/kosong menghapus baris
+        frame = frame.assign(target=pd.to_numeric(frame["target"], errors="coerce").fillna(0))
+        keep = frame["target"] > 0
+        now = time.time()
+        with self._connect() as con:
+            con.executemany(
+                "INSERT INTO targets (month, plant, target, updated) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (month, plant) DO UPDATE SET target = excluded.target, updated = excluded.updated",
+                [(m, str(p), float(t), now) for m, p, t in frame.loc[keep, ["month", "plant", "target"]].itertuples(index=False)],
+            )
+            con.executemany(
+                "DELETE FROM targets WHERE month = ? AND plant = ?",
+                [(m, str(p)) for m, p in frame.loc[~keep, ["month", "plant"]].itertuples(index=False)],
+            )
+        return int(keep.sum())
+
+    def clear(self, month: str) -> None:
+        with self._connect() as con:
+            con.execute("DELETE FROM targets WHERE month = ?", (month,))
+
+
+# ========== IMPORT ==========
+def parse_targets(df: pd.DataFrame, default_month: str) -> pd.DataFrame:
+    # Sheet target: kolom plant + target wajib, kolom bulan opsional
+    df = normalize_columns(df)
+    cols = {role: match_col(df, cands) for role, cands in TARGET_CANDIDATES.items()}
+    missing = [role for role in ("plant", "target") if cols[role] is None]
+    if missing:
+        raise ValueError("Kolom target tidak ditemukan: " + ", ".join(missing))
+    out = pd.DataFrame({
+        "plant": df[cols["plant"]].astype(str).str.strip(),
+        "target": pd.to_numeric(df[cols["target"]], errors="coerce").fillna(0),
+    })
+    if cols["month"]:
+        months = pd.to_datetime(df[cols["month"]], errors="coerce")
+        out["month"] = months.dt.strftime("%Y-%m").fillna(default_month)
+    else:
+        out["month"] = default_month
+    # Baris ganda untuk plant & bulan yang sama: yang terakhir dipakai
+    return out.drop_duplicates(["month", "plant"], keep="last")
+
+
+def import_targets(store: TargetStore, data: bytes, name: str, default_month: str) -> int:
+    return store.save(parse_targets(read_table(data, name), default_month))
+
+
+def with_targets(actual: pd.DataFrame, plant_col: str, targets: pd.DataFrame, name: str = "Target") -> pd.DataFrame:
+    # Join vectorized actual x target per plant; plant tanpa target = 0
+    t = targets.rename(columns={"plant": "_plant", "target": name})[["_plant", name]]
+    out = actual.assign(_plant=actual[plant_col].astype(str)).merge(t, on="_plant", how="left")
+    out[name] = out[name].fillna(0)
+    return out.drop(columns="_plant")
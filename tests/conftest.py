@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+COLS = {
+    "date": "dp date",
+    "qty": "qty",
+    "sales": "sales man",
+    "trip": "dp no",
+    "area": "area",
+    "plant": "plant name",
+    "distance": "distance",
+    "truck": "truck no",
+    "endcust": "end customer name",
+}
+
+
+def make_deliveries(rows: int = 2000, seed: int = 0) -> pd.DataFrame:
+    # Truck T0-T14 hanya di area N, T15-T29 hanya di area S; satu trip bisa beberapa baris
+    rng = np.random.default_rng(seed)
+    area = rng.choice(["N", "S"], rows)
+    truck = np.where(area == "N", rng.integers(0, 15, rows), rng.integers(15, 30, rows))
+    return pd.DataFrame({
+        "dp date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 20, rows), "D"),
+        "qty": rng.uniform(1, 7, rows).round(2),
+        "sales man": rng.choice(["Ani", "Budi", "Citra", "Dedi"], rows),
+        "dp no": rng.integers(0, rows // 3, rows).astype(str),
+        "area": area,
+        "plant name": np.char.add(area.astype(str), rng.integers(1, 4, rows).astype(str)),
+        "distance": rng.uniform(5, 40, rows).round(1),
+        "truck no": np.char.add("T", truck.astype(str)),
+        "end customer name": rng.choice([f"C{i}" for i in range(12)], rows),
+    })
+
+
+@pytest.fixture
+def deliveries() -> pd.DataFrame:
+    return make_deliveries()
+
+
+@pytest.fixture
+def cols() -> dict:
+    return dict(COLS)
@@ -0,0 +1,154 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregate import (
+    TRIP_KEY, CubeBuilder, FilterIndex, MergedDataset, concat_coded, merge_cubes, reduce_groups, avg_distance, build_cube, cube_kpis, rollup, stream_cube, summary_tables,
+    trips_by,
+)
+from ingest import Dataset
+
+
+def raw_kpis(df, cols):
+    return {
+        "area": df[cols["area"]].nunique(),
+        "plant": df[cols["plant"]].nunique(),
+        "truck": df[cols["truck"]].nunique(),
+        "trip": df[cols["trip"]].nunique(),
+        "vol": float(df[cols["qty"]].sum()),
+    }
+
+
+def test_cube_kpis_match_raw(deliveries, cols):
+    cb = build_cube(deliveries, cols)
+    kpis = cube_kpis(cb.cube, cb.trips, cols)
+    expected = raw_kpis(deliveries, cols)
+    assert np.isclose(kpis.pop("vol"), expected.pop("vol"))
+    assert kpis == expected
+    assert cb.rows == len(deliveries) and len(cb.cube) < len(deliveries)
+
+
+def test_rollups_match_raw_groupby(deliveries, cols):
+    cb = build_cube(deliveries, cols)
+    for role in ("area", "plant", "truck", "sales", "endcust"):
+        dim = cols[role]
+        assert isinstance(cb.cube[dim].dtype, pd.CategoricalDtype)
+        got = rollup(cb.cube, dim, cols["qty"]).astype({dim: str}).set_index(dim)["Total Volume"]
+        exp = deliveries.groupby(dim)[cols["qty"]].sum()
+        pd.testing.assert_series_equal(got.sort_index(), exp.sort_index(), check_names=False)
+        trips = trips_by(cb.trips, dim).astype({dim: str}).set_index(dim)["Total Trip"]
+        pd.testing.assert_series_equal(trips.sort_index(), deliveries.groupby(dim)[cols["trip"]].nunique().sort_index(),
+                                       check_names=False)
+    dist = avg_distance(cb.cube, cols["area"]).set_index(cols["area"])["Avg Distance"]
+    assert np.allclose(dist.sort_index(), deliveries.groupby(cols["area"])[cols["distance"]].mean().sort_index())
+
+
+def test_chunked_builder_matches_single_pass(deliveries, cols):
+    builder = CubeBuilder(cols, compact_rows=100)
+    for lo in range(0, len(deliveries), 300):
+        builder.add(deliveries.iloc[lo:lo + 300])
+    chunked = builder.result()
+    whole = build_cube(deliveries, cols)
+    for a, b in zip(summary_tables(chunked).values(), summary_tables(whole).values()):
+        pd.testing.assert_frame_equal(a, b, check_exact=False)
+
+
+def test_stream_cube_matches_build_cube(deliveries, cols):
+    data = deliveries.to_csv(index=False).encode()
+    streamed = stream_cube(io.BytesIO(data), "a.csv", chunksize=500)
+    whole = build_cube(deliveries, cols)
+    assert streamed.rows == whole.rows
+    kpis = cube_kpis(streamed.cube, streamed.trips, streamed.cols)
+    assert kpis["trip"] == deliveries[cols["trip"]].nunique()
+    assert np.isclose(kpis["vol"], deliveries[cols["qty"]].sum())
+
+
+def test_stream_cube_xlsx_and_rejects_xls(deliveries, cols):
+    buf = io.BytesIO()
+    deliveries.head(500).to_excel(buf, index=False)
+    streamed = stream_cube(io.BytesIO(buf.getvalue()), "a.xlsx", chunksize=120)
+    assert streamed.rows == 500
+    assert np.isclose(streamed.cube[cols["qty"]].sum(), deliveries.head(500)[cols["qty"]].sum())
+    with pytest.raises(ValueError):
+        stream_cube(io.BytesIO(buf.getvalue()), "a.xls")
+
+
+def test_merged_dataset_dedupes_trips_across_files(deliveries, cols):
+    first, second = deliveries.iloc[:1200], deliveries.iloc[800:]
+    # File kedua memakai nama kolom lain untuk qty
+    renamed = second.rename(columns={cols["qty"]: "quantity"})
+    merged = MergedDataset(cols)
+    assert merged.append(Dataset(key="a", df=first, cols=cols, nbytes=0)) == len(first)
+    added = merged.append(Dataset(key="b", df=renamed, cols={**cols, "qty": "quantity"}, nbytes=0))
+
+    seen = set(first[cols["trip"]])
+    fresh = second[~second[cols["trip"]].isin(seen)]
+    assert added == len(fresh)
+    assert merged.duplicates == len(second) - len(fresh)
+    assert merged.keys == ["a", "b"]
+    assert merged.rows == len(first) + len(fresh) and len(merged.frames) == 2
+    # Gabungan baris mentah menggantikan potongan-potongannya, tidak disimpan dua kali
+    assert len(merged.df) == merged.rows
+    assert len(merged.frames) == 1 and merged.frames[0] is merged.df
+    want = build_cube(pd.concat([first, fresh], ignore_index=True), cols)
+    assert np.isclose(merged.cube.cube[cols["qty"]].sum(), want.cube[cols["qty"]].sum())
+    assert merged.cube.trips[TRIP_KEY].nunique() == deliveries[cols["trip"]].nunique()
+
+
+def test_merged_series_updates_on_append(deliveries, cols):
+    merged = MergedDataset(cols)
+    merged.append(Dataset(key="a", df=deliveries.iloc[:1000], cols=cols, nbytes=0))
+    series = merged.series(cols["area"])
+    merged.append(Dataset(key="b", df=deliveries.iloc[1000:], cols=cols, nbytes=0))
+    assert merged.series(cols["area"]) is series
+    want = merged.df.groupby(cols["area"])[cols["qty"]].sum()
+    got = series.daily.sum()
+    assert np.allclose(got[want.index].to_numpy(), want.to_numpy())
+
+
+def test_filtered_trip_count_is_exact(deliveries, cols):
+    cb = build_cube(deliveries, cols)
+    idx = FilterIndex(cb.trips, cols["date"], [cols["area"], cols["plant"], cols["truck"]])
+    d = deliveries[cols["date"]]
+    for filters in ({}, {cols["area"]: "N"}, {cols["plant"]: ["S1", "S2"]}, {cols["truck"]: "T3"}):
+        got = idx.select("2024-01-04", "2024-01-11", filters)[TRIP_KEY].nunique()
+        mask = (d >= "2024-01-04") & (d <= "2024-01-11")
+        for dim, value in filters.items():
+            mask &= deliveries[dim].isin(value if isinstance(value, list) else [value])
+        assert got == deliveries.loc[mask, cols["trip"]].nunique()
+
+
+def test_stream_cube_keeps_dimensions_coded(deliveries, cols):
+    data = deliveries.to_csv(index=False).encode()
+    cb = stream_cube(io.BytesIO(data), "a.csv", chunksize=300)
+    for frame in (cb.cube, cb.trips):
+        for role in ("area", "plant", "truck", "sales", "endcust"):
+            assert isinstance(frame[cols[role]].dtype, pd.CategoricalDtype)
+    assert cb.trips[TRIP_KEY].dtype == np.uint64
+    assert not cb.trips.duplicated().any()
+    # Kategori gabungan: setiap nilai dari semua chunk tetap ada, tanpa duplikat
+    trucks = cb.cube[cols["truck"]].cat.categories
+    assert trucks.is_unique and set(trucks) == set(deliveries[cols["truck"]])
+
+
+def test_concat_coded_unions_categories():
+    a = pd.DataFrame({"k": pd.Categorical(["x", "y"]), "v": [1, 2]})
+    b = pd.DataFrame({"k": pd.Categorical(["z", "x", None]), "v": [3, 4, 5]})
+    out = concat_coded([a, b])
+    assert isinstance(out["k"].dtype, pd.CategoricalDtype)
+    assert out["k"].astype(object).tolist() == ["x", "y", "z", "x", np.nan]
+    grouped = reduce_groups(out, ["k"])
+    assert grouped["v"].dtype == out["v"].dtype
+    assert dict(zip(grouped["k"].astype(object).fillna("-"), grouped["v"])) == {"x": 5, "y": 2, "z": 3, "-": 5}
+
+
+def test_merge_cubes_keeps_categories(deliveries, cols):
+    a = build_cube(deliveries.iloc[:900], cols)
+    b = build_cube(deliveries.iloc[900:], cols)
+    merged = merge_cubes(a, b)
+    whole = build_cube(deliveries, cols)
+    assert isinstance(merged.cube[cols["truck"]].dtype, pd.CategoricalDtype)
+    assert len(merged.cube) == len(whole.cube) and len(merged.trips) == len(whole.trips)
+    assert np.isclose(merged.cube[cols["qty"]].sum(), whole.cube[cols["qty"]].sum())
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+from batch import find_inputs, process_file
+
+
+def test_find_inputs_skips_lock_files(tmp_path):
+    for name in ("b.xlsx", "a.csv", "~$b.xlsx", "notes.txt", "sub/c.xls"):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(b"")
+    assert [f.name for f in find_inputs(tmp_path)] == ["a.csv", "b.xlsx"]
+    assert [f.name for f in find_inputs(tmp_path, recursive=True)] == ["a.csv", "b.xlsx", "c.xls"]
+
+
+def test_process_file_writes_summary_and_charts(deliveries, tmp_path):
+    pytest.importorskip("xlsxwriter")
+    src = tmp_path / "harian.csv"
+    deliveries.to_csv(src, index=False)
+    result = process_file(str(src), str(tmp_path / "out"), use_snapshot=False)
+
+    assert result["status"] == "ok" and result["rows"] == len(deliveries)
+    assert result["Total Trip"] == deliveries["dp no"].nunique()
+    assert result["Total Truck"] == deliveries["truck no"].nunique()
+    out = tmp_path / "out" / "harian"
+    sheets = pd.read_excel(out / "summary.xlsx", sheet_name=None)
+    kpi = sheets["KPI"].set_index(sheets["KPI"].columns[0]).iloc[:, 0]
+    assert float(kpi["Total Volume"]) == pytest.approx(deliveries["qty"].sum())
+    assert len(sheets) > 1
+    assert result["charts"] == len(list((out / "charts").glob("*.html"))) > 0
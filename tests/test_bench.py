@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+import bench
+
+
+def test_generator_shape_and_rows_per_trip():
+    df = bench.make_deliveries(3000, plants=10, trucks=20, rows_per_trip=3.0, seed=1)
+    assert len(df) == 3000
+    assert df["Plant Name"].nunique() <= 10 and df["Truck No"].nunique() <= 20
+    # Setiap plant selalu di satu area
+    assert (df.groupby("Plant Name")["Area"].nunique() == 1).all()
+    assert df["Dp No"].nunique() <= 1000
+    assert bench.make_deliveries(500, rows_per_trip=1.0)["Dp No"].is_unique
+    assert bench.make_deliveries(500, seed=2).equals(bench.make_deliveries(500, seed=2))
+
+
+def test_main_writes_results(tmp_path):
+    pytest.importorskip("xlsxwriter")
+    out = tmp_path / "bench.json"
+    bench.main(["--rows", "1500", "--repeat", "1", "--trucks", "30", "--rows-per-trip", "2", "--out", str(out)])
+    case = json.loads(out.read_text())["cases"][0]
+    assert case["rows"] == 1500 and case["params"]["rows_per_trip"] == 2.0
+    assert case["trip_exact"] < 1500 and case["trucks"] <= 30
+    stages = case["stages"]
+    assert {"build_cube", "filter_index_select", "truck_utilization", "fig_bar_desc_truck_cached"} <= set(stages)
+    assert all(s["min_s"] >= 0 and s["runs"] >= 1 for s in stages.values())
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import charts
+from charts import LAYOUT_TEMPLATES, OTHERS_LABEL, THEMES, bar_desc, layout_template, lttb, reduce_categories, reduce_payload
+
+
+def test_reduce_categories_keeps_top_and_totals():
+    df = pd.DataFrame({"truck": [f"T{i}" for i in range(80)], "qty": np.arange(80, dtype=float)})
+    out = reduce_categories(df, "truck", "qty", top_n=10)
+    assert len(out) == 11
+    assert out["truck"].iloc[:10].tolist() == [f"T{i}" for i in range(79, 69, -1)]
+    assert out["truck"].iloc[-1] == f"{OTHERS_LABEL} (70)"
+    assert np.isclose(out["qty"].sum(), df["qty"].sum())
+    mean = reduce_categories(df, "truck", "qty", top_n=10, agg="mean")
+    assert np.isclose(mean["qty"].iloc[-1], df["qty"].iloc[:70].mean())
+
+
+def test_reduce_categories_small_frame_untouched():
+    df = pd.DataFrame({"truck": ["a", "b"], "qty": [1.0, 2.0]})
+    assert reduce_categories(df, "truck", "qty", top_n=10) is df
+    assert reduce_categories(df, "truck", "qty", top_n=None) is df
+
+
+def test_lttb_bounds_points_and_keeps_ends_and_peak():
+    n = 5000
+    ys = np.sin(np.linspace(0, 20, n))
+    ys[1234] = 50.0
+    df = pd.DataFrame({"day": pd.date_range("2020-01-01", periods=n), "qty": ys}).sample(frac=1, random_state=0)
+    out = lttb(df, "day", "qty", max_points=200)
+    assert len(out) == 200
+    assert out["day"].is_monotonic_increasing
+    assert out["day"].iloc[0] == pd.Timestamp("2020-01-01")
+    assert out["day"].iloc[-1] == pd.Timestamp("2020-01-01") + pd.Timedelta(days=n - 1)
+    assert out["qty"].max() == 50.0
+
+
+def test_lttb_passthrough():
+    df = pd.DataFrame({"day": pd.date_range("2020-01-01", periods=50), "qty": np.arange(50.0)})
+    assert lttb(df, "day", "qty", max_points=100) is df
+    labels = pd.DataFrame({"day": [str(i) for i in range(1000)], "qty": np.arange(1000.0)})
+    assert lttb(labels, "day", "qty", max_points=100) is labels
+
+
+def test_reduce_payload_dispatches_on_dtype():
+    series = pd.DataFrame({"day": pd.date_range("2020-01-01", periods=1000), "qty": np.arange(1000.0)})
+    assert len(reduce_payload(series, "day", "qty", max_points=100)) == 100
+    cats = pd.DataFrame({"area": [f"A{i}" for i in range(100)], "qty": np.ones(100)})
+    assert len(reduce_payload(cats, "area", ["qty"], top_n=5)) == 6
+
+
+@pytest.fixture
+def figures(monkeypatch):
+    monkeypatch.setattr(charts, "_figures", charts.OrderedDict())
+    monkeypatch.setattr(charts, "figure_stats", {"hits": 0, "misses": 0})
+    return charts.figure_stats
+
+
+def test_layout_template_per_theme():
+    assert layout_template(THEMES["Dark"]) is LAYOUT_TEMPLATES["Dark"]
+    assert layout_template(dict(THEMES["Light"])) is LAYOUT_TEMPLATES["Light"]
+    assert layout_template(THEMES["Light"], "ggplot2") == "ggplot2"
+
+
+def test_memo_figure_hits_on_same_data_and_theme(figures):
+    df = pd.DataFrame({"area": ["N", "S", "E"], "qty": [3.0, 1.0, 2.0]})
+    args = ("area", "qty", "Volume", "#000", "#fff")
+    fig = bar_desc(df, *args, theme=THEMES["Light"])
+    assert fig is not None and list(fig.data[0].x) == ["N", "E", "S"]
+    assert bar_desc(df.copy(), *args, theme=THEMES["Light"]) is fig
+    assert figures == {"hits": 1, "misses": 1}
+
+    dark = bar_desc(df, *args, theme=THEMES["Dark"])
+    assert dark is not fig
+    changed = bar_desc(df.assign(qty=[3.0, 1.0, 9.0]), *args, theme=THEMES["Light"])
+    assert changed is not fig
+    assert figures == {"hits": 1, "misses": 3}
+
+
+def test_memo_figure_evicts_oldest(figures, monkeypatch):
+    monkeypatch.setattr(charts, "FIGURE_CACHE_SIZE", 2)
+    frames = [pd.DataFrame({"area": ["N"], "qty": [float(i)]}) for i in range(3)]
+    for df in frames:
+        bar_desc(df, "area", "qty", "t", "#000", "#fff")
+    assert len(charts._figures) == 2
+    bar_desc(frames[0], "area", "qty", "t", "#000", "#fff")
+    assert figures["misses"] == 4
+    assert bar_desc.uncached(frames[0], "area", "qty", "t", "#000", "#fff") is not None
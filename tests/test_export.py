@@ -0,0 +1,41 @@
+import os
+
+import openpyxl
+import pandas as pd
+
+from export import ExportJob, filter_rows, write_export
+from ingest import compact_frame
+
+
+def test_filter_rows_lists_and_categoricals(deliveries, cols):
+    small = compact_frame(deliveries, cols)[0]
+    for frame in (deliveries, small):
+        out = filter_rows(frame, cols["date"], "2024-01-03", "2024-01-05",
+                          {cols["area"]: ["S"], cols["sales"]: ["Ani", "Budi"], cols["plant"]: []})
+        assert len(out) > 0
+        assert set(out[cols["area"]].astype(str)) == {"S"}
+        assert set(out[cols["sales"]].astype(str)) <= {"Ani", "Budi"}
+        assert out[cols["date"]].between("2024-01-03", "2024-01-05 23:59").all()
+    a = filter_rows(deliveries, cols["date"], "2024-01-01", "2024-01-31", {cols["area"]: "N"})
+    b = filter_rows(small, cols["date"], "2024-01-01", "2024-01-31", {cols["area"]: ["N"]})
+    assert len(a) == len(b) == (deliveries[cols["area"]] == "N").sum()
+
+
+def test_write_export_contents(tmp_path, deliveries):
+    path = tmp_path / "x.xlsx"
+    table = pd.DataFrame({"Plant": ["P1", "P2"], "Total Volume": [1.5, None]})
+    write_export(str(path), {"Plant": table}, deliveries.head(10))
+    wb = openpyxl.load_workbook(path, read_only=True)
+    assert wb.sheetnames == ["Plant", "Data"]
+    rows = list(wb["Plant"].values)
+    assert rows == [("Plant", "Total Volume"), ("P1", 1.5), ("P2", None)]
+    assert len(list(wb["Data"].values)) == 11
+
+
+def test_export_job_cleans_up(deliveries):
+    job = ExportJob({"KPI": pd.DataFrame({"a": [1]})}, deliveries, lambda df: df.head(5)).start()
+    job._thread.join()
+    assert job.done and job.total == 5 and job.data()[:2] == b"PK"
+    folder = os.path.dirname(job.path)
+    job.cleanup()
+    assert not os.path.exists(folder)
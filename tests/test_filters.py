@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+from aggregate import FilterIndex, RollupIndex, build_cube
+
+
+def raw_select(df, cols, start, end, filters):
+    d = df[cols["date"]]
+    mask = (d >= pd.Timestamp(start)) & (d < pd.Timestamp(end) + pd.Timedelta(days=1))
+    for dim, value in filters.items():
+        if isinstance(value, list):
+            mask &= df[dim].isin(value)
+        else:
+            mask &= df[dim] == value
+    return df[mask]
+
+
+def test_date_bounds_include_end_day(deliveries, cols):
+    idx = FilterIndex(deliveries, cols["date"], [cols["area"]])
+    lo, hi = idx.date_bounds("2024-01-05", "2024-01-05")
+    days = idx.frame[cols["date"]].iloc[lo:hi]
+    assert len(days) == (deliveries[cols["date"]] == "2024-01-05").sum()
+    assert (days == pd.Timestamp("2024-01-05")).all()
+
+
+def test_select_matches_mask(deliveries, cols):
+    idx = FilterIndex(deliveries, cols["date"], [cols["area"], cols["plant"]])
+    cases = [
+        {},
+        {cols["area"]: "N"},
+        {cols["area"]: "S", cols["plant"]: "S2"},
+        {cols["plant"]: ["N1", "S3"]},
+        {cols["area"]: "N", cols["plant"]: "S1"},
+    ]
+    for filters in cases:
+        got = idx.select("2024-01-03", "2024-01-12", filters)
+        want = raw_select(deliveries, cols, "2024-01-03", "2024-01-12", filters)
+        assert len(got) == len(want)
+        assert np.isclose(got[cols["qty"]].sum(), want[cols["qty"]].sum())
+
+
+def test_inactive_filters_are_ignored(deliveries, cols):
+    idx = FilterIndex(deliveries, cols["date"], [cols["area"]])
+    for value in ("All", None, []):
+        assert len(idx.select(filters={cols["area"]: value})) == len(deliveries)
+    assert len(idx.select(filters={cols["area"]: "X"})) == 0
+
+
+def test_levels_and_values(deliveries, cols):
+    cube = build_cube(deliveries, cols).cube
+    idx = FilterIndex(cube, cols["date"], [cols["area"], cols["plant"]])
+    assert idx.levels(cols["area"]) == ["N", "S"]
+    assert idx.values(cols["plant"], {cols["area"]: "S"}) == ["S1", "S2", "S3"]
+    assert idx.values(cols["plant"], {cols["area"]: ["N", "S"]}) == idx.levels(cols["plant"])
+
+
+def test_unsorted_frame_and_missing_values(cols):
+    df = pd.DataFrame({
+        cols["date"]: pd.to_datetime(["2024-01-03", "2024-01-01", "2024-01-02", "2024-01-01"]),
+        cols["area"]: ["N", None, "S", "N"],
+        cols["qty"]: [1.0, 2.0, 3.0, 4.0],
+    })
+    idx = FilterIndex(df, cols["date"], [cols["area"]])
+    assert idx.frame[cols["date"]].is_monotonic_increasing
+    assert idx.select("2024-01-01", "2024-01-01", {cols["area"]: "N"})[cols["qty"]].tolist() == [4.0]
+    assert idx.levels(cols["area"]) == ["N", "S"]
+
+
+def rollups(deliveries, cols):
+    cube = build_cube(deliveries, cols).cube
+    dims = [cols[r] for r in ("area", "plant", "truck", "sales", "endcust")]
+    base = FilterIndex(cube, cols["date"], dims)
+    return base, RollupIndex(base, cols)
+
+
+def test_rollup_picks_smallest_level_covering_filters(deliveries, cols):
+    base, ri = rollups(deliveries, cols)
+    assert ri.index_for("plant") is ri.levels["plant"]
+    assert ri.index_for("plant", {cols["area"]: "N"}) is ri.levels["plant"]
+    assert ri.index_for("truck", {cols["area"]: "N", cols["plant"]: "N1"}) is ri.levels["truck"]
+    # Filter sales tidak ada di roll-up truck -> kembali ke cube dasar
+    assert ri.index_for("truck", {cols["sales"]: "Ani"}) is base
+    assert ri.index_for("truck", {cols["sales"]: "All"}) is ri.levels["truck"]
+    assert len(ri.levels["area"].frame) < len(ri.levels["plant"].frame) <= len(base.frame)
+
+
+def test_rollup_frame_matches_base(deliveries, cols):
+    base, ri = rollups(deliveries, cols)
+    qty = cols["qty"]
+    cases = [
+        ("area", {}),
+        ("plant", {cols["area"]: "S"}),
+        ("truck", {cols["plant"]: ["N1", "N2"]}),
+        ("endcust", {cols["area"]: "N", cols["sales"]: "Budi"}),
+        ("truck", {cols["endcust"]: "C3"}),
+    ]
+    for role, filters in cases:
+        dim = cols[role]
+        got = ri.frame(role, "2024-01-02", "2024-01-15", filters).groupby(dim, observed=True)[qty].sum()
+        want = base.select("2024-01-02", "2024-01-15", filters).groupby(dim, observed=True)[qty].sum()
+        pd.testing.assert_series_equal(got.sort_index(), want.sort_index(), check_exact=False)
+
+
+def test_rollup_values_cascade(deliveries, cols):
+    _, ri = rollups(deliveries, cols)
+    assert ri.values("area") == ["N", "S"]
+    assert ri.values("plant", {cols["area"]: "N"}) == ["N1", "N2", "N3"]
+    trucks = ri.values("truck", {cols["area"]: "S"})
+    assert trucks and all(int(t[1:]) >= 15 for t in trucks)
+    want = sorted(deliveries.loc[deliveries[cols["sales"]] == "Ani", cols["endcust"]].unique())
+    assert ri.values("endcust", {cols["sales"]: "Ani"}) == want
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+import forecast
+from forecast import Forecaster, _param_vector, fit_model
+from timeseries import DailySeries
+
+
+def series(seed=0, days=60):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2024-01-01", periods=days, freq="D")
+    daily = pd.DataFrame({"P1": 100 + 10 * np.sin(np.arange(days) * 2 * np.pi / 7) + rng.normal(0, 2, days),
+                          "P2": rng.uniform(20, 30, days)}, index=idx)
+    return DailySeries(daily)
+
+
+def test_month_end_projection():
+    s = series()
+    out = Forecaster(workers=1).month_end(s, ["P1", "P2", "X"], "2024-02-20", "d1", scope="plant")
+    assert out["Key"].tolist() == ["P1", "P2"]
+    mtd = s.daily.loc["2024-02-01":"2024-02-20"].sum()
+    assert np.allclose(out["MTD"], mtd[["P1", "P2"]])
+    assert (out["Forecast Sisa"] > 0).all()
+    assert np.allclose(out["Proyeksi"], out["MTD"] + out["Forecast Sisa"])
+    assert (out["Proyeksi Bawah"] <= out["Proyeksi"]).all() and (out["Proyeksi"] <= out["Proyeksi Atas"]).all()
+
+
+def test_warm_start_follows_series_not_upload(monkeypatch):
+    starts = []
+    run_fits = forecast.run_fits
+
+    def spy(tasks, workers=None):
+        starts.extend(t[2] is not None for t in tasks)
+        return run_fits(tasks, workers)
+
+    monkeypatch.setattr(forecast, "run_fits", spy)
+    f = Forecaster(workers=1)
+    full = series(0)
+    f.month_end(DailySeries(full.daily.loc[:"2024-02-10"]), ["P1"], "2024-02-10", "upload-1", scope="plant")
+    # Upload baru (key dataset lain) dengan hari tambahan & riwayat sama -> warm start
+    f.month_end(DailySeries(full.daily.loc[:"2024-02-12"]), ["P1"], "2024-02-12", "upload-2", scope="plant")
+    # Riwayat lama berubah -> fit dari awal
+    changed = full.daily.copy()
+    changed.loc["2024-01-05", "P1"] += 50
+    f.month_end(DailySeries(changed), ["P1"], "2024-02-14", "upload-3", scope="plant")
+    # Scope lain dengan nama key sama tidak memakai parameter plant
+    f.month_end(full, ["P1"], "2024-02-16", "upload-4", scope="area")
+    assert starts == [False, True, False, False]
+    assert {k[:2] for k in f._params} == {("plant", "P1"), ("area", "P1")}
+
+    # Hasil di-cache per (dataset, scope, key, tanggal)
+    again = f.month_end(full, ["P1"], "2024-02-16", "upload-4", scope="area")
+    assert len(starts) == 4
+    first = Forecaster(workers=1).month_end(full, ["P1"], "2024-02-16", "upload-4", scope="area")
+    pd.testing.assert_frame_equal(again, first)
+
+
+def test_invalidate_drops_only_that_dataset():
+    f = Forecaster(workers=1)
+    s = series()
+    f.month_end(s, ["P1"], "2024-02-20", "d1", scope="plant")
+    f.month_end(s, ["P1"], "2024-02-20", "d2", scope="plant")
+    f.invalidate("d1")
+    assert {k[0] for k in f._results} == {"d2"} and f._params
+
+
+def test_warm_refit_sse_close_to_cold_fit():
+    # Parameter hari sebelumnya sebagai titik awal tidak boleh memberi fit yang jauh lebih buruk
+    t = np.arange(90)
+    ratios = []
+    for seed in range(20):
+        rng = np.random.default_rng(seed)
+        y = 100 + 0.3 * t + 12 * np.sin(t * 2 * np.pi / 7) + rng.normal(0, 4, len(t))
+        warm = fit_model(y, _param_vector(fit_model(y[:-1]).params))
+        ratios.append(warm.sse / fit_model(y).sse)
+    assert max(ratios) < 1.02
@@ -0,0 +1,279 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ingest
+from ingest import (
+    ColumnResolver, DatasetCache, compact_frame, dataset_key, downcast_numeric, engines_for, load_dataset, rank_columns,
+    read_with_engine, run_tasks,
+)
+
+
+@pytest.fixture(autouse=True)
+def resolver(monkeypatch):
+    # Resolver tanpa file JSON agar pin antar test tidak saling bocor
+    r = ColumnResolver(None)
+    monkeypatch.setattr(ingest, "COLUMN_RESOLVER", r)
+    return r
+
+
+def csv_bytes(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False).encode()
+
+
+def test_pin_other_header_keeps_snapshot(deliveries, resolver, tmp_path):
+    data = csv_bytes(deliveries)
+    first = load_dataset(data, None, tmp_path, name="a.csv")
+    resolver.pin(["lain", "header"], {"qty": "lain"})
+    again = load_dataset(data, None, tmp_path, name="a.csv")
+    assert again.key == first.key == dataset_key(data)
+    assert again.mapped_key == first.mapped_key
+    assert again.engine == first.engine
+
+
+def test_pin_same_header_reparses(deliveries, resolver, tmp_path):
+    data = csv_bytes(deliveries.assign(**{"customer": deliveries["sales man"]}))
+    cache = DatasetCache()
+    first = load_dataset(data, cache, tmp_path, name="a.csv")
+    assert first.cols["endcust"] == "end customer name"
+    resolver.pin(first.header, {"endcust": "customer"})
+    pinned = load_dataset(data, cache, tmp_path, name="a.csv")
+    assert pinned.cols["endcust"] == "customer"
+    assert pinned.mapped_key != first.mapped_key
+    resolver.pin(first.header, {})
+    assert load_dataset(data, cache, tmp_path, name="a.csv").cols["endcust"] == "end customer name"
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_snapshot_roundtrip_matches_first_load(deliveries, tmp_path, compact):
+    pytest.importorskip("pyarrow")
+    df = deliveries.head(300).copy()
+    # dp no campuran angka & teks, plus kolom lain bertipe campuran
+    df["dp no"] = df["dp no"].astype(object)
+    df.loc[::2, "dp no"] = df.loc[::2, "dp no"].astype(int)
+    df["catatan"] = pd.Series([1, "a", None] * 100, dtype=object)
+    buf = io.BytesIO()
+    df.to_excel(buf, index=False)
+
+    first = load_dataset(buf.getvalue(), None, tmp_path, name="a.xlsx", compact=compact)
+    assert ingest.snapshot_paths(first.key, tmp_path)[0].exists()
+    again = load_dataset(buf.getvalue(), None, tmp_path, name="a.xlsx", compact=compact)
+    assert again is not first
+    assert again.df.dtypes.astype(str).to_dict() == first.df.dtypes.astype(str).to_dict()
+    assert again.df.equals(first.df)
+
+
+def test_cached_upload_is_not_parsed_again(deliveries, monkeypatch):
+    data = csv_bytes(deliveries)
+    cache = DatasetCache()
+    first = load_dataset(data, cache, None, name="a.csv")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("file diparse ulang")
+
+    monkeypatch.setattr(ingest, "run_tasks", fail)
+    assert load_dataset(data, cache, None, name="b.csv") is first
+    assert dataset_key(data) == first.key
+    assert len({dataset_key(data), dataset_key(data, compact=True), dataset_key(data, all_sheets=True)}) == 3
+    assert dataset_key(csv_bytes(deliveries.head(10))) != first.key
+
+
+def dataset(key: str, nbytes: int = 10) -> ingest.Dataset:
+    return ingest.Dataset(key=key, df=pd.DataFrame(), cols={}, nbytes=nbytes)
+
+
+def test_dataset_cache_lru_respects_holds():
+    cache = DatasetCache(max_entries=2, max_bytes=1000)
+    cache.put(dataset("a"))
+    cache.put(dataset("b"))
+    cache.hold("s1", ["a"])
+    cache.put(dataset("c"))
+    # "b" paling lama tidak dipakai & tidak dipegang sesi -> dibuang
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.get("b") is None and cache.get("a") is not None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 1, 1)
+    cache.release("s1")
+    cache.put(dataset("d", nbytes=2000))
+    assert len(cache) == 1 and "d" in cache
+
+
+def test_downcast_numeric_is_lossless():
+    assert downcast_numeric(pd.Series([1.0, 2.0, 300.0])).dtype == np.int16
+    assert downcast_numeric(pd.Series([0.5, 1.25])).dtype == np.float32
+    precise = pd.Series([0.1, 2.3])
+    assert downcast_numeric(precise).dtype == np.float64
+    with_nan = downcast_numeric(pd.Series([1.0, None]))
+    assert with_nan.dtype == np.float32 and with_nan.isna().sum() == 1
+    text = pd.Series(["a", "b"])
+    assert downcast_numeric(text) is text
+
+
+def test_compact_frame_keeps_values(deliveries, cols):
+    df = deliveries.assign(unused=np.arange(len(deliveries)), **{cols["trip"]: np.arange(len(deliveries)).astype(str)})
+    out, report = compact_frame(df, cols)
+    assert "unused" not in out.columns
+    assert isinstance(out[cols["area"]].dtype, pd.CategoricalDtype)
+    # dp no unik per baris -> tetap teks
+    assert not isinstance(out[cols["trip"]].dtype, pd.CategoricalDtype)
+    assert np.allclose(out[cols["qty"]].astype(float), df[cols["qty"]], atol=1e-5)
+    assert out[cols["area"]].astype(str).tolist() == df[cols["area"]].tolist()
+    row = report.set_index("Kolom").loc["unused"]
+    assert row["Tipe Akhir"] == "(dibuang)" and row["MB Akhir"] == 0.0
+    assert report["MB Akhir"].sum() < report["MB Awal"].sum()
+
+
+def test_rank_columns_prefers_exact_and_uses_each_column_once():
+    cols = rank_columns(["customer", "end customer name", "qty", "plant", "plant name", "tanggal", "dp date"])
+    assert cols["endcust"] == "end customer name"
+    assert cols["plant"] == "plant name"
+    assert cols["date"] == "dp date"
+    assert cols["truck"] is None
+    # "sales man" tidak ada; token "sales" di kolom lain tetap tertangkap
+    assert rank_columns(["sales man name", "qty"])["sales"] == "sales man name"
+    assert rank_columns(["salesman"])["sales"] == "salesman"
+    assert rank_columns(["qty", "qty total"])["qty"] == "qty"
+
+
+def test_resolver_persists_mappings_and_pins(tmp_path):
+    path = tmp_path / "columns.json"
+    header = ["dp date", "qty", "sales man", "dp no", "customer", "end customer"]
+    first = ColumnResolver(path)
+    assert first.resolve(header)["endcust"] == "end customer"
+    first.pin(header, {"endcust": "customer", "truck": "tidak ada"})
+    assert first.pin_token(header) and first.pin_token(["lain"]) == ""
+
+    reloaded = ColumnResolver(path)
+    cols = reloaded.resolve(header)
+    # Pin ke kolom yang tidak ada di header diabaikan
+    assert cols["endcust"] == "customer" and cols["truck"] is None
+    assert reloaded.pin_token(header) == first.pin_token(header)
+    assert reloaded.resolve(["tanggal"])["date"] == "dp date"
+
+
+def test_engines_follow_extension_and_installed_modules(monkeypatch):
+    monkeypatch.setattr(ingest, "engine_available", lambda e: e != "calamine")
+    assert engines_for("a.xlsx") == ["openpyxl-stream", "openpyxl"]
+    assert engines_for("A.CSV") == ["csv-pyarrow", "csv"]
+    assert engines_for("a.xls") == ["xlrd"]
+    assert engines_for("") == engines_for("a.xlsx")
+
+
+def test_read_with_engine_falls_back(deliveries, monkeypatch):
+    def broken(data, sheet):
+        raise RuntimeError("rusak")
+
+    monkeypatch.setitem(ingest.ENGINES, "csv-pyarrow", (broken, None))
+    monkeypatch.setattr(ingest, "engine_available", lambda e: True)
+    data = csv_bytes(deliveries.head(50))
+    df, engine, seconds = read_with_engine(data, "a.csv")
+    assert engine == "csv" and len(df) == 50 and seconds >= 0
+    with pytest.raises(RuntimeError):
+        read_with_engine(data, "a.csv", engine="csv-pyarrow")
+
+
+@pytest.mark.parametrize("engine", ["openpyxl-stream", "openpyxl", "calamine"])
+def test_excel_engines_agree(deliveries, engine):
+    if not ingest.engine_available(engine):
+        pytest.skip(f"{engine} tidak terpasang")
+    buf = io.BytesIO()
+    deliveries.head(100).to_excel(buf, index=False)
+    df, used, _ = read_with_engine(buf.getvalue(), "a.xlsx", engine=engine)
+    assert used == engine
+    assert list(df.columns) == list(deliveries.columns)
+    assert df["qty"].astype(float).round(2).tolist() == deliveries["qty"].head(100).tolist()
+    assert df["truck no"].tolist() == deliveries["truck no"].head(100).tolist()
+
+
+def test_run_tasks_keeps_order_and_errors(deliveries):
+    good = (csv_bytes(deliveries.head(10)), "a.csv", 0, False)
+    bad = (b"x\n1\n", "b.csv", 0, False)
+    calls = []
+    results = run_tasks([good, bad, good], workers=1, progress=lambda done, total: calls.append((done, total)))
+    assert len(results[0][0]) == 10 and len(results[2][0]) == 10
+    assert isinstance(results[1], ingest.MissingColumnsError)
+    assert calls == [(1, 3), (2, 3), (3, 3)]
+
+
+def test_all_sheets_parallel_matches_serial(deliveries, tmp_path):
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf) as writer:
+        deliveries.iloc[:300].to_excel(writer, sheet_name="Jan", index=False)
+        deliveries.iloc[300:500].to_excel(writer, sheet_name="Feb", index=False)
+        pd.DataFrame({"catatan": ["bukan data"]}).to_excel(writer, sheet_name="Info", index=False)
+    data = buf.getvalue()
+    serial = load_dataset(data, None, None, name="a.xlsx", all_sheets=True, workers=1)
+    parallel = load_dataset(data, None, None, name="a.xlsx", all_sheets=True, workers=2)
+    assert len(serial.df) == 500
+    pd.testing.assert_frame_equal(parallel.df, serial.df)
+
+
+def test_dataset_cache_sessions_and_idle(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ingest.time, "time", lambda: now[0])
+    cache = DatasetCache(max_idle=60, session_ttl=300)
+    cache.put(dataset("a"))
+    cache.put(dataset("b"))
+    cache.hold("s1", ["a"])
+    cache.hold("s2", ["a", "b"])
+    assert cache.refs("a") == 2 and cache.refs("b") == 1
+    cache.hold("s2", ["a"])
+    assert cache.refs("b") == 0
+
+    now[0] += 120
+    cache.hold("s1", ["a"])
+    # "b" idle dan tidak dipegang -> dibuang; "a" tetap karena masih dipegang
+    assert "b" not in cache and "a" in cache
+    now[0] += 400
+    cache.release("s1")
+    # s2 sudah lewat session_ttl, jadi "a" tidak lagi dipegang siapa pun
+    assert "a" not in cache and cache.stats()["sessions"] == 0
+
+
+def test_resolvers_sharing_file_keep_each_others_pins(tmp_path):
+    path = tmp_path / "columns.json"
+    a, b = ColumnResolver(path), ColumnResolver(path)
+    a.resolve(["qty", "dp date"])
+    b.resolve(["qty", "tanggal"])
+    a.pin(["qty", "dp date"], {"truck": None})
+    b.pin(["qty", "tanggal"], {"date": "tanggal"})
+    # Perubahan proses lain terlihat tanpa reload dan tidak tertimpa
+    assert a.pins(["qty", "tanggal"]) == {"date": "tanggal"}
+    assert b.pins(["qty", "dp date"]) == {"truck": None}
+
+    fresh = ColumnResolver(path)
+    assert set(json.loads(path.read_text())["mappings"]) == {
+        ingest.header_signature(["qty", "dp date"]), ingest.header_signature(["qty", "tanggal"]),
+    }
+    assert "pins" not in json.loads(path.read_text())
+    assert fresh.pins(["qty", "dp date"]) == {"truck": None}
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_resolver_reads_legacy_pins(tmp_path):
+    path = tmp_path / "columns.json"
+    sig = ingest.header_signature(["qty", "tanggal"])
+    path.write_text(json.dumps({"mappings": {}, "pins": {sig: {"date": "tanggal"}}}))
+    resolver = ColumnResolver(path)
+    assert resolver.pins(["qty", "tanggal"]) == {"date": "tanggal"}
+    resolver.pin(["qty"], {"qty": "qty"})
+    assert ColumnResolver(path).pins(["qty", "tanggal"]) == {"date": "tanggal"}
+
+
+def test_dataset_cache_budget_covers_held_entries():
+    cache = DatasetCache(max_entries=8, max_bytes=100)
+    cache.put(dataset("a", 40))
+    cache.put(dataset("b", 40))
+    cache.hold("s1", ["a"])
+    cache.hold("s2", ["b"])
+    cache.put(dataset("c", 40))
+    # Semua dipegang sesi: yang terlama dibuang, yang terbaru selalu disimpan
+    assert "a" not in cache and "b" in cache and "c" in cache
+    assert cache.total_bytes <= 100 and cache.stats()["held_evictions"] == 1
+    assert cache.refs("a") == 1
+    cache.put(dataset("d", 150))
+    # "c" tidak dipegang sesi, jadi hanya "b" yang terhitung
+    assert list(cache._items) == ["d"] and cache.stats()["held_evictions"] == 2
@@ -0,0 +1,48 @@
+import tracemalloc
+
+from profiling import Profiler
+
+
+def test_stage_records_and_stops_tracing():
+    prof = Profiler(enabled=True)
+    assert not tracemalloc.is_tracing()
+    with prof.stage("outer"):
+        with prof.stage("inner"):
+            data = [bytes(1024) for _ in range(1000)]
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+    frame = prof.frame()
+    assert frame["stage"].tolist() == ["inner", "outer"]
+    assert frame.loc[0, "mem_peak_mb"] > 0.5
+    del data
+
+
+def test_disabled_wrap_is_passthrough():
+    prof = Profiler(enabled=False)
+    fn = lambda x: x + 1
+    assert prof.wrap(fn, "f") is fn
+    with prof.stage("x"):
+        pass
+    assert prof.frame().empty and not tracemalloc.is_tracing()
+
+
+def test_runs_accumulate_across_reruns():
+    prof = Profiler(enabled=True)
+    prof.start_run("full")
+    with prof.stage("filter"):
+        pass
+    # Rerun fragment: stage baru masuk run sendiri & statistik kumulatif
+    prof.start_run("section_truck")
+    with prof.stage("truck_utilization"):
+        pass
+    with prof.stage("filter"):
+        pass
+    assert prof.label == "section_truck"
+    assert prof.frame()["stage"].tolist() == ["truck_utilization", "filter"]
+    history = prof.history()
+    assert history["jenis"].tolist() == ["section_truck", "full"]
+    assert history["stages"].tolist() == [2, 1]
+    summary = prof.summary()
+    assert summary.loc["filter", "calls"] == 2 and summary.loc["truck_utilization", "calls"] == 1
+    prof.reset()
+    assert prof.summary().empty and prof.history()["jenis"].tolist() == ["section_truck"]
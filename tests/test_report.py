@@ -0,0 +1,114 @@
+from pathlib import Path
+
+import pytest
+
+st = pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest
+
+REPORT = str(Path(__file__).resolve().parent.parent / "report.py")
+
+
+def app(report: str, data: bytes, name: str):
+    import io
+
+    import streamlit as st
+
+    class Upload(io.BytesIO):
+        def __init__(self):
+            super().__init__(data)
+            self.name = name
+            self.size = max(len(data), 300_000)
+
+        def getvalue(self):
+            return data
+
+    upload = Upload()
+    st.sidebar.file_uploader = lambda label, type=None, accept_multiple_files=False, **kw: (
+        [upload] if accept_multiple_files else upload
+    )
+    try:
+        exec(compile(open(report).read(), report, "exec"), {"__name__": "__main__"})
+    finally:
+        del st.sidebar.file_uploader
+
+
+def titles(at) -> str:
+    return " ".join(m.value for m in at.markdown)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # Store & snapshot memakai path relatif -> tulis ke tmp_path, bukan ke repo
+    monkeypatch.chdir(tmp_path)
+    st.cache_resource.clear()
+    return tmp_path
+
+
+def captions(at) -> str:
+    return " ".join(c.value for c in at.caption)
+
+
+@pytest.mark.parametrize("name", ["a.csv", "a.xlsx"])
+def test_report_renders_only_selected_dashboard(deliveries, workdir, name):
+    if name.endswith(".csv"):
+        data = deliveries.to_csv(index=False).encode()
+    else:
+        path = workdir / name
+        deliveries.to_excel(path, index=False)
+        data = path.read_bytes()
+    at = AppTest.from_function(app, args=(REPORT, data, name), default_timeout=120).run()
+    assert not at.exception, [e.message for e in at.exception]
+    assert "📦 Logistic" in titles(at) and "💼 Sales" not in titles(at)
+
+    pick = next(r for r in at.radio if "Logistic" in (r.options or []))
+    pick.set_value("Sales & End Customer").run()
+    assert not at.exception, [e.message for e in at.exception]
+    assert "💼 Sales" in titles(at) and "📦 Logistic" not in titles(at)
+
+    area = next(m for m in at.multiselect if m.label == "Area")
+    area.set_value(["S"]).run()
+    assert not at.exception, [e.message for e in at.exception]
+
+
+def test_projection_hidden_under_non_plant_filters(deliveries, workdir):
+    at = AppTest.from_function(app, args=(REPORT, deliveries.to_csv(index=False).encode(), "a.csv"), default_timeout=120)
+    at.run()
+    at.checkbox(key="show_forecast").check().run()
+    assert not at.exception, [e.message for e in at.exception]
+    assert any(e.label.startswith("🔮 Detail Proyeksi") for e in at.expander)
+
+    next(m for m in at.multiselect if m.label == "Sales Man").set_value(["Ani"]).run()
+    assert not at.exception, [e.message for e in at.exception]
+    assert "Proyeksi disembunyikan" in captions(at) and "Sales Man" in captions(at)
+    assert not any(e.label.startswith("🔮 Detail Proyeksi") for e in at.expander)
+
+
+def test_profiler_survives_reruns(deliveries, workdir):
+    at = AppTest.from_function(app, args=(REPORT, deliveries.to_csv(index=False).encode(), "a.csv"), default_timeout=120)
+    at.run()
+    next(c for c in at.sidebar.checkbox if c.label.startswith("⏱️")).check().run()
+    at.checkbox(key="show_forecast").check().run()
+    assert not at.exception, [e.message for e in at.exception]
+    prof = at.session_state["profiler"]
+    assert len(prof.history()) == 2
+    assert prof.summary().loc["section:section_volume", "calls"] == 2
+
+
+def test_clear_file_cache_keeps_other_files(workdir, monkeypatch):
+    import aggregate
+    from conftest import make_deliveries
+
+    builds = []
+    build_cube = aggregate.build_cube
+    monkeypatch.setattr(aggregate, "build_cube", lambda df, cols, *a: builds.append(len(df)) or build_cube(df, cols, *a))
+    first = AppTest.from_function(app, args=(REPORT, make_deliveries(3000).to_csv(index=False).encode(), "a.csv"), default_timeout=120)
+    other = AppTest.from_function(app, args=(REPORT, make_deliveries(2000, seed=1).to_csv(index=False).encode(), "b.csv"), default_timeout=120)
+    first.run()
+    other.run()
+    assert builds == [3000, 2000]
+
+    next(b for b in first.sidebar.button if "Hapus Cache" in b.label).click().run()
+    other.run()
+    assert not first.exception and not other.exception
+    # Hanya cube file "a" yang dibangun ulang; cube file "b" tetap dari cache
+    assert builds == [3000, 2000, 3000]
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from targets import TargetStore, months_between, parse_targets, with_targets
+
+
+def test_parse_targets_month_column():
+    df = pd.DataFrame({
+        "Plant Name": [" P1", "P2", "P1"],
+        "Target Volume": ["1000", "x", 1500],
+        "Bulan": ["2024-01-15", None, "2024-01-01"],
+    })
+    out = parse_targets(df, "2024-02").sort_values(["month", "plant"], ignore_index=True)
+    assert out[["month", "plant"]].values.tolist() == [["2024-01", "P1"], ["2024-02", "P2"]]
+    # Plant & bulan sama: baris terakhir dipakai; target bukan angka -> 0
+    assert out["target"].tolist() == [1500, 0]
+
+
+def test_parse_targets_missing_column():
+    with pytest.raises(ValueError):
+        parse_targets(pd.DataFrame({"plant": ["P1"]}), "2024-01")
+
+
+def test_store_roundtrip(tmp_path):
+    store = TargetStore(tmp_path / "t.sqlite")
+    store.save(pd.DataFrame({"month": ["2024-01", "2024-01", "2024-02"], "plant": ["P1", "P2", "P1"], "target": [10, 20, 5]}))
+    store.save(pd.DataFrame({"month": ["2024-01"], "plant": ["P2"], "target": [0]}))
+    assert store.load("2024-01")[["plant", "target"]].values.tolist() == [["P1", 10.0]]
+    totals = store.totals(months_between("2024-01-20", "2024-02-03"))
+    assert totals.set_index("plant")["target"].to_dict() == {"P1": 15.0}
+    store.clear("2024-01")
+    assert store.load("2024-01").empty
+
+
+def test_with_targets_fills_missing():
+    actual = pd.DataFrame({"plant": pd.Categorical(["P1", "P2"]), "Actual": [1.0, 2.0]})
+    out = with_targets(actual, "plant", pd.DataFrame({"plant": ["P1"], "target": [9.0]}))
+    assert out["Target"].tolist() == [9.0, 0.0]
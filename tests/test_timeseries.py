@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from timeseries import TOTAL, DailySeries, daily_matrix
+
+
+def frame(days, keys, qty):
+    return pd.DataFrame({"date": pd.to_datetime(days), "area": keys, "qty": qty})
+
+
+def test_daily_matrix_fills_gaps():
+    df = frame(["2024-01-01", "2024-01-04", "2024-01-04"], ["N", "S", "N"], [1.0, 2.0, 3.0])
+    wide = daily_matrix(df, "date", "area", "qty")
+    assert len(wide) == 4 and list(wide.columns) == ["N", "S"]
+    assert wide.loc["2024-01-02"].sum() == 0
+    assert wide.loc["2024-01-04"].tolist() == [3.0, 2.0]
+    assert list(daily_matrix(df, "date", None, "qty").columns) == [TOTAL]
+
+
+def test_append_matches_from_cube(deliveries, cols):
+    d, a, q = cols["date"], cols["area"], cols["qty"]
+    early = deliveries[deliveries[d] < "2024-01-10"]
+    late = deliveries[deliveries[d] >= "2024-01-08"]
+    whole = DailySeries.from_cube(pd.concat([early, late]), d, a, q)
+    for first, second in ((early, late), (late, early)):
+        series = DailySeries.from_cube(first, d, a, q)
+        series.append(DailySeries.from_cube(second, d, a, q))
+        pd.testing.assert_frame_equal(series.daily, whole.daily, check_freq=False)
+        pd.testing.assert_frame_equal(series.cum, whole.cum, check_freq=False)
+
+
+def test_append_new_key_and_empty():
+    series = DailySeries.from_cube(frame(["2024-01-01", "2024-01-02"], ["N", "N"], [1.0, 2.0]), "date", "area", "qty")
+    series.append(DailySeries.from_cube(frame(["2024-01-05"], ["S"], [4.0]), "date", "area", "qty"))
+    assert series.cum.loc["2024-01-05"].to_dict() == {"N": 3.0, "S": 4.0}
+    series.append(DailySeries(pd.DataFrame(dtype="float64")))
+    assert len(series.daily) == 5
+
+
+def test_windows_and_period_sum(deliveries, cols):
+    d, q = cols["date"], cols["qty"]
+    series = DailySeries.from_cube(deliveries, d, None, q)
+    daily = deliveries.groupby(d)[q].sum()
+    pd.testing.assert_series_equal(
+        series.window_sum(7)[TOTAL], daily.rolling(7, min_periods=1).sum(), check_names=False, check_freq=False
+    )
+    pd.testing.assert_series_equal(
+        series.rolling_mean(3)[TOTAL], daily.rolling(3, min_periods=1).mean(), check_names=False, check_freq=False
+    )
+    span = (deliveries[d] >= "2024-01-05") & (deliveries[d] <= "2024-01-09")
+    assert np.isclose(series.period_sum("2024-01-05", "2024-01-09")[TOTAL], deliveries.loc[span, q].sum())
+    # Rentang di luar data dipotong ke data yang ada
+    assert np.isclose(series.period_sum("2023-12-01", "2024-12-31")[TOTAL], deliveries[q].sum())
+    assert series.period_sum("2024-03-01", "2024-03-05")[TOTAL] == 0
+
+
+def test_compare_week_and_month():
+    days = pd.date_range("2024-01-01", "2024-02-20", freq="D")
+    series = DailySeries.from_cube(frame(days, ["N"] * len(days), np.ones(len(days))), "date", "area", "qty")
+    series.append(DailySeries.from_cube(frame(["2024-02-20"], ["N"], [7.0]), "date", "area", "qty"))
+    row = series.compare("2024-02-20").loc["N"]
+    assert row["7 Hari"] == 14 and row["7 Hari Sebelumnya"] == 7
+    assert np.isclose(row["WoW %"], 100)
+    assert row["MTD"] == 27 and row["MTD Bulan Lalu"] == 20
+    assert np.isclose(row["MoM %"], 35)
+    assert DailySeries(pd.DataFrame(dtype="float64")).compare("2024-02-20").empty
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from aggregate import FilterIndex, build_cube
+from ingest import compact_frame
+from utilization import truck_utilization
+
+START, END = "2024-01-01", "2024-01-10"
+
+
+def filtered(deliveries, cols, compact=True, filters=None):
+    df = compact_frame(deliveries, cols)[0] if compact else deliveries
+    cb = build_cube(df, cols)
+    filters = filters or {cols["area"]: ["S"]}
+    cube = FilterIndex(cb.cube, cols["date"], [cols["area"]]).select(START, END, filters)
+    trips = FilterIndex(cb.trips, cols["date"], [cols["area"]]).select(START, END, filters)
+    return cb, cube, trips
+
+
+def test_filtered_categorical_cube(deliveries, cols):
+    cb, cube, trips = filtered(deliveries, cols)
+    assert isinstance(cube[cols["truck"]].dtype, pd.CategoricalDtype)
+    util = truck_utilization(cube, trips, cols, START, END)
+    assert set(util.summary[cols["truck"]]) == {f"T{i}" for i in range(15, 30)}
+    assert util.trips.shape == (15, 10)
+    assert np.isclose(util.summary["Total Volume"].sum(), cube[cols["qty"]].sum())
+
+
+def test_total_trip_is_distinct_per_truck(deliveries, cols):
+    _, cube, trips = filtered(deliveries, cols, compact=False)
+    util = truck_utilization(cube, trips, cols, START, END)
+    expected = trips.groupby(cols["truck"], observed=True)["_trip"].nunique()
+    got = util.summary.set_index(cols["truck"])["Total Trip"]
+    pd.testing.assert_series_equal(got.sort_index(), expected.reindex(got.index).sort_index(), check_names=False)
+
+
+def test_trip_spanning_two_days_counted_once(cols):
+    df = pd.DataFrame({
+        "dp date": pd.to_datetime(["2024-01-01", "2024-01-02"]),
+        "qty": [3.0, 4.0], "sales man": ["A", "A"], "dp no": ["X1", "X1"], "area": ["N", "N"],
+        "plant name": ["N1", "N1"], "distance": [10.0, 10.0], "truck no": ["T1", "T1"],
+        "end customer name": ["C1", "C1"],
+    })
+    cb = build_cube(df, cols)
+    util = truck_utilization(cb.cube, cb.trips, cols, START, END)
+    assert util.summary["Total Trip"].iloc[0] == 1
+    assert util.trips.to_numpy().sum() == 2
+
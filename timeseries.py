@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+# ========== DERET HARIAN ==========
+# Total qty per (hari, key) disimpan sebagai matriks lebar tanpa lubang tanggal,
+# bersama jumlah kumulatifnya. Semua jendela (rolling, minggu, MTD) dihitung dari
+# selisih kumulatif, jadi biayanya O(hari x key), bukan O(baris).
+TOTAL = "Total"
+
+
+def daily_matrix(cube: pd.DataFrame, date_col: str, dim: str | None, qty: str) -> pd.DataFrame:
+    if cube.empty:
+        return pd.DataFrame(dtype="float64")
+    keys = [date_col, dim] if dim else [date_col]
+    g = cube.groupby(keys, observed=True)[qty].sum()
+    wide = g.unstack(dim, fill_value=0.0) if dim else g.to_frame(TOTAL)
+    wide.columns = wide.columns.astype(str)
+    days = pd.date_range(wide.index.min(), wide.index.max(), freq="D")
+    return wide.reindex(days, fill_value=0.0).astype("float64")
+
+
+class DailySeries:
+    def __init__(self, daily: pd.DataFrame):
+        self.daily = daily
+        self.cum = daily.cumsum()
+
+    @classmethod
+    def from_cube(cls, cube: pd.DataFrame, date_col: str, dim: str | None, qty: str) -> "DailySeries":
+        return cls(daily_matrix(cube, date_col, dim, qty))
+
+    @property
+    def empty(self) -> bool:
+        return self.daily.empty
+
+    def append(self, part: "DailySeries") -> None:
+        # Kumulatif sebelum tanggal pertama data baru tidak berubah, jadi hanya
+        # bagian setelahnya yang dihitung ulang
+        new = part.daily
+        if new.empty:
+            return
+        if self.daily.empty:
+            self.daily, self.cum = new, part.cum
+            return
+        old_start = self.daily.index[0]
+        days = pd.date_range(min(old_start, new.index[0]), max(self.daily.index[-1], new.index[-1]), freq="D")
+        keys = self.daily.columns.union(new.columns)
+        daily = self.daily.reindex(index=days, columns=keys, fill_value=0.0)
+        daily = daily.add(new.reindex(index=days, columns=keys, fill_value=0.0))
+
+        t0 = days.get_loc(new.index[0])
+        if new.index[0] <= old_start:
+            cum = daily.cumsum()
+        else:
+            head = self.cum.reindex(columns=keys, fill_value=0.0).reindex(days[:t0]).ffill()
+            cum = pd.concat([head, daily.iloc[t0:].cumsum() + head.iloc[-1]])
+        self.daily, self.cum = daily, cum
+
+    # ---------- JENDELA ----------
+    def window_sum(self, days: int) -> pd.DataFrame:
+        return self.cum - self.cum.shift(days, fill_value=0.0)
+
+    def rolling_mean(self, days: int) -> pd.DataFrame:
+        # Hari-hari awal dibagi jumlah hari yang tersedia
+        n = np.minimum(np.arange(1, len(self.cum) + 1), days)
+        return self.window_sum(days).div(n, axis=0)
+
+    def period_sum(self, start, end) -> pd.Series:
+        first = self.daily.index[0]
+        lo = max((pd.Timestamp(start) - first).days, 0)
+        hi = min((pd.Timestamp(end) - first).days, len(self.cum) - 1)
+        if hi < lo:
+            return pd.Series(0.0, index=self.cum.columns)
+        total = self.cum.iloc[hi]
+        return total - self.cum.iloc[lo - 1] if lo > 0 else total
+
+    # ---------- PERBANDINGAN ----------
+    def compare(self, asof) -> pd.DataFrame:
+        # 7 hari terakhir vs 7 hari sebelumnya, MTD vs periode yang sama bulan lalu
+        if self.empty:
+            return pd.DataFrame()
+        asof = pd.Timestamp(asof).normalize()
+        week = self.period_sum(asof - pd.Timedelta(days=6), asof)
+        prev_week = self.period_sum(asof - pd.Timedelta(days=13), asof - pd.Timedelta(days=7))
+        month_start = asof.replace(day=1)
+        last_start = month_start - pd.DateOffset(months=1)
+        last_end = min(last_start + pd.Timedelta(days=asof.day - 1), month_start - pd.Timedelta(days=1))
+        mtd = self.period_sum(month_start, asof)
+        last_mtd = self.period_sum(last_start, last_end)
+        out = pd.DataFrame({
+            "7 Hari": week,
+            "7 Hari Sebelumnya": prev_week,
+            "WoW %": (week / prev_week.where(prev_week > 0) - 1) * 100,
+            "MTD": mtd,
+            "MTD Bulan Lalu": last_mtd,
+            "MoM %": (mtd / last_mtd.where(last_mtd > 0) - 1) * 100,
+        })
+        return out.sort_values("MTD", ascending=False)
+
+    def trend(self, keys=None, start=None, end=None, window: int = 1, name: str = "Total Volume") -> pd.DataFrame:
+        # Frame panjang (tanggal, key, nilai) untuk line chart
+        if self.empty:
+            return pd.DataFrame(columns=["Tanggal", "Key", name])
+        wide = self.daily if window <= 1 else self.rolling_mean(window)
+        if keys is not None:
+            wide = wide[[k for k in keys if k in wide.columns]]
+        wide = wide.loc[pd.Timestamp(start) if start else None:pd.Timestamp(end) if end else None]
+        return wide.rename_axis("Tanggal").reset_index().melt("Tanggal", var_name="Key", value_name=name)
+
+    def top_keys(self, start, end, n: int = 10) -> list[str]:
+        return self.period_sum(start, end).nlargest(n).index.tolist()
@@ -0,0 +1,120 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from aggregate import DIST_CNT, DIST_SUM, QTY_DIST, TRIP_KEY
+
+# ========== UTILISASI TRUCK ==========
+# Semua ukuran per truck dihitung dari matriks (truck x hari) yang diisi dengan
+# bincount atas kode truck & hari. Trip unik per truck-hari didapat dari satu
+# lexsort atas (truck-hari, hash trip), tanpa groupby/nunique/merge per chart.
+DEFAULT_CAPACITY = 7.0
+
+
+@dataclass
+class TruckUtilization:
+    summary: pd.DataFrame
+    trips: pd.DataFrame
+    volume: pd.DataFrame
+
+
+def _day_codes(dates: pd.Series, start: pd.Timestamp) -> np.ndarray:
+    return ((dates.to_numpy(dtype="datetime64[ns]") - start.to_datetime64()) // np.timedelta64(1, "D")).astype(np.int64)
+
+
+def truck_codes(values: pd.Series, trucks: pd.Index) -> np.ndarray:
+    # Kode dari nilai yang teramati saja (bukan kategori categorical), -1 = tidak ada
+    return trucks.get_indexer(pd.Index(values.astype(object)))
+
+
+def truck_trip_counts(trips: pd.DataFrame, codes: np.ndarray, days: np.ndarray, n_trucks: int, n_days: int) -> np.ndarray:
+    cell = codes * n_days + days
+    ok = (codes >= 0) & (codes < n_trucks) & (days >= 0) & (days < n_days)
+    cell, trip = cell[ok], trips[TRIP_KEY].to_numpy(dtype=np.uint64)[ok]
+    order = np.lexsort((trip, cell))
+    cell, trip = cell[order], trip[order]
+    first = np.ones(len(cell), dtype=bool)
+    first[1:] = (cell[1:] != cell[:-1]) | (trip[1:] != trip[:-1])
+    return np.bincount(cell[first], minlength=n_trucks * n_days).reshape(n_trucks, n_days)
+
+
+def truck_distinct_trips(trips: pd.DataFrame, codes: np.ndarray, n_trucks: int) -> np.ndarray:
+    # Trip unik per truck sepanjang periode: trip yang melewati dua tanggal dihitung sekali
+    ok = (codes >= 0) & (codes < n_trucks)
+    code, trip = codes[ok], trips[TRIP_KEY].to_numpy(dtype=np.uint64)[ok]
+    order = np.lexsort((trip, code))
+    code, trip = code[order], trip[order]
+    first = np.ones(len(code), dtype=bool)
+    first[1:] = (code[1:] != code[:-1]) | (trip[1:] != trip[:-1])
+    return np.bincount(code[first], minlength=n_trucks)[:n_trucks]
+
+
+def truck_utilization(
+    cube: pd.DataFrame,
+    trips: pd.DataFrame,
+    cols: dict,
+    start,
+    end,
+    capacity: float = DEFAULT_CAPACITY,
+) -> TruckUtilization:
+    truck, date, qty = cols["truck"], cols["date"], cols["qty"]
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    n_days = max((end - start).days + 1, 1)
+    # Categorical di-factorize sebagai object agar hanya truck yang teramati di frame
+    # terfilter yang dapat kode; trips dipetakan ke index yang sama
+    codes, uniques = pd.factorize(cube[truck].astype(object), sort=True)
+    trucks = pd.Index(uniques, dtype=object)
+    n_trucks = len(trucks)
+    dates = pd.date_range(start, periods=n_days, freq="D")
+    if n_trucks == 0:
+        empty = pd.DataFrame(index=pd.Index([], name=truck), columns=dates, dtype="float64")
+        return TruckUtilization(pd.DataFrame(columns=[truck]), empty, empty)
+
+    # Volume & jarak per sel (truck, hari)
+    days = _day_codes(cube[date], start)
+    ok = (codes >= 0) & (codes < n_trucks) & (days >= 0) & (days < n_days)
+    cell = (codes * n_days + days)[ok]
+
+    def cells(values) -> np.ndarray:
+        return np.bincount(cell, weights=values[ok], minlength=n_trucks * n_days).reshape(n_trucks, n_days)
+
+    vol = cells(cube[qty].to_numpy(dtype="float64"))
+    has_dist = DIST_SUM in cube.columns
+    if has_dist:
+        dist = cells(cube[DIST_SUM].to_numpy(dtype="float64")).sum(axis=1)
+        dist_n = cells(cube[DIST_CNT].to_numpy(dtype="float64")).sum(axis=1)
+        qty_dist = cells(cube[QTY_DIST].to_numpy(dtype="float64")).sum(axis=1) if QTY_DIST in cube.columns else None
+
+    # Trip unik per (truck, hari) untuk heatmap & max per hari, dan trip unik per truck untuk total
+    t_codes = truck_codes(trips[truck], trucks)
+    trip = truck_trip_counts(trips, t_codes, _day_codes(trips[date], start), n_trucks, n_days)
+    total_trip = truck_distinct_trips(trips, t_codes, n_trucks)
+
+    active = ((trip > 0) | (vol > 0)).sum(axis=1)
+    total_vol = vol.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        load = np.where(total_trip > 0, total_vol / total_trip, 0.0)
+        summary = pd.DataFrame({
+            truck: trucks,
+            "Total Volume": total_vol,
+            "Total Trip": total_trip.astype("int64"),
+            "Avg Load/Trip": load,
+            "Load Factor %": load / capacity * 100 if capacity else np.nan,
+            "Hari Aktif": active,
+            "Hari Idle": n_days - active,
+            "Trip/Hari Aktif": np.where(active > 0, total_trip / active, 0.0),
+            "Max Trip/Hari": trip.max(axis=1).astype("int64"),
+        })
+        if has_dist:
+            summary["Avg Distance"] = np.where(dist_n > 0, dist / dist_n, np.nan)
+            if qty_dist is not None:
+                # Volume x km per hari aktif
+                summary["Produktivitas (m3·km/hari)"] = np.where(active > 0, qty_dist / active, 0.0)
+
+    index = trucks.rename(truck)
+    return TruckUtilization(
+        summary=summary.sort_values("Total Volume", ascending=False, ignore_index=True),
+        trips=pd.DataFrame(trip, index=index, columns=dates),
+        volume=pd.DataFrame(vol, index=index, columns=dates),
+    )